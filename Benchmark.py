@@ -0,0 +1,269 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' benchmarks of the hot paths on generated stacks
+    usage: python Benchmark.py [maxLayers|default] [output.json] [previous.json]
+    every benchmark checks the answers it timed, reports throughput and the scaling exponent,
+    the dense solve is O(n^3), so each benchmark has its own default size limit,
+    below a small limit the sizes are filled in, the exponent needs three sizes over a decade,
+    a fixed script is compared once with its stored R and stress
+'''
+
+import sys, os, time, math, json, random, statistics, subprocess
+import Misc, Unit, Parser, Equation, Solver, Elasticity
+
+sizeList = [10, 100, 1000, 10000, 100000]
+
+# a short job in a new interpreter, with bytecode and material snapshot in place, seconds
+startUpBudget = 0.1
+startUpArgs = ["Main.py", "--no-cache", "GaNOnSapph", "1000"]
+
+# fixed script, ramp, [R(m), stress(GPa) at the top] at the end of the ramp, relative tolerance
+referenceScript = "GaNOnSapph"
+referenceRamp = [1000.0, 300.0, 5]
+referenceResult = [5.754719663630049, -0.543281951489879]
+referenceTolerance = 1e-9
+
+#########################################################
+# generated input
+
+def layerRecords(numOfLayers):
+    ''' alternating GaN/AlN film on sapphire, top first, as Structure.fromLayerList '''
+    records = []
+    for i in range(numOfLayers - 1):
+        if(i%2): records.append(["AlN", 5.0 + i%7, 0.0])
+        else: records.append(["GaN", 20.0 + i%11, 0.1])
+    records.append(["Sapphire", 500.0*Unit.length["um"], 0.0])
+    return records
+
+# the layers of a line of scriptLines
+scriptBlock = [["GaN", 20.0, 0.0], ["AlN", 5.0, 0.1], ["Al50%05%GaN", 100.0, 0.0], ["GaN", 20.0, 0.0],\
+               ["AlN", 6.0, 0.0]]*2
+
+def scriptLines(numOfLayers):
+    ''' script with numOfLayers layers, in lines of 10 layers '''
+    lines = ["# generated for benchmark"]
+    for i in range(numOfLayers//10):
+        lines.append("{GaN 20nm, AlN 5 0.1, [Al50%05%GaN 0.1um], GaN 2e1 0.0, AlN 6nm}*2")
+    return lines
+
+def eqParameters(numOfLayers):
+    youngList = list(map(lambda i: (300.0 + 100.0*(i%3))*Unit.GPa, range(numOfLayers)))
+    thickList = list(map(lambda i: 10.0 + i%5, range(numOfLayers)))
+    mismatchList = list(map(lambda i: 1e-3*((i%4) - 1.5), range(numOfLayers)))
+    return [numOfLayers, youngList, thickList, mismatchList]
+
+#########################################################
+# each benchmark returns [number of items processed, check passed, note]
+
+def benchBuildEq(n):
+    [num, young, thick, mismatch] = eqParameters(n)
+    [m, b] = Equation.buildEq(num, young, thick, mismatch, sum(thick)/2.0)
+    ok = (len(m) == n + 1 and len(m[0]) == n + 1 and m[-2][:n] == [1.0]*n and m[-1][-1] > 0.0)
+    # every interface row, as Equation.interfaceEq
+    for k in range(n - 1):
+        ok = ok and m[k][k] == -1.0/(young[k]*thick[k]) and m[k][k+1] == 1.0/(young[k+1]*thick[k+1]) and\
+            m[k][-1] == -(thick[k] + thick[k+1])/2.0 and b[k] == -mismatch[k]
+    return [n, ok, ""]
+
+def benchSolve(n):
+    # diagonally dominant system with the known root [1, 2, ...]
+    rand = random.Random(n)
+    m = list(map(lambda i: list(map(lambda j: rand.uniform(-1, 1), range(n))), range(n)))
+    for i in range(n): m[i][i] = 2.0*n
+    root = list(map(lambda i: float(i + 1), range(n)))
+    b = Solver.ArrayOp.matDotVec(m, root)
+    eq = Solver.LinearEq(m, b)
+    eq.solve()
+    err = max(map(lambda i: abs(eq.getRoot()[i] - root[i])/root[i], range(n)))
+    residual = eq.error()/(sum(map(abs, b))/n)
+    return [n, err < 1e-9 and residual < 1e-12, "max relative error " + str(err) +\
+            ", relative residual " + str(residual)]
+
+def balanced(structure, tempBegin, tempEnd, neutralPlanePos):
+    ''' the forces and curvature set in the layers hold the force and moment rows of Equation '''
+    [n, young, thick] = structure.getEqParameters(tempBegin, tempEnd)[0:3]
+    root = list(map(lambda layer: layer.force, structure.layerStack))
+    root.append(structure.layerStack[0].reciprocalOfRadius)
+    [row, rhs] = Equation.momentEq(n, young, thick, neutralPlanePos)
+    scale = max(map(abs, root[0:n]))*sum(thick)
+    return abs(sum(root[0:n])) <= 1e-6*max(map(abs, root[0:n])) and\
+        abs(Solver.ArrayOp.vecDotVec(row, root) - rhs) <= 1e-6*scale
+
+def benchRun(n):
+    random.seed(0)
+    structure = Elasticity.Structure.fromLayerList(layerRecords(n))
+    rlt = structure.statusquo(1000.0)
+    ok = math.isfinite(rlt[0][1]) and balanced(structure, 1000.0, 1000.0, rlt[0][2])
+    return [n, ok, "radius " + str(rlt[0][1]/Unit.length["m"]) + " m"]
+
+def rampBench(numOfSteps):
+    def bench(n):
+        random.seed(0)
+        structure = Elasticity.Structure.fromLayerList(layerRecords(n))
+        rlt = structure.rampTemperature(1000.0, 300.0, numOfSteps)
+        ok = (len(rlt) == numOfSteps and rlt[0][0] == 1000.0 and rlt[-1][0] == 300.0)
+        # the layers hold the last step
+        ok = ok and balanced(structure, 1000.0, 300.0, rlt[-1][2])
+        return [n*numOfSteps, ok, ""]
+    return bench
+
+def benchParser(n):
+    lines = scriptLines(max(n, 10))
+    infoList = Parser.Parser().parseLines(lines, "<benchmark>")
+    ok = (len(infoList) == 10*(max(n, 10)//10) and\
+          all(map(lambda i: infoList[i] == scriptBlock[i%10], range(len(infoList)))))
+    return [len(infoList), ok, ""]
+
+def benchMaterial(n):
+    gan = Elasticity.loadMaterial("GaN")
+    algan = Elasticity.loadMaterial("Al25%GaN")
+    ok = True
+    for i in range(n):
+        t = 300.0 + i%700
+        ok = ok and gan.getYoungsModulus(t) == 320*Unit.GPa and gan.getPoissonsRatio(t) == 0.25
+        algan.getYoungsModulus(t)
+    ok = ok and abs(gan.getLattice(300) - 3.189) < 1e-12
+    return [3*n, ok, ""]
+
+def benchSaveResult(n):
+    random.seed(0)
+    structure = Elasticity.Structure.fromLayerList(layerRecords(n))
+    for layer in structure.layerStack: layer.setForceAndReciprocalOfRadius(0.0, 0.0)
+    result = [[300.0, float('inf'), 0.0, structure.stress(), structure.strain()]]
+    rows = len(result[0][3])
+    Misc.saveResult(result, "benchmark")
+    filename = Misc.outputFilename("benchmark")
+    with open(filename) as fileObj:
+        lineList = fileObj.readlines()
+    os.remove(filename)
+    # header, then T, R and the stress of the bottom sampling point
+    first = lineList[1].split(",")
+    ok = (len(lineList) == rows + 1 and lineList[0].startswith("T(K),R(m),") and\
+          float(first[0]) == 300.0 and float(first[1]) == float('inf') and float(first[4]) == 0.0 and\
+          all(map(lambda line: len(line.split(",")) == len(first), lineList[1:])))
+    return [rows, ok, ""]
+
+def benchStartUp(n):
+    ''' n runs of a short job, each in a new process, the median within startUpBudget '''
+    packageDir = os.path.dirname(os.path.realpath(__file__))
+    secondsList = []
+    for i in range(n + 1):
+        startTime = time.perf_counter()
+        done = subprocess.run([sys.executable] + startUpArgs, cwd = packageDir,\
+                              stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+        # the first run writes bytecode and the material snapshot
+        if(i > 0): secondsList.append(time.perf_counter() - startTime)
+    filename = Misc.outputFilename("_".join(startUpArgs[2:]))
+    with open(filename) as fileObj:
+        header = fileObj.readline()
+    os.remove(filename)
+    median = statistics.median(secondsList)
+    ok = (done.returncode == 0 and header.startswith("T(K),R(m),") and median <= startUpBudget)
+    return [n, ok, "median " + str(round(median, 4)) + " s, budget " + str(startUpBudget) + " s"]
+
+def checkReference():
+    ''' record of the fixed script against its stored R and top stress, run once, not timed '''
+    structure = Elasticity.Structure(referenceScript)
+    rlt = structure.rampTemperature(*referenceRamp)
+    [radius, stress] = [rlt[-1][1]/Unit.length["m"], rlt[-1][3][-1][1]/Unit.GPa]
+    ok = all(map(lambda pair: abs(pair[0] - pair[1]) <= referenceTolerance*abs(pair[1]),\
+                 [[radius, referenceResult[0]], [stress, referenceResult[1]]]))
+    note = referenceScript + " R " + str(radius) + " m, top stress " + str(stress) + " GPa"
+    print("reference", "ok" if ok else "FAILED", note)
+    return {"name": "reference " + referenceScript, "sizes": [], "seconds": [], "throughput": [],\
+            "checks": [ok], "notes": [note], "exponent": None}
+
+# name, function, default max number of layers
+benchList = [
+    ["Equation.buildEq", benchBuildEq, 1000],
+    ["Solver.LinearEq.solve", benchSolve, 100],
+    ["Structure.run", benchRun, 20],
+    ["rampTemperature(2 steps)", rampBench(2), 20],
+    ["rampTemperature(10 steps)", rampBench(10), 20],
+    ["rampTemperature(50 steps)", rampBench(50), 20],
+    ["Parser.run", benchParser, 100000],
+    ["Material lookup", benchMaterial, 100000],
+    ["Misc.saveResult", benchSaveResult, 10000],
+    ["Main.py start-up", benchStartUp, 10],
+]
+
+#########################################################
+
+def scalingExponent(nList, secondsList):
+    ''' slope of log(seconds) against log(n), least squares, None below three sizes over a decade '''
+    if(len(nList) < 3 or max(nList) < 10*min(nList)): return None
+    xList = list(map(math.log, nList))
+    yList = list(map(lambda t: math.log(max(t, 1e-9)), secondsList))
+    [xm, ym] = [sum(xList)/len(xList), sum(yList)/len(yList)]
+    sxx = sum(map(lambda x: (x - xm)**2, xList))
+    sxy = sum(map(lambda i: (xList[i] - xm)*(yList[i] - ym), range(len(xList))))
+    return sxy/sxx
+
+def benchSizes(maxLayers):
+    ''' sizes of sizeList up to maxLayers, or maxLayers/10, its geometric mean with maxLayers
+        and maxLayers if fewer than three, a stack has at least two layers '''
+    nList = list(filter(lambda n: n <= maxLayers, sizeList))
+    if(len(nList) < 3):
+        nList = sorted(set(map(lambda n: max(2, int(round(n))),\
+                               [maxLayers/10.0, maxLayers/10.0**0.5, maxLayers])))
+    return nList
+
+def runBench(name, func, maxLayers):
+    rec = {"name": name, "sizes": [], "seconds": [], "throughput": [], "checks": [], "notes": []}
+    for n in benchSizes(maxLayers):
+        startTime = time.perf_counter()
+        [items, ok, note] = func(n)
+        seconds = time.perf_counter() - startTime
+        rec["sizes"].append(n)
+        rec["seconds"].append(seconds)
+        rec["throughput"].append(items/max(seconds, 1e-9))
+        rec["checks"].append(ok)
+        rec["notes"].append(note)
+        print(name, n, "layers", round(seconds, 6), "s", "ok" if ok else "FAILED", note)
+    rec["exponent"] = scalingExponent(rec["sizes"], rec["seconds"])
+    return rec
+
+def run(maxLayers = None):
+    ''' [record of each benchmark], maxLayers overrides the default limits '''
+    recList = []
+    for [name, func, defaultMax] in benchList:
+        limit = defaultMax
+        if maxLayers is not None: limit = maxLayers
+        recList.append(runBench(name, func, limit))
+    recList.append(checkReference())
+    return recList
+
+def compare(recList, previousList):
+    ''' ratio of time at the largest common size, > 1 means slower than before '''
+    previousDict = dict(map(lambda rec: [rec["name"], rec], previousList))
+    for rec in recList:
+        if(not rec["name"] in previousDict): continue
+        old = previousDict[rec["name"]]
+        common = list(filter(lambda n: n in old["sizes"], rec["sizes"]))
+        if(not len(common)): continue
+        n = common[-1]
+        ratio = rec["seconds"][rec["sizes"].index(n)]/max(old["seconds"][old["sizes"].index(n)], 1e-9)
+        print(rec["name"], n, "layers, time ratio to previous", round(ratio, 3))
+
+if __name__ == "__main__":
+    maxLayers = None
+    if(len(sys.argv) > 1 and sys.argv[1] != "default"): maxLayers = int(sys.argv[1])
+    outName = Misc.outputFilename("benchmark", ".json")
+    if(len(sys.argv) > 2): outName = sys.argv[2]
+    previousList = None
+    if(len(sys.argv) > 3):
+        with open(sys.argv[3]) as fileObj:
+            previousList = json.load(fileObj)["benchmarks"]
+    recList = run(maxLayers)
+    for rec in filter(lambda rec: len(rec["sizes"]), recList):
+        print(rec["name"], "scaling exponent", rec["exponent"])
+    report = {"python": sys.version, "time": time.strftime("%Y-%m-%d %H:%M:%S"), "benchmarks": recList}
+    with open(outName, "w") as fileObj:
+        json.dump(report, fileObj, indent = 1)
+    print("saved", outName)
+    if previousList is not None:
+        compare(recList, previousList)
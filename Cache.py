@@ -0,0 +1,141 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' persistent result cache, keyed by content
+    key = hash of the expanded layer list, every material data file involved,
+          the method with its temperature arguments, the large deflection mode,
+          and the source of the solver
+    value = result of Structure.statusquo() or Structure.rampTemperature()
+    entries are JSON files, least recently used ones are removed beyond the size limit
+'''
+
+import os, os.path, json, hashlib
+import Elasticity
+
+packageDir = os.path.dirname(os.path.realpath(__file__))
+# modules whose change invalidates every entry
+codeModuleList = ["Elasticity", "Equation", "Solver", "Newton", "Misc", "Parser", "Unit",\
+                  "LargeDeflection"]
+codeVersionHash = None
+
+def codeVersion():
+    ''' hash of the source of the solver, computed once per process '''
+    global codeVersionHash
+    if codeVersionHash is None:
+        sha = hashlib.sha256()
+        for name in codeModuleList:
+            with open(os.path.join(packageDir, name + ".py"), "rb") as fileObj:
+                sha.update(fileObj.read())
+        codeVersionHash = sha.hexdigest()
+    return codeVersionHash
+
+def materialFileList(structure):
+    ''' data files of all materials in a structure, including alloy boundaries '''
+    nameList = []
+    materialList = list(structure.matDict.values())
+    while(len(materialList)):
+        material = materialList.pop()
+        moduleName = Elasticity.Material.getABCofAxBC(material.name)
+        if(not moduleName in nameList): nameList.append(moduleName)
+        materialList.extend(map(lambda bd: bd[1], material.boundary))
+    nameList.sort()
+    return list(map(lambda name: os.path.join(packageDir, "material", name + ".py"), nameList))
+
+
+class ResultCache:
+    def __init__(self, directory = None, maxBytes = 256*1024*1024):
+        if directory is None: directory = os.path.join(packageDir, "cache")
+        self.directory = directory
+        self.maxBytes = maxBytes
+        # material file contents are read once per cache instance
+        self.fileHashDict = {}
+
+    def fileHash(self, filename):
+        if(not filename in self.fileHashDict):
+            with open(filename, "rb") as fileObj:
+                self.fileHashDict[filename] = hashlib.sha256(fileObj.read()).hexdigest()
+        return self.fileHashDict[filename]
+
+    def key(self, structure, method, args):
+        ''' hex digest for structure.method(*args) '''
+        sha = hashlib.sha256()
+        sha.update(codeVersion().encode())
+        sha.update(json.dumps(structure.layerInfoList).encode())
+        for filename in materialFileList(structure):
+            sha.update(self.fileHash(filename).encode())
+        sha.update(json.dumps([method, list(map(float, args))]).encode())
+        if structure.largeDeflection is not None:
+            sha.update(b"largeDeflection")
+        return sha.hexdigest()
+
+    def entryFilename(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        ''' result or None, a hit marks the entry as recently used '''
+        filename = self.entryFilename(key)
+        try:
+            with open(filename) as fileObj:
+                result = json.load(fileObj)
+        except (OSError, ValueError):
+            return None
+        os.utime(filename)
+        return result
+
+    def put(self, key, result):
+        ''' store before Misc.saveResult, which scales the result in place '''
+        os.makedirs(self.directory, exist_ok = True)
+        filename = self.entryFilename(key)
+        with open(filename + ".tmp", "w") as fileObj:
+            json.dump(result, fileObj)
+        os.replace(filename + ".tmp", filename)
+        self.evict()
+
+    def entryList(self):
+        ''' [[filename, bytes, last use], etc], least recently used first '''
+        if(not os.path.isdir(self.directory)): return []
+        entryList = []
+        for name in os.listdir(self.directory):
+            if(not name.endswith(".json")): continue
+            filename = os.path.join(self.directory, name)
+            stat = os.stat(filename)
+            entryList.append([filename, stat.st_size, stat.st_mtime])
+        entryList.sort(key = lambda entry: entry[2])
+        return entryList
+
+    def evict(self):
+        entryList = self.entryList()
+        total = sum(map(lambda entry: entry[1], entryList))
+        while(total > self.maxBytes and len(entryList)):
+            [filename, size, lastUse] = entryList.pop(0)
+            os.remove(filename)
+            total -= size
+
+    def clear(self):
+        for entry in self.entryList():
+            os.remove(entry[0])
+
+    def run(self, structure, method, *args):
+        ''' cached structure.method(*args), method is "statusquo" or "rampTemperature" '''
+        key = self.key(structure, method, args)
+        result = self.get(key)
+        if result is None:
+            # the types of a hit, lists for tuples, without reading back an entry that may be evicted
+            result = json.loads(json.dumps(getattr(structure, method)(*args)))
+            self.put(key, result)
+        return result
+
+
+if __name__ == "__main__":
+    import time
+    cache = ResultCache()
+    structure = Elasticity.Structure("GaNOnSapph")
+    print(materialFileList(structure))
+    for i in range(2):
+        startTime = time.perf_counter()
+        result = cache.run(structure, "rampTemperature", 1000, 300, 5)
+        print("radius", result[-1][1], "in", time.perf_counter() - startTime, "s")
+    cache.clear()
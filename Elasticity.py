@@ -10,8 +10,9 @@
     thermal mismatch is caused by temperature deviation from intial temperature
 '''
 
-import re, copy
-import Misc, Parser, Unit, Equation, Solver, Newton
+import re, copy, time
+import Misc, Unit, Monitor, Profile, MaterialData
+# Parser, Equation, Solver and Newton are imported where they are used, for a short start-up
 
 class Material:
     ''' material elastic parameters '''
@@ -20,6 +21,8 @@ class Material:
         self.dataModule = None
         self.interpolationFlag = False
         self.boundary = []
+        # lattice at a temperature, integration of expansion is the costly lookup
+        self.latticeCache = {}
         self.importDataModule()
         self.temperature = self.roomTemperature()
 
@@ -38,6 +41,18 @@ class Material:
     def getABCofAxBC(name = "A25%BC"):
         return re.sub("([0-9]{2}\%)", "", name)
 
+    @staticmethod
+    def isGradedName(name = "A25%05%BC"):
+        ''' linearly graded layer from Ax2%BC at bottom to Ax1%BC at top '''
+        return len(re.findall("[0-9]{2}%", name)) == 2
+
+    @staticmethod
+    def splitGradedName(name = "A25%05%BC"):
+        ''' A25%05%BC => [A25%BC, A05%BC], i.e. [top, bottom] '''
+        [x1, x2] = re.findall("([0-9]{2})%", name)
+        labelList = re.split("[0-9]{2}%[0-9]{2}%", name)
+        return [labelList[0] + x1 + "%" + labelList[1], labelList[0] + x2 + "%" + labelList[1]]
+
     @staticmethod
     def interpolateSect(x1, y1, x2, y2, x):
         return ((x - x1)*y2 + (x2 - x)*y1)/(x2-x1)
@@ -49,14 +64,11 @@ class Material:
         self.boundary[1][1] = Material(self.dataModule.boundary[1][1])
 
     def importDataModule(self):
-        ''' parameter file is imported as python module '''
+        ''' parameters of the material file, from the compiled snapshot of MaterialData '''
         moduleName = self.getABCofAxBC(self.name)
         if not Misc.queryMaterialModule(moduleName):
             raise Exception("Material " + self.name + " is not supported!")
-        fullModuleName = Misc.materialModuleName(moduleName)
-        localName = moduleName + "DataModule"
-        exec("import " + fullModuleName + " as " + localName)
-        self.dataModule =locals()[localName]
+        self.dataModule = MaterialData.load(moduleName)
         if("boundary" in dir(self.dataModule)):
             self.interpolationFlag = True
             self.setBoundary()
@@ -69,14 +81,19 @@ class Material:
     def getLattice(self, temp = None):
         t = self.temperature
         if isinstance(temp, float) or isinstance(temp,int): t = temp
+        if t in self.latticeCache:
+            return self.latticeCache[t]
         if self.interpolationFlag:
-            return self.interpolateSect(\
+            lattice = self.interpolateSect(\
                 self.boundary[0][0], self.boundary[0][1].getLattice(t),\
                 self.boundary[1][0], self.boundary[1][1].getLattice(t),\
                 self.getXofAxBC(self.name))
-        expansionRatio = Misc.linearIntegrate(\
-            self.dataModule.thermalExpansionCoefficient, self.roomTemperature(), t) 
-        return self.dataModule.lattice300K * (1.0 + expansionRatio)
+        else:
+            expansionRatio = Misc.linearIntegrate(\
+                self.dataModule.thermalExpansionCoefficient, self.roomTemperature(), t) 
+            lattice = self.dataModule.lattice300K * (1.0 + expansionRatio)
+        self.latticeCache[t] = lattice
+        return lattice
 
     def getLattice300K(self):
         return self.getLattice(300)
@@ -116,6 +133,24 @@ class Material:
                 self.getXofAxBC(self.name))
         return self.dataModule.growthTemperature
 
+    def getSpontaneousPolarization(self):
+        ''' z component, along the growth direction, C/cm2 '''
+        if self.interpolationFlag:
+            return self.interpolateSect(\
+                self.boundary[0][0], self.boundary[0][1].getSpontaneousPolarization(),\
+                self.boundary[1][0], self.boundary[1][1].getSpontaneousPolarization(),\
+                self.getXofAxBC(self.name))
+        return self.dataModule.spontaneousPolarization[2]
+
+    def getPiezoElectricCoefficient(self):
+        ''' pz = coeff * uxx under biaxial strain, C/cm2 '''
+        if self.interpolationFlag:
+            return self.interpolateSect(\
+                self.boundary[0][0], self.boundary[0][1].getPiezoElectricCoefficient(),\
+                self.boundary[1][0], self.boundary[1][1].getPiezoElectricCoefficient(),\
+                self.getXofAxBC(self.name))
+        return self.dataModule.piezoElectricStrainCoefficient
+
 
 class Layer:
     ''' layer properties '''
@@ -146,6 +181,12 @@ class Layer:
         newLayer.reciprocalOfRadius = self.reciprocalOfRadius
         return newLayer
 
+    def getBottomMaterial(self):
+        return self.material
+
+    def getTopMaterial(self):
+        return self.material
+
     def setForceAndReciprocalOfRadius(self, f, r):
         ''' must called before getting stress or strain info '''
         self.force = f
@@ -174,33 +215,183 @@ class Layer:
                  self.thickness**3 * biaxialYoung / 48 * self.reciprocalOfRadius**2
         return energy
 
+    def getPolarization(self, x):
+        ''' [piezoelectric, spontaneous + piezoelectric] polarization along z at x, C/cm2 '''
+        piezo = self.material.getPiezoElectricCoefficient()*self.getStrain(x)
+        return [piezo, self.material.getSpontaneousPolarization() + piezo]
+
+class GradedLayer(Layer):
+    ''' linearly graded layer, modulus and lattice vary linearly from bottom to top '''
+    def __init__(self, topMaterial, bottomMaterial, thickness = 0.0, relaxationRatio = 0.0):
+        Layer.__init__(self, topMaterial, thickness, relaxationRatio)
+        self.bottomMaterial = bottomMaterial
+        self.growthTemperature = (topMaterial.getGrowthTemperature() +\
+                                  bottomMaterial.getGrowthTemperature())/2.0
+        self.name = Material.getABCofAxBC(topMaterial.name) + "[" + topMaterial.name + "~" +\
+            bottomMaterial.name + "](" + str(self.thickness/Unit.length["um"]) + ")"
+        # [biaxial young at bottom, biaxial young at top, mismatch strain per length]
+        self.grading = None
+
+    def getBottomMaterial(self):
+        return self.bottomMaterial
+
+    def getTopMaterial(self):
+        return self.material
+
+    def copy(self):
+        newLayer = GradedLayer(self.material, self.bottomMaterial, self.thickness,\
+                               self.bottomInterfaceRelax)
+        newLayer.growthTemperature = self.growthTemperature
+        newLayer.force = self.force
+        newLayer.reciprocalOfRadius = self.reciprocalOfRadius
+        newLayer.grading = self.grading
+        return newLayer
+
+    def setGrading(self, tempBegin, tempEnd, topTempEnd = None):
+        ''' moduli at tempEnd, built-in gradient of lattice (locked at tempBegin) and thermal mismatch
+            under a temperature gradient the top ends at topTempEnd, a layer of one material
+            then has the gradient of its free thermal strain alone '''
+        if topTempEnd is None: topTempEnd = tempEnd
+        [top, bot] = [self.material, self.bottomMaterial]
+        youngBot = bot.getYoungsModulus(tempEnd)/(1.0 - bot.getPoissonsRatio(tempEnd))
+        youngTop = top.getYoungsModulus(topTempEnd)/(1.0 - top.getPoissonsRatio(topTempEnd))
+        [botLattice, topLattice] = [bot.getLattice(tempBegin), top.getLattice(tempBegin)]
+        mismatch = (topLattice - botLattice)/((topLattice + botLattice)/2.0) +\
+            top.getThermalExpansion(tempBegin, topTempEnd) - bot.getThermalExpansion(tempBegin, tempEnd)
+        self.grading = [youngBot, youngTop, mismatch/self.thickness]
+        return self.grading
+
+    def getBiaxialYoung(self, x):
+        [youngBot, youngTop] = self.grading[0:2]
+        return youngBot + (youngTop - youngBot)*x/self.thickness
+
+    def getStrain(self, x):
+        ''' s(x) = s0 + (r - g)*x, with f = s0*A0 + (r - g)*A1, as thin sublayers, see getStrainEnergy '''
+        if(self.force == None or self.reciprocalOfRadius == None or self.grading == None):
+            raise Exception("Layer not set for stress and strain!")
+        if(x<0 or x>self.thickness*(1+1e-8)):
+            raise Exception("Position is outside of a layer!")
+        import Equation
+        [a0, a1, a2] = Equation.elementMoments(self.grading[0], self.grading[1], self.thickness)
+        slope = self.reciprocalOfRadius - self.grading[2]
+        return (self.force - slope*a1)/a0 + slope*x
+
+    def getStress(self, x):
+        return self.getBiaxialYoung(x)*self.getStrain(x)
+
+    def getStrainEnergy(self):
+        ''' Integrate[E(x)*s(x)^2, {x, 0, thick}], the limit of Layer.getStrainEnergy summed over
+            thin sublayers, their own bending terms go with thick^3 and vanish, the strain
+            s(x) follows the interface eqs between them, so its slope is (r - g), not r/2 '''
+        import Equation
+        [a0, a1, a2] = Equation.elementMoments(self.grading[0], self.grading[1], self.thickness)
+        slope = self.reciprocalOfRadius - self.grading[2]
+        s0 = (self.force - slope*a1)/a0
+        return s0**2*a0 + 2.0*s0*slope*a1 + slope**2*a2
+
+    def getPolarization(self, x):
+        ''' as Layer, coefficients vary linearly from bottom to top '''
+        [top, bot] = [self.material, self.bottomMaterial]
+        ratio = x/self.thickness
+        coeff = bot.getPiezoElectricCoefficient()*(1.0 - ratio) + top.getPiezoElectricCoefficient()*ratio
+        spontaneous = bot.getSpontaneousPolarization()*(1.0 - ratio) + top.getSpontaneousPolarization()*ratio
+        piezo = coeff*self.getStrain(x)
+        return [piezo, spontaneous + piezo]
+
+
+# materials shared by structures, loaded once per name
+materialCache = {}
+
+def loadMaterial(name):
+    ''' shared Material instance, Structure does not change material temperature '''
+    name = name.strip()
+    if(not name in materialCache):
+        materialCache[name] = Material(name)
+    return materialCache[name]
+
+
 class Structure:
-    def __init__(self, script):
+    ''' stack from a script name, a script string, or [[matName, d, r], etc] (top first) '''
+    def __init__(self, script = "<stack>", layerInfoList = None, scriptText = None):
         self.layerInfoList = []
         self.matDict = None
         self.layerStack = []
         self.script = script
-        self.buildStruct()
+        # LargeDeflection instance, None for the linear eqs of Equation
+        self.largeDeflection = None
+        self.buildStruct(layerInfoList, scriptText)
+
+    @classmethod
+    def fromString(cls, scriptText, name = "<string>"):
+        ''' build from script syntax in memory, no script file is read '''
+        return cls(name, scriptText = scriptText)
+
+    @classmethod
+    def fromLayerList(cls, layerInfoList, name = "<stack>"):
+        ''' build from [[matName, d, r], etc] or (matName, d), top layer first, d in nm or with unit '''
+        return cls(name, layerInfoList = layerInfoList)
+
+    def setLargeDeflection(self, flag = True):
+        ''' solve the nonlinear eqs when R is comparable to the thickness, see LargeDeflection '''
+        self.largeDeflection = None
+        if flag:
+            import LargeDeflection
+            self.largeDeflection = LargeDeflection.LargeDeflection()
 
-    def buildStruct(self):
+    @staticmethod
+    def checkLayerInfoList(layerInfoList):
+        ''' records => [[matName, d, r], etc], relax is 0.0 if omitted '''
+        infoList = []
+        for record in layerInfoList:
+            if(len(record) not in [2, 3]):
+                raise Exception("Invalid layer record " + str(record))
+            thickness = record[1]
+            if(isinstance(thickness, str)):
+                import Parser
+                thickness = Parser.Parser().parseThicknessWithUnit(thickness)
+            if(float(thickness) <= 0.0):
+                raise Exception("Invalid layer thickness " + str(record))
+            relax = 0.0
+            if(len(record) == 3): relax = float(record[2])
+            infoList.append([record[0].strip(), float(thickness), relax])
+        return infoList
+
+    def buildStruct(self, layerInfoList = None, scriptText = None):
         ''' The struct is a list of Layer instances as [layer1, layer2, etc]  '''
-        parser = Parser.Parser()
-        self.layerInfoList = parser.run(self.script)
+        with Profile.phase("parse"):
+            if(layerInfoList is not None):
+                self.layerInfoList = self.checkLayerInfoList(layerInfoList)
+            elif(scriptText is not None):
+                import Parser
+                self.layerInfoList = Parser.Parser().parseLines(scriptText.splitlines(), self.script)
+            else:
+                import Parser
+                self.layerInfoList = Parser.Parser().run(self.script)
         self.layerInfoList.reverse()
         # unique material names
         materialNameList = []
         for layer in self.layerInfoList:
-            if(not layer[0] in materialNameList):
-                materialNameList.append(layer[0])
+            nameList = [layer[0]]
+            if(Material.isGradedName(layer[0])):
+                nameList = Material.splitGradedName(layer[0])
+            for name in nameList:
+                if(not name in materialNameList):
+                    materialNameList.append(name)
         # unique material instances
         materialDict = []
-        for name in materialNameList:
-            materialDict.append([name, Material(name)]) # instantialize Material
+        with Profile.phase("materials"):
+            for name in materialNameList:
+                materialDict.append([name, loadMaterial(name)]) # instantialize Material
         self.matDict = dict(materialDict)
         # create struct as Layer instances from self.layerInfoList
         self.layerStack = []
         # instantialize Layers
         for layer in self.layerInfoList:
+            if(Material.isGradedName(layer[0])):
+                [top, bot] = Material.splitGradedName(layer[0])
+                self.layerStack.append(GradedLayer(self.matDict[top], self.matDict[bot],\
+                                                   layer[1], layer[2]))
+                continue
             self.layerStack.append(Layer(self.matDict[layer[0]], layer[1], layer[2]))
         return self.layerInfoList
 
@@ -227,6 +418,20 @@ class Structure:
         func = lambda i, x: self.layerStack[i].getStrain(x)
         return self.sampling(func)
 
+    def polarization(self):
+        ''' [[x of the layer bottom, piezo P, total P, sheet charge at x, name], etc] and the top surface
+            P at the mean strain of a layer, C/cm2, along z from the bottom of the stack
+            bound sheet charge = P below - P above, with the strain of each side of the interface '''
+        polarDist = []
+        [height, below] = [0.0, 0.0]
+        for layer in self.layerStack:
+            [piezo, total] = layer.getPolarization(layer.thickness/2.0)
+            polarDist.append([height, piezo, total, below - layer.getPolarization(0.0)[1], layer.name])
+            below = layer.getPolarization(layer.thickness)[1]
+            height += layer.thickness
+        polarDist.append([height, 0.0, 0.0, below, "surface"])
+        return polarDist
+
     @staticmethod
     def latticeMismatchStrain(botLayer, topLayer, temp = Material.roomTemperature()):
         ''' top - bot, at given temperature '''
@@ -234,23 +439,55 @@ class Structure:
         # (a2 - a0)/a0 - (a1 - a0)/a0 = (a2 - a1)/a0 ~ (a2 - a1)/a2 ~ (a2 - a1)/a1
         # dilemma: AlN/GaN is different from GaN/AlN
         # to resolve the issue, use (a1 + a2)/2 as denominator
-        botLattice = botLayer.material.getLattice(temp)
-        topLattice = topLayer.material.getLattice(temp)
+        botLattice = botLayer.getTopMaterial().getLattice(temp)
+        topLattice = topLayer.getBottomMaterial().getLattice(temp)
         denominator = (topLattice + botLattice)/2.0 
         mismatch = (topLattice - botLattice)/denominator * (1.0 - topLayer.bottomInterfaceRelax)
         return mismatch
 
     @staticmethod
-    def thermalMismatchStrain(botLayer, topLayer, tempBegin, tempEnd):
+    def thermalMismatchStrain(botLayer, topLayer, tempBegin, tempEnd, topTempEnd = None):
         ''' top - bot, at given temperatures, their difference matters '''
         # thermal mismatch is difference in expansion ratio
-        botExpansion = botLayer.material.getThermalExpansion(tempBegin, tempEnd)
-        topExpansion = topLayer.material.getThermalExpansion(tempBegin, tempEnd)
+        # under a temperature gradient the top layer ends at its own temperature
+        if topTempEnd is None: topTempEnd = tempEnd
+        botExpansion = botLayer.getTopMaterial().getThermalExpansion(tempBegin, tempEnd)
+        topExpansion = topLayer.getBottomMaterial().getThermalExpansion(tempBegin, topTempEnd)
         mismatch = topExpansion - botExpansion
         return mismatch
 
+    @staticmethod
+    def profileFunc(profile):
+        ''' [[height from the bottom of the stack in nm, T], etc] or T(height) into T(height) '''
+        if(callable(profile)): return profile
+        points = list(map(lambda p: [float(p[0]), float(p[1])], profile))
+        return lambda height: Misc.linearInterpolate(points, height)
+
+    def layerTemperatures(self, profile):
+        ''' temperature of each layer, bottom first, at its mid height '''
+        profile = self.profileFunc(profile)
+        tempList = []
+        height = 0.0
+        for layer in self.layerStack:
+            tempList.append(profile(height + layer.thickness/2.0))
+            height += layer.thickness
+        return tempList
+
+    def layerFaceTemperatures(self, profile):
+        ''' [T at the bottom, T at the top] of each layer, bottom first '''
+        profile = self.profileFunc(profile)
+        tempList = []
+        height = 0.0
+        for layer in self.layerStack:
+            tempList.append([profile(height), profile(height + layer.thickness)])
+            height += layer.thickness
+        return tempList
+
     def getEqParameters(self, tempBegin, tempEnd):
+        ''' tempEnd is a temperature, or a list of them for each layer, bottom first '''
         numOfLayers = len(self.layerStack) 
+        if isinstance(tempEnd, (list, tuple)):
+            return self.getEqParametersOfLayers(tempBegin, list(tempEnd))
         # get the values at tempEnd
         youngList = list(map(lambda i: self.layerStack[i].material.getYoungsModulus(tempEnd),\
             range(numOfLayers)))
@@ -258,26 +495,108 @@ class Structure:
             range(numOfLayers)))
         # biaxial modulus E' = E/(1-v), where E is uniaxial Young's modulus, v is Poisson's ratio
         for i in range(numOfLayers): youngList[i] *= 1.0/(1 - poissonList[i]) 
+        # graded layers are kept as single elements, with closed-form integrals
+        gradedList = None
+        for i in range(numOfLayers):
+            if(not isinstance(self.layerStack[i], GradedLayer)): continue
+            if(gradedList is None): gradedList = [None]*numOfLayers
+            gradedList[i] = self.layerStack[i].setGrading(tempBegin, tempEnd)
+            youngList[i] = (gradedList[i][0] + gradedList[i][1])/2.0
         # thickness of each layer
         thickList = list(map(lambda i: self.layerStack[i].thickness, range(numOfLayers)))
         # mismatch strain = lattice mismatch * (1 - relax) + thermal mismatch 
         # due to relax, thermal and lattice mismatch need to consider independently
         mismatchStrainList = [0.0]*numOfLayers
-        print("\ninterface, bottom, top, lattice Mismatch, thermal mismatch")
+        report = Monitor.active("interface")
+        if Monitor.active("eqParameters"):
+            Monitor.emit("eqParameters", tempBegin = tempBegin, tempEnd = tempEnd,\
+                         numOfLayers = numOfLayers)
         for i in range(numOfLayers - 1):
             lm = self.latticeMismatchStrain(self.layerStack[i], self.layerStack[i+1], tempBegin)
             tm = self.thermalMismatchStrain(self.layerStack[i], self.layerStack[i+1], tempBegin, tempEnd)
             mismatchStrainList[i] = lm + tm # the i-th interface
-            print(i, self.layerStack[i].name, self.layerStack[i+1].name, lm, tm)
-        return [numOfLayers, youngList, thickList, mismatchStrainList]
+            if report:
+                Monitor.emit("interface", index = i, bottom = self.layerStack[i].name,\
+                             top = self.layerStack[i+1].name, latticeMismatch = lm,\
+                             thermalMismatch = tm)
+        return [numOfLayers, youngList, thickList, mismatchStrainList, gradedList]
+
+    def getEqParametersOfLayers(self, tempBegin, tempList):
+        ''' as getEqParameters, each layer at its own temperature of tempList,
+            or at [T at the bottom, T at the top], a graded layer then takes both,
+            a uniform layer takes the mean, see runProfile for the gradient within it '''
+        numOfLayers = len(self.layerStack)
+        if(len(tempList) != numOfLayers):
+            raise Exception("Need a temperature for each of the " + str(numOfLayers) + " layers")
+        faceList = list(map(lambda t: list(t) if isinstance(t, (list, tuple)) else [t, t], tempList))
+        tempList = list(map(lambda face: (face[0] + face[1])/2.0 if face[0] != face[1] else face[0],\
+                            faceList))
+        # one lookup for each material and temperature, shared by the layers
+        table = {}
+        for i in range(numOfLayers):
+            material = self.layerStack[i].material
+            key = (material.name, tempList[i])
+            if(not key in table):
+                table[key] = material.getYoungsModulus(tempList[i])/\
+                    (1.0 - material.getPoissonsRatio(tempList[i]))
+        youngList = list(map(lambda i: table[(self.layerStack[i].material.name, tempList[i])],\
+            range(numOfLayers)))
+        gradedList = None
+        for i in range(numOfLayers):
+            if(not isinstance(self.layerStack[i], GradedLayer)): continue
+            if(gradedList is None): gradedList = [None]*numOfLayers
+            gradedList[i] = self.layerStack[i].setGrading(tempBegin, faceList[i][0], faceList[i][1])
+            youngList[i] = (gradedList[i][0] + gradedList[i][1])/2.0
+        thickList = list(map(lambda i: self.layerStack[i].thickness, range(numOfLayers)))
+        mismatchStrainList = [0.0]*numOfLayers
+        report = Monitor.active("interface")
+        if Monitor.active("eqParameters"):
+            Monitor.emit("eqParameters", tempBegin = tempBegin, tempEnd = tempList,\
+                         numOfLayers = numOfLayers)
+        for i in range(numOfLayers - 1):
+            lm = self.latticeMismatchStrain(self.layerStack[i], self.layerStack[i+1], tempBegin)
+            # the free strain of each layer at its own temperature at the interface
+            tm = self.thermalMismatchStrain(self.layerStack[i], self.layerStack[i+1], tempBegin,\
+                                            faceList[i][1], faceList[i+1][0])
+            mismatchStrainList[i] = lm + tm
+            if report:
+                Monitor.emit("interface", index = i, bottom = self.layerStack[i].name,\
+                             top = self.layerStack[i+1].name, latticeMismatch = lm,\
+                             thermalMismatch = tm)
+        return [numOfLayers, youngList, thickList, mismatchStrainList, gradedList]
+
+    def runProfile(self, tempBegin, profile):
+        ''' [T at the top, radius, neutralPlanePos, stressDist, strainDist, polarDist] under a temperature profile
+            a uniform layer the profile varies across is solved as a graded layer of its material,
+            whose free thermal strain varies linearly from bottom to top, the limit of thin slices,
+            the layer stack is restored after the run '''
+        faceList = self.layerFaceTemperatures(profile)
+        savedStack = self.layerStack
+        stack = []
+        for i in range(len(savedStack)):
+            layer = savedStack[i]
+            if(faceList[i][0] != faceList[i][1] and not isinstance(layer, GradedLayer)):
+                graded = GradedLayer(layer.material, layer.material, layer.thickness, layer.bottomInterfaceRelax)
+                graded.growthTemperature = layer.growthTemperature
+                graded.name = layer.name
+                layer = graded
+            stack.append(layer)
+        self.layerStack = stack
+        try:
+            rlt = self.run(self.getEqParameters(tempBegin, faceList))
+        finally:
+            self.layerStack = savedStack
+        return [faceList[-1][1]] + rlt
 
     def run(self, eqParams):
         ''' build eq, solve eq, set stack, obtain stress '''
+        import Equation, Solver, Newton
         # try to find neutral plane
         def strainEnergyFunc(neutralPlanePos):
-            [m, b] = Equation.buildEq(eqParams[0], eqParams[1], eqParams[2], eqParams[3],\
-                                      neutralPlanePos)
-            eq = Solver.LinearEq(m, b)
+            with Profile.phase("buildEq"):
+                [m, b] = Equation.buildEq(eqParams[0], eqParams[1], eqParams[2], eqParams[3],\
+                                          neutralPlanePos, eqParams[4])
+            eq = Solver.LinearEq(m, b, False) # inverse is not needed
             eq.solve()
             root = eq.getRoot()
             radius = float('inf')
@@ -288,27 +607,33 @@ class Structure:
                 energy += self.layerStack[i].getStrainEnergy()
             return energy
         minimizer = Newton.Min(strainEnergyFunc, 0, sum(eqParams[2]), 1e-18)
-        print("\ncomputing netrual plane")
-        optima = minimizer.run()
-        print("neutral plane found")
-        print("position, error, energy")
-        print(optima, "\n")
+        if Monitor.active("neutralPlaneSearch"): Monitor.emit("neutralPlaneSearch")
+        with Profile.phase("neutralPlaneSearch"):
+            optima = minimizer.run()
+        if Monitor.active("neutralPlane"):
+            Monitor.emit("neutralPlane", position = optima[0], error = optima[1], energy = optima[2])
         neutralPlanePos = optima[0]
         # solve the equation
-        [m, b] = Equation.buildEq(eqParams[0], eqParams[1], eqParams[2], eqParams[3],\
-                                  neutralPlanePos) 
-        eq = Solver.LinearEq(m, b)
+        with Profile.phase("buildEq"):
+            [m, b] = Equation.buildEq(eqParams[0], eqParams[1], eqParams[2], eqParams[3],\
+                                      neutralPlanePos, eqParams[4])
+        eq = Solver.LinearEq(m, b, False) # inverse is not needed
         eq.solve()
         root = eq.getRoot()
         error = eq.error()
+        if self.largeDeflection is not None:
+            with Profile.phase("largeDeflection"):
+                root = self.largeDeflection.solve(eqParams, neutralPlanePos, root)
         # save root into layers
         radius = float('inf')
         if(root[-1] != 0.0):  radius = 1.0/root[-1]
         for i in range(len(self.layerStack)):
             self.layerStack[i].setForceAndReciprocalOfRadius(root[i], 1.0/radius)
-        stressDist = self.stress()
-        strainDist = self.strain()
-        return [radius, neutralPlanePos, stressDist, strainDist]
+        with Profile.phase("sampling"):
+            stressDist = self.stress()
+            strainDist = self.strain()
+            polarDist = self.polarization()
+        return [radius, neutralPlanePos, stressDist, strainDist, polarDist]
 
     def rampTemperature(self, tempBegin, tempEnd, numOfTempSteps = 10):
         ''' generate a series of parameter set for m.x == b to cooldown or heatup '''
@@ -317,19 +642,32 @@ class Structure:
             raise Exception("Error, number of temperture steps less than 2!")
         tempStep = (tempEnd - tempBegin)/(numOfTempSteps - 1.0)
         resultList = [None]*numOfTempSteps
+        # every step starts from the correction of the previous one
+        if self.largeDeflection is not None: self.largeDeflection.reset()
         for i in range(numOfTempSteps):
             currentTemp = tempBegin + float(i)*tempStep
-            print("current temperature", currentTemp)
-            eqParameters = self.getEqParameters(tempBegin, currentTemp)
+            startTime = time.perf_counter()
+            if Monitor.active("temperatureStep"):
+                Monitor.emit("temperatureStep", index = i, temperature = currentTemp)
+            with Profile.phase("getEqParameters"):
+                eqParameters = self.getEqParameters(tempBegin, currentTemp)
             rlt = self.run(eqParameters)
+            if Monitor.active("stepDone"):
+                Monitor.emit("stepDone", index = i, temperature = currentTemp, radius = rlt[0],\
+                             neutralPlanePos = rlt[1], seconds = time.perf_counter() - startTime)
             resultList[i] = [currentTemp]
             resultList[i].extend(rlt)
-        #the result is [[temperature, radius, neutralPlanePos, stressDist, strainDist], ...]
+        #the result is [[temperature, radius, neutralPlanePos, stressDist, strainDist, polarDist], ...]
         return resultList 
 
     def statusquo(self, temp):
-        eqParameters = self.getEqParameters(temp, temp)
+        startTime = time.perf_counter()
+        with Profile.phase("getEqParameters"):
+            eqParameters = self.getEqParameters(temp, temp)
         rlt = self.run(eqParameters)
+        if Monitor.active("stepDone"):
+            Monitor.emit("stepDone", index = 0, temperature = temp, radius = rlt[0],\
+                         neutralPlanePos = rlt[1], seconds = time.perf_counter() - startTime)
         resultList = [[]]
         resultList[0] = [temp]
         resultList[0].extend(rlt)
@@ -347,6 +685,7 @@ class Structure:
 
 
 if __name__ == "__main__":
+    Monitor.verbose()
     m = Material("GaN")
     print(m.name, "data has been imported as module")
     print(dir(m.dataModule))
@@ -36,7 +36,7 @@ def forceEq(numOfLayers):
 
 # balance of moments
 # NOTE: the balanced (neutral) plane is not known, it can be found by minimizing strain energy
-def momentEq(numOfLayers, youngList, thickList, neutralPlanePos = 0):
+def momentEq(numOfLayers, youngList, thickList, neutralPlanePos = 0, gradedList = None):
     # the fomula for area moment of inertia of multilayered film from the ref may be wrong
     # think about it: a stack of GaN layers equals to a thick layer of GaN 
     if(neutralPlanePos<0 or neutralPlanePos>sum(thickList)):
@@ -45,31 +45,98 @@ def momentEq(numOfLayers, youngList, thickList, neutralPlanePos = 0):
                    range(numOfLayers)))
     # by definition, use Integrate[(y)^2, {y, d-x0, d+h-x0}] == ((d+h-x0)^3 - (d-x0)^3)/3
     # x0 is the position of neutral plane
-    coeff = sum(map(lambda i:\
-        youngList[i]*((sum(thickList[0:i+1]) - neutralPlanePos)**3.0 -\
-                      (sum(thickList[0:i])   - neutralPlanePos)**3.0), range(numOfLayers)))/3.0
+    if(gradedList is None):
+        coeff = sum(map(lambda i:\
+            youngList[i]*((sum(thickList[0:i+1]) - neutralPlanePos)**3.0 -\
+                          (sum(thickList[0:i])   - neutralPlanePos)**3.0), range(numOfLayers)))/3.0
+        row.extend([coeff])
+        return [row, 0.0]
+    # a graded layer acts at its modulus centroid, and bends by itself with (r - g)
+    # it is the limit of a stack of thin uniform layers, so a layer whose row refers
+    # to a graded layer (the one below, or the top one for layer 0) refers to its
+    # last sublayer, whose half thickness vanishes, i.e. to the bottom of this layer
+    coeff = 0.0
+    rhs = 0.0
+    for i in range(numOfLayers):
+        bottomPos = sum(thickList[0:i]) - neutralPlanePos
+        if(gradedList[i] is None):
+            coeff += youngList[i]*((bottomPos + thickList[i])**3.0 - bottomPos**3.0)/3.0
+            if(gradedList[i-1] is not None): row[i] = bottomPos
+            continue
+        [youngBot, youngTop, gradient] = gradedList[i]
+        [a0, a1, a2] = elementMoments(youngBot, youngTop, thickList[i])
+        row[i] = bottomPos + a1/a0
+        coeff += gradedMomentOfInertia(youngBot, youngTop, thickList[i], bottomPos)
+        coeff += a2 - a1**2.0/a0
+        rhs += gradient*(a2 - a1**2.0/a0)
     row.extend([coeff])
-    return [row, 0.0]
+    return [row, rhs]
 
 
 # at interface, coherence is somehow mantained
 # mismatchStrain + forceInducedStrainDiff == curvertureInducedStrainDiff
 # NOTE: i in range(numOfLayers-1)
 # double check the signs
-def interfaceEq(numOfLayers, i, youngList, thickList, mismatchStrainList):
+def interfaceEq(numOfLayers, i, youngList, thickList, mismatchStrainList, gradedList = None):
+    if(gradedList is not None and\
+       (gradedList[i] is not None or gradedList[i+1] is not None)):
+        return gradedInterfaceEq(numOfLayers, i, youngList, thickList, mismatchStrainList,\
+                                 gradedList)
     row = [0.0]*(numOfLayers + 1)
     row[i] = -1.0/(youngList[i] * thickList[i])         # force strain of i
     row[i+1] = 1.0/(youngList[i+1] * thickList[i+1])    # force strain of i+1
     row[-1] =  -1.0/2.0*(thickList[i] + thickList[i+1]) # curveture strain diff
     return [row, (0.0 - mismatchStrainList[i])]         # mismatch strain diff
 
+
+#########################################################
+# linearly graded layer kept as a single element
+# biaxial modulus E(x) and free lattice vary linearly from bottom (x = 0) to top (x = h)
+# strain s(x) = s0 + (r - g)*x, where g is the built-in mismatch strain per length
+# force f = Integrate[E(x)*s(x), {x, 0, h}] = s0*A0 + (r - g)*A1
+
+def elementMoments(youngBot, youngTop, thick):
+    ''' [A0, A1, A2], Ak = Integrate[E(x)*x^k, {x, 0, thick}] '''
+    return [thick*(youngBot + youngTop)/2.0,\
+            thick**2.0*(youngBot/6.0 + youngTop/3.0),\
+            thick**3.0*(youngBot/12.0 + youngTop/4.0)]
+
+def gradedMomentOfInertia(youngBot, youngTop, thick, bottomPos):
+    ''' Integrate[E(y)*y^2, {y, bottomPos, bottomPos + thick}], E linear in y '''
+    slope = (youngTop - youngBot)/thick
+    topPos = bottomPos + thick
+    return (youngBot - slope*bottomPos)*(topPos**3.0 - bottomPos**3.0)/3.0 +\
+           slope*(topPos**4.0 - bottomPos**4.0)/4.0
+
+def elementStrainTerms(i, youngList, thickList, gradedList):
+    ''' [A0, centroid, gradient], a uniform layer has centroid h/2 and no gradient '''
+    if(gradedList[i] is None):
+        return [youngList[i]*thickList[i], thickList[i]/2.0, 0.0]
+    [youngBot, youngTop, gradient] = gradedList[i]
+    [a0, a1, a2] = elementMoments(youngBot, youngTop, thickList[i])
+    return [a0, a1/a0, gradient]
+
+def gradedInterfaceEq(numOfLayers, i, youngList, thickList, mismatchStrainList, gradedList):
+    ''' strain at bottom of i+1 - strain at top of i == - mismatch '''
+    [a0Bot, cBot, gBot] = elementStrainTerms(i, youngList, thickList, gradedList)
+    [a0Top, cTop, gTop] = elementStrainTerms(i+1, youngList, thickList, gradedList)
+    row = [0.0]*(numOfLayers + 1)
+    row[i] = -1.0/a0Bot
+    row[i+1] = 1.0/a0Top
+    row[-1] = -(cTop + thickList[i] - cBot)
+    return [row, (0.0 - mismatchStrainList[i] - gTop*cTop - gBot*(thickList[i] - cBot))]
+
+#########################################################
+
 # m[rowNum].x = b[rowNum], return row of m and element of b
 # only valid when R >> total thickness, otherwise, it turns into nonliear eq for R
-def buildEq(numOfLayers, youngList, thickList, mismatchStrainList, neutralPlanePos = 0):
-    buf = list(map(lambda i: interfaceEq(numOfLayers, i, youngList, thickList, mismatchStrainList),\
-        range(numOfLayers-1)))
+# gradedList is None, or [youngBot, youngTop, mismatchGradient] or None per layer
+def buildEq(numOfLayers, youngList, thickList, mismatchStrainList, neutralPlanePos = 0,\
+            gradedList = None):
+    buf = list(map(lambda i: interfaceEq(numOfLayers, i, youngList, thickList,\
+        mismatchStrainList, gradedList), range(numOfLayers-1)))
     buf.extend( [forceEq(numOfLayers)] )
-    buf.extend( [momentEq(numOfLayers, youngList, thickList, neutralPlanePos)] )
+    buf.extend( [momentEq(numOfLayers, youngList, thickList, neutralPlanePos, gradedList)] )
     m = [[]]*(numOfLayers + 1)
     b = [0.0]*(numOfLayers +1)
     for i in range(numOfLayers+1):
@@ -0,0 +1,169 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' fit the relax ratio of selected layers to a measured curvature trace
+    usage:
+        fit = Fit.RelaxFit(structure, 1000, [[T0, R0], [T1, R1], etc], [0, 2])
+        [relaxList, rms] = fit.run()
+    the trace is radius in m against temperature in K, from tempBegin, as rampTemperature,
+    a flat point is R = inf, R = 0 is rejected
+    layers are indexed in script order, i.e. the top layer is 0
+    residuals are model minus measured curvature 1/R in 1/m,
+    solved by Levenberg-Marquardt with relax kept within [0, 1]
+
+    relax only changes the interface mismatch, i.e. the right hand side of Equation.buildEq,
+    so one factorization of Sensitivity serves every temperature that shares the moduli,
+    the neutral plane search costs O(n) per trial through rank one updates,
+    and the Jacobian dR/drelax comes from the adjoint of each temperature point
+'''
+
+import math
+import Unit, Elasticity, Solver, Sensitivity
+
+class RelaxFit:
+    def __init__(self, structure, tempBegin, trace, layerIdxList):
+        ''' trace is [[T(K), R(m)], etc], R = inf if flat, layerIdxList in script order '''
+        self.structure = structure
+        self.tempBegin = tempBegin
+        self.tempList = list(map(lambda p: float(p[0]), trace))
+        for p in trace:
+            if(p[1] == 0.0):
+                raise Exception("Zero radius at " + str(p[0]) + " K, a flat point is R = inf")
+        # 1/inf is a zero curvature
+        self.measuredList = list(map(lambda p: 1.0/p[1], trace))
+        n = len(structure.layerStack)
+        # stack index, bottom first
+        self.stackIdxList = []
+        for idx in layerIdxList:
+            if(idx < 0 or idx >= n - 1):
+                raise Exception("Invalid layer index " + str(idx) + ", the bottom layer has no relax")
+            self.stackIdxList.append(n - 1 - idx)
+        # factorizations shared by the temperatures
+        self.factorizations = Sensitivity.Factorizations(structure, tempBegin)
+        self.history = []
+
+    def setRelax(self, relaxList):
+        for k in range(len(relaxList)):
+            self.structure.layerStack[self.stackIdxList[k]].setBottomInterfaceRelax(relaxList[k])
+
+    def mismatchPerRelax(self):
+        ''' d mismatch/d relax of the interface below each fitted layer, lattice part only '''
+        stack = self.structure.layerStack
+        dList = []
+        for i in self.stackIdxList:
+            saved = stack[i].bottomInterfaceRelax
+            stack[i].bottomInterfaceRelax = 0.0
+            dList.append(-Elasticity.Structure.latticeMismatchStrain(stack[i-1], stack[i], self.tempBegin))
+            stack[i].bottomInterfaceRelax = saved
+        return dList
+
+    def point(self, temp, dMismatch):
+        ''' [curvature in 1/m, d curvature/d relax of each fitted layer] at a temperature '''
+        eqParams = self.structure.getEqParameters(self.tempBegin, temp)
+        sens = self.factorizations.get(eqParams)
+        n = sens.n
+        x0 = sens.minimize()[0]
+        [x, adjointSolve] = sens.shifted(x0)
+        unitLast = [0.0]*n + [1.0]
+        lam = adjointSolve(unitLast)
+        dKdx0 = sens.residualTerms(x0, x, lam)[3]
+        # x0 moves with the mismatch, dx0/dm = -G_m/G_x0
+        h = sens.step*sens.bottomList[-1]
+        [gUp, pUp] = sens.energyGradient(x0 + h)
+        [gDown, pDown] = sens.energyGradient(x0 - h)
+        gx0 = (gUp - gDown)/(2.0*h)
+        row = []
+        for k in range(len(self.stackIdxList)):
+            # the fitted layer is on top of interface i - 1
+            j = self.stackIdxList[k] - 1
+            dx0 = -(pUp[2][j] - pDown[2][j])/(2.0*h)/gx0 if gx0 > 0.0 else 0.0
+            row.append((-lam[j] + dKdx0*dx0)*dMismatch[k]*Unit.length["m"])
+        return [x[n]*Unit.length["m"], row]
+
+    def model(self, relaxList):
+        ''' [curvatures in 1/m, Jacobian rows] of all temperature points '''
+        self.setRelax(relaxList)
+        dMismatch = self.mismatchPerRelax()
+        resultList = list(map(lambda t: self.point(t, dMismatch), self.tempList))
+        return [list(map(lambda rlt: rlt[0], resultList)), list(map(lambda rlt: rlt[1], resultList))]
+
+    def residuals(self, relaxList):
+        [curvList, jacobian] = self.model(relaxList)
+        return [list(map(lambda j: curvList[j] - self.measuredList[j], range(len(curvList)))), jacobian]
+
+    def run(self, start = None, maxIter = 50, tolerance = 1e-10):
+        ''' [relax of each fitted layer, rms residual in 1/m], self.history per iteration '''
+        num = len(self.stackIdxList)
+        if start is None:
+            start = list(map(lambda i: self.structure.layerStack[i].bottomInterfaceRelax, self.stackIdxList))
+        relax = list(map(lambda v: min(1.0, max(0.0, v)), start))
+        [res, jac] = self.residuals(relax)
+        cost = sum(map(lambda v: v**2, res))
+        damping = 1e-3
+        self.history = [[0, list(relax), math.sqrt(cost/len(res)), damping]]
+        for iteration in range(1, maxIter + 1):
+            # (J^T.J + damping*diag(J^T.J)).step = -J^T.res
+            jtj = list(map(lambda a: list(map(lambda b: sum(map(lambda r: r[a]*r[b], jac)), range(num))),\
+                           range(num)))
+            jtr = list(map(lambda a: sum(map(lambda j: jac[j][a]*res[j], range(len(res)))), range(num)))
+            # a relax held at its bound by the descent stays out of the step
+            freeList = list(filter(lambda a: not ((relax[a] <= 0.0 and jtr[a] > 0.0) or\
+                                                  (relax[a] >= 1.0 and jtr[a] < 0.0)), range(num)))
+            if(not len(freeList) or max(map(lambda a: abs(jtr[a]), freeList)) == 0.0): break
+            improved = False
+            while(damping < 1e12):
+                m = list(map(lambda a: list(map(lambda b: jtj[a][b]*(1.0 + damping*(a == b)) +\
+                                                (1e-300 if a == b else 0.0), freeList)), freeList))
+                eq = Solver.LinearEq(m, list(map(lambda a: -jtr[a], freeList)), False)
+                eq.solve()
+                trial = list(relax)
+                for k in range(len(freeList)):
+                    a = freeList[k]
+                    trial[a] = min(1.0, max(0.0, relax[a] + eq.getRoot()[k]))
+                [trialRes, trialJac] = self.residuals(trial)
+                trialCost = sum(map(lambda v: v**2, trialRes))
+                if(trialCost < cost):
+                    improved = True
+                    break
+                damping *= 10.0
+            if(not improved): break
+            change = max(map(lambda a: abs(trial[a] - relax[a]), range(num)))
+            relief = (cost - trialCost)/max(cost, 1e-300)
+            [relax, res, jac, cost] = [trial, trialRes, trialJac, trialCost]
+            damping = max(damping/10.0, 1e-12)
+            self.history.append([iteration, list(relax), math.sqrt(cost/len(res)), damping])
+            if(change < tolerance or relief < tolerance): break
+        self.setRelax(relax)
+        return [relax, math.sqrt(cost/len(res))]
+
+
+if __name__ == "__main__":
+    import time
+    # a synthetic trace from known relax ratios, then fit the AlN interlayer from a wrong guess
+    records = [["GaN", 2000.0, 0.0], ["AlN", 50.0, 0.4], ["GaN", 500.0, 0.0], ["AlN", 50.0, 0.9],\
+               ["GaN", 1000.0, 0.7], ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+    structure = Elasticity.Structure.fromLayerList(records)
+    startTime = time.perf_counter()
+    trace = list(map(lambda rlt: [rlt[0], rlt[1]/Unit.length["m"]], structure.rampTemperature(1000, 300, 200)))
+    print("rampTemperature with", len(trace), "points in", time.perf_counter() - startTime, "s")
+    records[3][2] = 0.3
+    fit = RelaxFit(Elasticity.Structure.fromLayerList(records), 1000, trace, [3])
+    startTime = time.perf_counter()
+    [relaxList, rms] = fit.run()
+    print("fit in", time.perf_counter() - startTime, "s:", relaxList, "expected [0.9], rms", rms, "1/m")
+    for rec in fit.history: print(rec)
+    # 20 AlN/GaN pairs, all interlayers fitted at once,
+    # relax shifts the curvature alike at every temperature, so only their combined effect is unique
+    records = [["GaN", 1000.0, 0.0]] + [["AlN", 20.0, 0.9], ["GaN", 200.0, 1.0]]*20 +\
+              [["GaN", 1000.0, 1.0], ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+    structure = Elasticity.Structure.fromLayerList(records)
+    trace = list(map(lambda rlt: [rlt[0], rlt[1]/Unit.length["m"]], structure.rampTemperature(1000, 300, 200)))
+    for rec in records[1:41:2]: rec[2] = 0.7
+    fit = RelaxFit(Elasticity.Structure.fromLayerList(records), 1000, trace, list(range(1, 41, 2)))
+    startTime = time.perf_counter()
+    [relaxList, rms] = fit.run()
+    print(len(relaxList), "interlayers,", len(trace), "points, fit in", time.perf_counter() - startTime,\
+          "s, rms", rms, "1/m after", len(fit.history) - 1, "iterations")
@@ -4,4 +4,225 @@
 # Copyright (c) 2016 and later, Kanglin Xiong.          #
 #########################################################
 
-''' simulate the growth process '''
+''' simulate the growth process
+    layers grow one thickness increment at a time at the growth temperature,
+    every increment gives the status quo of the stack grown so far
+
+    the equations of Equation.buildEq are reduced instead of solved again
+    interface eqs give the mean strain s = f/(E*h) of every layer from the bottom one
+        s[i] = s0 + r*P[i] - M[i]
+        P[i+1] = P[i] + (h[i] + h[i+1])/2, M[i+1] = M[i] + mismatch[i]
+    so force and moment balance, and the strain energy, are sums over layers
+    of terms in u[i] = [1, P[i], -M[i]], which are kept as prefix sums
+    a new increment only changes the top layer, the cost per increment is constant
+'''
+
+import Misc, Unit, Elasticity, Newton
+
+columnList = ["deposited(nm)", "R(m)", "curvature(1/m)", "neutralPlanePos(um)",\
+              "surfaceStress(GPa)", "filmForce(GPa*nm)"]
+
+def addVec(v1, v2, s = 1.0):
+    return list(map(lambda i: v1[i] + s*v2[i], range(len(v1))))
+
+def quadForm(q, v):
+    return sum(map(lambda i: v[i]*sum(map(lambda j: q[i][j]*v[j], range(3))), range(3)))
+
+def reduceStack(youngList, youngEnergyList, thickList, mismatchList):
+    ''' the system of Growth.solveAt for a whole stack, bottom first, in one pass '''
+    n = len(thickList)
+    force = [0.0]*3
+    moment = [0.0]*3
+    energy = [[0.0]*3 for i in range(3)]
+    bend = 0.0
+    inertia = [0.0]*3
+    [P, M, height] = [0.0, 0.0, 0.0]
+    for i in range(n):
+        [young, h] = [youngList[i], thickList[i]]
+        if(i > 0):
+            P += (thickList[i-1] + h)/2.0
+            M += mismatchList[i-1]
+            p = height - thickList[i-1]/2.0
+        else:
+            # p of layer 0 refers to the top layer, as Equation.momentEq
+            p = 0.0 - thickList[-1]/2.0
+        u = [1.0, P, -M]
+        force = addVec(force, u, young*h)
+        moment = addVec(moment, u, young*h*p)
+        w = young**2*h/youngEnergyList[i]
+        for j in range(3):
+            energy[j] = addVec(energy[j], u, w*u[j])
+        bend += youngEnergyList[i]*h**3/48.0
+        [b, t] = [height, height + h]
+        inertia = addVec(inertia, [(t**3 - b**3)/3.0, t**2 - b**2, t - b], young)
+        height += h
+    return [force, moment, energy, bend, inertia]
+
+class Growth:
+    def __init__(self, substrate = "Sapphire", substrateThickness = 500*Unit.length["um"],\
+                 temperature = None):
+        ''' temperature is the growth temperature, default is that of the substrate '''
+        material = Elasticity.loadMaterial(substrate)
+        if temperature is None: temperature = material.getGrowthTemperature()
+        self.temperature = temperature
+        self.layerStack = []
+        # prefix sums over all layers below the top one
+        self.sumForce = [0.0]*3     # E*h*u
+        self.sumMoment = [0.0]*3    # E*h*p*u, p as the row of Equation.momentEq
+        self.sumEnergy = [[0.0]*3 for i in range(3)]  # E^2*h/Ee*u*u
+        self.sumBend = 0.0          # Ee*h^3/48
+        self.sumInertia = [0.0]*3   # E*(T^3-B^3)/3, E*(T^2-B^2), E*(T-B)
+        self.height = 0.0           # bottom of the top layer
+        # P and M of the layer below the top one, M includes the mismatch of the top one
+        self.topP = 0.0
+        self.topM = 0.0
+        self.deposited = 0.0
+        self.addLayer(substrate, substrateThickness)
+        self.deposited = 0.0
+
+    def layerTerms(self, layer):
+        ''' [E at growth temperature, E at material temperature], as Structure does '''
+        material = layer.material
+        young = material.getYoungsModulus(self.temperature)/\
+            (1.0 - material.getPoissonsRatio(self.temperature))
+        youngEnergy = material.getYoungsModulus()/(1.0 - material.getPoissonsRatio())
+        return [young, youngEnergy]
+
+    def freezeTop(self):
+        ''' add the top layer into the prefix sums, before a new layer is added '''
+        top = self.layerStack[-1]
+        [young, youngEnergy] = top.young
+        h = top.thickness
+        u = self.topU()
+        self.sumForce = addVec(self.sumForce, u, young*h)
+        if(len(self.layerStack) > 1):
+            # p of layer 0 refers to the top layer, it is added in solve()
+            p = self.height - self.layerStack[-2].thickness/2.0
+            self.sumMoment = addVec(self.sumMoment, u, young*h*p)
+        w = young**2*h/youngEnergy
+        for i in range(3):
+            self.sumEnergy[i] = addVec(self.sumEnergy[i], u, w*u[i])
+        self.sumBend += youngEnergy*h**3/48.0
+        [b, t] = [self.height, self.height + h]
+        self.sumInertia = addVec(self.sumInertia, [(t**3 - b**3)/3.0, t**2 - b**2, t - b], young)
+        self.height += h
+        self.topP = u[1]
+
+    def addLayer(self, materialName, thickness = 0.0, relax = 0.0):
+        ''' start a new top layer, thickness grows with grow() '''
+        layer = Elasticity.Layer(Elasticity.loadMaterial(materialName), thickness, relax)
+        layer.young = self.layerTerms(layer)
+        if(len(self.layerStack)):
+            bot = self.layerStack[-1]
+            mismatch = Elasticity.Structure.latticeMismatchStrain(bot, layer, self.temperature) +\
+                Elasticity.Structure.thermalMismatchStrain(bot, layer,\
+                                                           self.temperature, self.temperature)
+            self.freezeTop()
+            layer.mismatch = mismatch
+            self.topM += mismatch
+        self.layerStack.append(layer)
+        self.deposited += thickness
+        return layer
+
+    def topU(self):
+        ''' u of the top layer at its current thickness '''
+        P = self.topP
+        if(len(self.layerStack) > 1):
+            P += (self.layerStack[-2].thickness + self.layerStack[-1].thickness)/2.0
+        return [1.0, P, -self.topM]
+
+    def system(self):
+        ''' [force row, moment row without inertia, energy form, bending, inertia] of the stack '''
+        top = self.layerStack[-1]
+        [young, youngEnergy] = top.young
+        h = top.thickness
+        u = self.topU()
+        force = addVec(self.sumForce, u, young*h)
+        moment = list(self.sumMoment)
+        if(len(self.layerStack) > 1):
+            p = self.height - self.layerStack[-2].thickness/2.0
+            moment = addVec(moment, u, young*h*p)
+        # layer 0, p = 0 - h[-1]/2 as Equation.momentEq
+        bottom = self.layerStack[0]
+        u0 = [1.0, 0.0, 0.0]
+        moment = addVec(moment, u0, bottom.young[0]*bottom.thickness*(0.0 - h/2.0))
+        if(len(self.layerStack) == 1):
+            moment = addVec(moment, u0, young*h*(0.0 - h/2.0))
+        w = young**2*h/youngEnergy
+        energy = list(map(lambda i: addVec(self.sumEnergy[i], u, w*u[i]), range(3)))
+        bend = self.sumBend + youngEnergy*h**3/48.0
+        [b, t] = [self.height, self.height + h]
+        inertia = addVec(self.sumInertia, [(t**3 - b**3)/3.0, t**2 - b**2, t - b], young)
+        return [force, moment, energy, bend, inertia]
+
+    @staticmethod
+    def solveAt(system, neutralPlanePos):
+        ''' [s0, r, energy] for a neutral plane position '''
+        [force, moment, energy, bend, inertia] = system
+        x0 = neutralPlanePos
+        # the moment eq holds sum(f*(p - x0)), the x0 part is zero by force balance
+        coeff = inertia[0] - x0*inertia[1] + x0**2*inertia[2]
+        [a11, a12, b1] = [force[0], force[1], -force[2]]
+        [a21, a22, b2] = [moment[0], moment[1] + coeff, -moment[2]]
+        det = a11*a22 - a12*a21
+        s0 = (b1*a22 - a12*b2)/det
+        r = (a11*b2 - a21*b1)/det
+        v = [s0, r, 1.0]
+        return [s0, r, quadForm(energy, v) + r**2*bend]
+
+    def solve(self):
+        ''' [radius, neutralPlanePos, s0, r] of the stack grown so far '''
+        system = self.system()
+        total = self.height + self.layerStack[-1].thickness
+        minimizer = Newton.Min(lambda x: self.solveAt(system, x)[2], 0, total, 1e-18)
+        neutralPlanePos = minimizer.run()[0]
+        [s0, r, energy] = self.solveAt(system, neutralPlanePos)
+        radius = float('inf')
+        if(r != 0.0): radius = 1.0/r
+        return [radius, neutralPlanePos, s0, r]
+
+    def status(self):
+        ''' a row of columnList '''
+        [radius, neutralPlanePos, s0, r] = self.solve()
+        top = self.layerStack[-1]
+        [young, youngEnergy] = top.young
+        u = self.topU()
+        sTop = s0*u[0] + r*u[1] + u[2]
+        # Layer.getStress at the top surface, with r as 1/radius
+        surfaceStress = young*sTop + youngEnergy*top.thickness/2.0*r/2.0
+        # force of the film is minus that of the substrate
+        bottom = self.layerStack[0]
+        filmForce = 0.0 - bottom.young[0]*bottom.thickness*s0
+        return [self.deposited/Unit.length["nm"], radius/Unit.length["m"],\
+                r*Unit.length["m"], neutralPlanePos/Unit.length["um"],\
+                surfaceStress/Unit.GPa, filmForce/(Unit.GPa*Unit.length["nm"])]
+
+    def grow(self, increment):
+        ''' thicken the top layer, return the status '''
+        self.layerStack[-1].thickness += increment
+        self.deposited += increment
+        return self.status()
+
+    def growLayer(self, materialName, thickness, relax = 0.0, numOfSteps = 10):
+        ''' grow a new layer in numOfSteps equal increments, return the rows '''
+        step = float(thickness)/numOfSteps
+        self.addLayer(materialName, 0.0, relax)
+        return list(map(lambda i: self.grow(step), range(numOfSteps)))
+
+    def layerInfoList(self):
+        ''' the stack grown so far, top first, as Structure.fromLayerList '''
+        return list(map(lambda layer: [layer.material.name, layer.thickness,\
+                                       layer.bottomInterfaceRelax], reversed(self.layerStack)))
+
+
+if __name__ == "__main__":
+    growth = Growth("Sapphire", 500*Unit.length["um"], 1000)
+    print(", ".join(columnList))
+    rowList = growth.growLayer("GaN", 200, 1.0, 4)
+    rowList.extend(growth.growLayer("Al20%GaN", 20, 0.0, 4))
+    rowList.extend(growth.growLayer("GaN", 1000, 0.0, 4))
+    Misc.display(rowList)
+    print("compare with Structure.statusquo of the same stack")
+    structure = Elasticity.Structure.fromLayerList(growth.layerInfoList())
+    rlt = structure.statusquo(1000)
+    print(rlt[0][1]/Unit.length["m"], rlt[0][2]/Unit.length["um"])
@@ -0,0 +1,135 @@
+#!/mingw64/bin/python
+
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' convert in-situ curvature traces into film stress, chunk by chunk
+    time => film thickness by a growth-rate schedule
+    stress-thickness = E/(1-v)*ts^2/6 * (1/R - 1/R0), by Stoney's equation
+    mean stress = stress-thickness / thickness
+    instantaneous stress = d(stress-thickness)/d(thickness)
+    memory is bounded by the smoothing window, not by the length of the trace
+'''
+
+import collections
+import Stoney
+
+columnList = ["time(s)", "thickness(nm)", "stressThickness(GPa*nm)", "meanStress(GPa)",\
+              "instantStress(GPa)"]
+
+class GrowthSchedule:
+    ''' [[startTime s, growth rate nm/s], etc], the rate holds until the next start '''
+    def __init__(self, segmentList):
+        if(not len(segmentList)):
+            raise Exception("Empty growth schedule!")
+        self.segmentList = sorted(map(list, segmentList))
+        # thickness at the start of each segment
+        self.baseList = [0.0]
+        for i in range(1, len(self.segmentList)):
+            [t0, rate] = self.segmentList[i-1]
+            self.baseList.append(self.baseList[-1] + rate*(self.segmentList[i][0] - t0))
+        self.idx = 0
+
+    def thickness(self, t):
+        ''' film thickness in nm at time t, fast for non-decreasing t '''
+        if(t < self.segmentList[self.idx][0]): self.idx = 0
+        while(self.idx + 1 < len(self.segmentList) and t >= self.segmentList[self.idx + 1][0]):
+            self.idx += 1
+        [t0, rate] = self.segmentList[self.idx]
+        return max(0.0, self.baseList[self.idx] + rate*(t - t0))
+
+
+class TraceConverter:
+    def __init__(self, stoney, schedule, initRadiusInMeter = None, window = 1):
+        self.stoney = stoney
+        self.schedule = schedule
+        self.initRadius = initRadiusInMeter
+        self.window = max(1, int(window))
+        # rolling window of stress-thickness, and the history to difference against
+        self.smoothBuf = collections.deque()
+        self.smoothSum = 0.0
+        self.history = collections.deque(maxlen = self.window + 1)
+
+    def process(self, timeList, radiusList):
+        ''' a chunk of samples => rows of columnList '''
+        # stress of a 1 nm film is the stress-thickness in GPa*nm
+        forceList = self.stoney.getFilmStressBatch(1.0, radiusList, self.initRadius)
+        nan = float('nan')
+        rowList = []
+        for i in range(len(timeList)):
+            thick = self.schedule.thickness(timeList[i])
+            force = forceList[i]
+            if(force == force):
+                self.smoothBuf.append(force)
+                self.smoothSum += force
+                if(len(self.smoothBuf) > self.window):
+                    self.smoothSum -= self.smoothBuf.popleft()
+                force = self.smoothSum/len(self.smoothBuf)
+            meanStress = nan
+            if(thick > 0.0): meanStress = force/thick
+            instantStress = nan
+            if(len(self.history)):
+                [thick0, force0] = self.history[0]
+                if(thick > thick0 and force == force and force0 == force0):
+                    instantStress = (force - force0)/(thick - thick0)
+            self.history.append([thick, force])
+            rowList.append([timeList[i], thick, force, meanStress, instantStress])
+        return rowList
+
+    @staticmethod
+    def readTrace(fileObj, chunkSize = 4096):
+        ''' "time,radius" text lines => chunks of [timeList, radiusList], other lines are skipped '''
+        [timeList, radiusList] = [[], []]
+        for line in fileObj:
+            eleList = line.split(",")
+            try:
+                [t, r] = [float(eleList[0]), float(eleList[1])]
+            except (ValueError, IndexError):
+                continue
+            timeList.append(t)
+            radiusList.append(r)
+            if(len(timeList) >= chunkSize):
+                yield [timeList, radiusList]
+                [timeList, radiusList] = [[], []]
+        if(len(timeList)):
+            yield [timeList, radiusList]
+
+    def convertFile(self, inFilename, outFilename, chunkSize = 4096):
+        ''' stream a trace file into a CSV of columnList, return number of samples '''
+        num = 0
+        with open(inFilename) as inFile, open(outFilename, "w") as outFile:
+            outFile.write(",".join(columnList) + "\n")
+            for [timeList, radiusList] in self.readTrace(inFile, chunkSize):
+                rowList = self.process(timeList, radiusList)
+                outFile.write("".join(map(lambda row: ",".join(map(str, row)) + "\n", rowList)))
+                num += len(rowList)
+        return num
+
+
+if __name__ == "__main__":
+    import time, os
+    stoney = Stoney.Stoney("Sapphire", 500)
+    # 1000 s at 0.5 nm/s, then 1000 s at 1 nm/s, a film at 1 GPa
+    schedule = GrowthSchedule([[0, 0.5], [1000, 1.0]])
+    filename = os.path.join(os.path.dirname(os.path.realpath(__file__)), "output", "trace_demo")
+    with open(filename + ".csv", "w") as fileObj:
+        fileObj.write("time(s),radius(m)\n")
+        for i in range(1, 200000):
+            t = i*0.01
+            h = schedule.thickness(t)
+            fileObj.write(str(t) + "," + str(stoney.getRadiusOfCurvature(h, 1.0)) + "\n")
+    schedule = GrowthSchedule([[0, 0.5], [1000, 1.0]])
+    converter = TraceConverter(stoney, schedule, None, 50)
+    startTime = time.perf_counter()
+    num = converter.convertFile(filename + ".csv", filename + "_stress.csv")
+    seconds = time.perf_counter() - startTime
+    print(num, "samples in", seconds, "s,", num/seconds, "samples/s")
+    with open(filename + "_stress.csv") as fileObj:
+        print(fileObj.readline().strip())
+        for line in fileObj: pass
+        print(line.strip())
+    os.remove(filename + ".csv")
+    os.remove(filename + "_stress.csv")
@@ -0,0 +1,174 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' large deflection, R comparable to the total thickness
+    usage:
+        structure.setLargeDeflection()      # every run of the structure solves the nonlinear eqs
+        result = structure.rampTemperature(1000, 300, 100)
+        python Main.py --nonlinear <script> T1 [T2] [number of steps]
+
+    Equation.buildEq keeps the first order in r*y, y is the distance to the neutral plane
+    here the fibres of the layers follow the bent geometry
+        interface   (1 + s[k+1])*(1 + m[k])*(1 + r*y[k]) == (1 + s[k])*(1 + r*y[k+1])
+                    the mid fibres of both layers end on the same radii, s = f/(E*h),
+                    y[k] is the mid height of the k-th layer to the neutral plane
+        force       sum(f*(1 + r*y)) + r^2*I1 == 0
+        moment      sum(f*(1 + r*y)*arm) + r*I1 + r^2*I2 == 0
+                    a layer at y is (1 + r*y) wide per width of the neutral plane,
+                    arm is the row of Equation.momentEq, Ik = sum(E*Integrate[y^k, {y, bottom, top}])
+    all of them fall back to Equation.buildEq to the first order
+
+    Newton iterations start from the root of Solver.LinearEq at the neutral plane of the linear eqs
+    the Jacobian is the bidiagonal interface rows bordered by the force and moment rows,
+    the interface rows carry every force from the bottom one, so a step is O(n) as in Growth
+    a ramp carries the correction of the previous step, linear root + correction is the next start
+    the iterations stop when every row is within tolerance of the magnitude of its terms,
+    or when the rows stop decreasing within the square root of tolerance, i.e. at the round-off floor
+'''
+
+import Misc, Unit, Monitor
+
+class LargeDeflection:
+    def __init__(self, tolerance = 1e-12, maxIter = 20):
+        self.tolerance = tolerance
+        self.maxIter = maxIter
+        # root - linear root of the last solve, the start of the next one
+        self.correction = None
+        self.iterations = 0
+
+    def reset(self):
+        self.correction = None
+
+    def setTerms(self, eqParams, neutralPlanePos):
+        ''' terms that do not change within the Newton iterations '''
+        [n, youngList, thickList, mismatchList, gradedList] = eqParams
+        if gradedList is not None:
+            raise Exception("Large deflection does not support graded layers")
+        x0 = neutralPlanePos
+        self.n = n
+        self.mismatch = mismatchList
+        self.stiff = list(map(lambda i: youngList[i]*thickList[i], range(n)))
+        self.y = [0.0]*n
+        self.arm = [0.0]*n
+        [I1, I2, height] = [0.0, 0.0, 0.0]
+        for i in range(n):
+            [b, t] = [height - x0, height + thickList[i] - x0]
+            self.y[i] = (b + t)/2.0
+            # as Equation.momentEq
+            self.arm[i] = sum(thickList[0:i]) - thickList[i-1]/2.0 - x0
+            I1 += youngList[i]*(t**3 - b**3)/3.0
+            I2 += youngList[i]*(t**4 - b**4)/4.0
+            height += thickList[i]
+        self.inertia = [I1, I2]
+
+    def residual(self, root):
+        ''' [interface rows, force row, moment row] '''
+        [n, y, m, r] = [self.n, self.y, self.mismatch, root[-1]]
+        s = list(map(lambda i: root[i]/self.stiff[i], range(n)))
+        rowList = list(map(lambda k: (1.0 + s[k+1])*(1.0 + m[k])*(1.0 + r*y[k]) -\
+                                     (1.0 + s[k])*(1.0 + r*y[k+1]), range(n - 1)))
+        [I1, I2] = self.inertia
+        width = list(map(lambda i: root[i]*(1.0 + r*y[i]), range(n)))
+        rowList.append(sum(width) + r**2*I1)
+        rowList.append(sum(map(lambda i: width[i]*self.arm[i], range(n))) + r*I1 + r**2*I2)
+        return rowList
+
+    def error(self, root, rowList):
+        ''' largest row relative to the magnitude of its terms '''
+        [n, y, m, r] = [self.n, self.y, self.mismatch, root[-1]]
+        s = list(map(lambda i: root[i]/self.stiff[i], range(n)))
+        scaleList = list(map(lambda k: max(abs((1.0 + s[k+1])*(1.0 + m[k])*(1.0 + r*y[k])),\
+                                           abs((1.0 + s[k])*(1.0 + r*y[k+1]))), range(n - 1)))
+        [I1, I2] = self.inertia
+        width = list(map(lambda i: abs(root[i]*(1.0 + r*y[i])), range(n)))
+        scaleList.append(sum(width) + abs(r**2*I1))
+        scaleList.append(sum(map(lambda i: width[i]*abs(self.arm[i]), range(n))) + abs(r*I1) + abs(r**2*I2))
+        return max(map(lambda k: abs(rowList[k])/scaleList[k] if scaleList[k] else abs(rowList[k]),\
+                       range(len(rowList))))
+
+    def step(self, root, rowList):
+        ''' Newton step, J.dx == -residual, forces from the bottom one and dr by the interface rows '''
+        [n, y, m, r] = [self.n, self.y, self.mismatch, root[-1]]
+        s = list(map(lambda i: root[i]/self.stiff[i], range(n)))
+        # df[i] = alpha[i] + beta[i]*df[0] + gamma[i]*dr
+        [alpha, beta, gamma] = [[0.0]*n, [0.0]*n, [0.0]*n]
+        beta[0] = 1.0
+        for k in range(n - 1):
+            a = -(1.0 + r*y[k+1])/self.stiff[k]
+            b = (1.0 + m[k])*(1.0 + r*y[k])/self.stiff[k+1]
+            c = (1.0 + s[k+1])*(1.0 + m[k])*y[k] - (1.0 + s[k])*y[k+1]
+            alpha[k+1] = (-rowList[k] - a*alpha[k])/b
+            beta[k+1] = -a*beta[k]/b
+            gamma[k+1] = (-a*gamma[k] - c)/b
+        # force and moment rows in df[0] and dr
+        [I1, I2] = self.inertia
+        forceCol = list(map(lambda i: 1.0 + r*y[i], range(n)))
+        momentCol = list(map(lambda i: forceCol[i]*self.arm[i], range(n)))
+        forceR = sum(map(lambda i: root[i]*y[i], range(n))) + 2.0*r*I1
+        momentR = sum(map(lambda i: root[i]*y[i]*self.arm[i], range(n))) + I1 + 2.0*r*I2
+        dot = lambda col, vec: sum(map(lambda i: col[i]*vec[i], range(n)))
+        [a11, a12, b1] = [dot(forceCol, beta), dot(forceCol, gamma) + forceR,\
+                          -rowList[-2] - dot(forceCol, alpha)]
+        [a21, a22, b2] = [dot(momentCol, beta), dot(momentCol, gamma) + momentR,\
+                          -rowList[-1] - dot(momentCol, alpha)]
+        det = a11*a22 - a12*a21
+        df0 = (b1*a22 - a12*b2)/det
+        dr = (a11*b2 - a21*b1)/det
+        return list(map(lambda i: alpha[i] + beta[i]*df0 + gamma[i]*dr, range(n))) + [dr]
+
+    def solve(self, eqParams, neutralPlanePos, linearRoot):
+        ''' root [f1, .., fn, r] of the nonlinear eqs '''
+        self.setTerms(eqParams, neutralPlanePos)
+        root = list(linearRoot)
+        if(self.correction is not None and len(self.correction) == len(root)):
+            root = list(map(lambda i: root[i] + self.correction[i], range(len(root))))
+        rowList = self.residual(root)
+        error = self.error(root, rowList)
+        for iteration in range(1, self.maxIter + 1):
+            dx = self.step(root, rowList)
+            trial = list(map(lambda i: root[i] + dx[i], range(len(root))))
+            rowList = self.residual(trial)
+            [previous, error] = [error, self.error(trial, rowList)]
+            if(error >= previous):
+                # no progress, keep the better root if it is at the round-off floor
+                if(previous <= self.tolerance**0.5): break
+                raise Exception("Large deflection diverged at iteration " + str(iteration) + "!")
+            root = trial
+            if(error <= self.tolerance): break
+        else:
+            raise Exception("Large deflection did not converge in " + str(self.maxIter) + " iterations!")
+        self.iterations = iteration
+        if Monitor.active("largeDeflection"):
+            Monitor.emit("largeDeflection", iterations = self.iterations,\
+                         linearRadius = 1.0/linearRoot[-1] if linearRoot[-1] else float('inf'),\
+                         radius = 1.0/root[-1] if root[-1] else float('inf'))
+        self.correction = list(map(lambda i: root[i] - linearRoot[i], range(len(root))))
+        return root
+
+
+if __name__ == "__main__":
+    import time
+    import Elasticity
+    # thick AlN on a thin silicon membrane, R is some 20 times the thickness
+    records = [["AlN", 5.0*Unit.length["um"], 0.9], ["Si111", 10.0*Unit.length["um"], 0.0]]
+    structure = Elasticity.Structure.fromLayerList(records)
+    # lattices of the materials are cached by the first ramp
+    structure.rampTemperature(1300, 300, 21)
+    startTime = time.perf_counter()
+    linear = structure.rampTemperature(1300, 300, 21)
+    linearTime = time.perf_counter() - startTime
+    structure.setLargeDeflection()
+    iterationList = []
+    Monitor.addListener(lambda record: iterationList.append(record["iterations"]), ["largeDeflection"])
+    startTime = time.perf_counter()
+    nonlinear = structure.rampTemperature(1300, 300, 21)
+    print("linear", linearTime, "s, nonlinear", time.perf_counter() - startTime, "s, Newton iterations",\
+          iterationList)
+    total = sum(map(lambda layer: layer.thickness, structure.layerStack))
+    print("T(K), R linear(um), R nonlinear(um), R/thickness")
+    Misc.display(list(map(lambda i: [linear[i][0], linear[i][1]/Unit.length["um"],\
+                                     nonlinear[i][1]/Unit.length["um"], nonlinear[i][1]/total],\
+                          range(0, 21, 4))))
@@ -7,8 +7,10 @@
 #########################################################
 
 
-import sys
-import Misc, Elasticity
+import sys, os, time
+import Misc, Monitor
+# Elasticity, Cache, Profile and the batch modules are imported on their code paths,
+# Benchmark.py measures the start-up against its budget
 
 ''' commom computing tasks '''
 
@@ -18,39 +20,202 @@ import Misc, Elasticity
 # thermal mismatch is proportional to T2-T1 for all layers
 # sweep T2
 
-helpStr = "Usage: python Main.py <script> T1 [T2] [number of steps]."
+helpStr = "Usage: python Main.py [-v|--verbose] [--profile] [--no-cache] [--clear-cache] [--nonlinear]" +\
+    " <script> T1 [T2] [number of steps].\n" +\
+    "       python Main.py [--no-cache] [--nonlinear] [--workers N] --batch <manifest>\n" +\
+    "       python Main.py [--no-cache] [--nonlinear] [--workers N] --batch <script glob> [etc]" +\
+    " T1 [T2] [number of steps]."
+
+flagList = ["-v", "--verbose", "--profile", "--no-cache", "--clear-cache", "--batch", "--nonlinear"]
 
 def run():
-    numOfArgs = len(sys.argv)
+    # -v or --verbose prints interfaces, neutral plane search and temperature steps
+    # --profile saves time, calls and peak memory of phases and steps into _prf.json
+    # results are cached by content, --no-cache bypasses, --clear-cache empties the cache
+    # --nonlinear solves the large deflection eqs, for R comparable to the thickness
+    # --batch runs many jobs in one process, or in N processes with --workers N
+    argv = list(filter(lambda arg: arg not in flagList, sys.argv))
+    numOfWorkers = 1
+    if("--workers" in argv):
+        idx = argv.index("--workers")
+        if(idx + 1 >= len(argv) or not argv[idx + 1].isdigit()):
+            print(helpStr)
+            print("Error: --workers needs a number!")
+            return
+        numOfWorkers = int(argv[idx + 1])
+        argv = argv[:idx] + argv[idx + 2:]
+    Monitor.verbose("-v" in sys.argv or "--verbose" in sys.argv)
+    if("--clear-cache" in sys.argv):
+        import Cache
+        Cache.ResultCache().clear()
+        print("cache cleared")
+        if(len(argv) == 1): return
+    if("--batch" in sys.argv):
+        batch(argv[1:], numOfWorkers, "--no-cache" not in sys.argv, "--nonlinear" in sys.argv)
+        return
+    if("--profile" in sys.argv):
+        import Profile
+        profiler = Profile.Profiler()
+        profiler.info["arguments"] = argv[1:]
+        with profiler:
+            done = compute(argv)
+        if(not done): return
+        print("saving", Misc.outputFilename("_".join(argv[1:]), "_prf.json"))
+        profiler.save(Misc.outputFilename("_".join(argv[1:]), "_prf.json"))
+        return
+    compute(argv)
+
+def compute(argv):
+    numOfArgs = len(argv)
     if(numOfArgs < 3 or numOfArgs >5):
         print(helpStr)
         print("Error: number of arguments should be 3 to 5!")
         print("Input:" + " ".join(sys.argv))
-        return
-    script = sys.argv[1]
+        return False
+    script = argv[1]
     if(not Misc.queryScript(script)):
         print("Cannot find script:", script)
         print("Accessible scripts:", ", ".join(Misc.listScripts()))
-        return
+        return False
     print("parsing", Misc.scriptFilename(script))
+    import Elasticity
     structure = Elasticity.Structure(script)
+    structure.setLargeDeflection("--nonlinear" in sys.argv)
     print("running")
-    if(numOfArgs == 3):
-        t1 = float(sys.argv[2])
-        result = structure.statusquo(t1)
-    if(numOfArgs == 4):
-        t1 = float(sys.argv[2])
-        t2 = float(sys.argv[3])
-        result = structure.rampTemperature(t1, t2)
-    if(numOfArgs == 5):
-        t1 = float(sys.argv[2])
-        t2 = float(sys.argv[3])
-        numOfSteps = int(sys.argv[4])
-        result = structure.rampTemperature(t1, t2, numOfSteps)
-    outName = "_".join(sys.argv[1:])
+    [method, args] = jobMethod(argv[2:])
+    result = solveJob(structure, method, args, "--no-cache" not in sys.argv)
+    outName = "_".join(argv[1:])
+    if structure.largeDeflection is not None: outName += "_nonlinear"
     print("saving", Misc.outputFilename(outName))
     Misc.saveResult(result, outName)
     print("done")
+    return True
+
+def jobMethod(tempArgs):
+    ''' ["T1"] => statusquo, ["T1", "T2"[, "number of steps"]] => rampTemperature '''
+    if(len(tempArgs) == 1):
+        return ["statusquo", [float(tempArgs[0])]]
+    if(len(tempArgs) == 2):
+        return ["rampTemperature", [float(tempArgs[0]), float(tempArgs[1])]]
+    if(len(tempArgs) == 3):
+        return ["rampTemperature", [float(tempArgs[0]), float(tempArgs[1]), int(tempArgs[2])]]
+    raise Exception("Temperatures should be T1 [T2] [number of steps]")
+
+def solveJob(structure, method, args, useCache = True, cache = None):
+    ''' cache is a Cache.ResultCache shared by jobs, a new one by default '''
+    if(not useCache):
+        return getattr(structure, method)(*args)
+    if cache is None:
+        import Cache
+        cache = Cache.ResultCache()
+    return cache.run(structure, method, *args)
+
+#########################################################
+# batch mode, a job is [script, "T1", "T2", "number of steps"], temperatures as on the command line
+# jobs share the material and result caches and the script list of their process
+
+def isNumber(arg):
+    try:
+        float(arg)
+    except ValueError:
+        return False
+    return True
+
+def readManifest(filename):
+    ''' one job per line as "script T1 [T2] [number of steps]", # for comments '''
+    jobList = []
+    with open(filename) as fileObj:
+        for line in fileObj:
+            eleList = line.split("#")[0].split()
+            if(len(eleList)): jobList.append(eleList)
+    return jobList
+
+def batchJobs(batchArgs, scriptList):
+    ''' a manifest, or script globs followed by the shared temperatures '''
+    if(len(batchArgs) == 1 and os.path.isfile(batchArgs[0])):
+        return readManifest(batchArgs[0])
+    import fnmatch
+    patternList = list(filter(lambda arg: not isNumber(arg), batchArgs))
+    tempArgs = list(filter(isNumber, batchArgs))
+    jobList = []
+    for pattern in patternList:
+        matchList = fnmatch.filter(scriptList, pattern)
+        if(not len(matchList)):
+            # kept as a job, it fails with the reason in the summary
+            matchList = [pattern]
+        jobList.extend(map(lambda script: [script] + tempArgs, matchList))
+    return jobList
+
+def runJob(job, scriptList, cache = None, nonlinear = False):
+    ''' [job, output filename, seconds, error message], exceptions do not stop the batch
+        scriptList is listed once per batch, cache is the ResultCache of the process or None '''
+    startTime = time.perf_counter()
+    try:
+        if(not job[0].strip() in scriptList):
+            raise Exception("Cannot find script: " + job[0])
+        [method, args] = jobMethod(job[1:])
+        import Elasticity
+        structure = Elasticity.Structure(job[0])
+        structure.setLargeDeflection(nonlinear)
+        result = solveJob(structure, method, args, cache is not None, cache)
+        outName = "_".join(job)
+        if structure.largeDeflection is not None: outName += "_nonlinear"
+        Misc.saveResult(result, outName)
+        return [job, Misc.outputFilename(outName), time.perf_counter() - startTime, ""]
+    except Exception as err:
+        return [job, "", time.perf_counter() - startTime, str(err)]
+
+# state of a worker process, set once by initWorker
+workerState = None
+
+def initWorker(scriptList, useCache, nonlinear):
+    ''' one script list and one result cache per worker process '''
+    global workerState
+    cache = None
+    if useCache:
+        import Cache
+        cache = Cache.ResultCache()
+    workerState = [scriptList, cache, nonlinear]
+
+def runJobInWorker(job):
+    return runJob(job, *workerState)
+
+def batch(batchArgs, numOfWorkers = 1, useCache = True, nonlinear = False):
+    ''' run all jobs, print a line per job and the summary, return the records of runJob '''
+    scriptList = sorted(Misc.listScripts())
+    jobList = batchJobs(batchArgs, scriptList)
+    if(not len(jobList)):
+        print(helpStr)
+        print("Error: no job in batch!")
+        return []
+    print("running", len(jobList), "jobs with", numOfWorkers, "worker(s)")
+    startTime = time.perf_counter()
+    recList = []
+    if(numOfWorkers <= 1):
+        initWorker(scriptList, useCache, nonlinear)
+        jobIter = map(runJobInWorker, jobList)
+        pool = None
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(numOfWorkers, initWorker, (scriptList, useCache, nonlinear))
+        jobIter = pool.imap(runJobInWorker, jobList)
+    for rec in jobIter:
+        [job, filename, seconds, error] = rec
+        status = "ok" if not error else "FAILED " + error
+        print(" ".join(job), round(seconds, 3), "s", status)
+        recList.append(rec)
+    if pool is not None:
+        pool.close()
+        pool.join()
+    failList = list(filter(lambda rec: rec[3], recList))
+    secondsList = list(map(lambda rec: rec[2], recList))
+    print("summary:", len(recList) - len(failList), "succeeded,", len(failList), "failed,",\
+          "wall", round(time.perf_counter() - startTime, 3), "s,",\
+          "job mean", round(sum(secondsList)/len(secondsList), 3), "s,",\
+          "job max", round(max(secondsList), 3), "s")
+    for rec in failList:
+        print("failed:", " ".join(rec[0]), "-", rec[3])
+    return recList
 
 if __name__ == "__main__":
     run()
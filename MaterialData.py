@@ -0,0 +1,137 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' material data files compiled into one validated snapshot
+    every material/*.py is executed once and checked, all values are saved into
+    cache/materials.snapshot together with the time stamp and size of each file,
+    the snapshot is rebuilt when a material file is added, removed or modified,
+    so a process reads one JSON file instead of importing every material module
+'''
+
+import os, os.path, json, types
+import Misc
+
+packageDir = os.path.dirname(os.path.realpath(__file__))
+materialDir = os.path.join(packageDir, "material")
+# not .json, which is the suffix of the entries of Cache.ResultCache
+snapshotFilename = os.path.join(packageDir, "cache", "materials.snapshot")
+
+# required fields of a simple material, and of an alloy between two simple materials
+simpleFieldList = ["lattice300K", "thermalExpansionCoefficient", "youngsModulus",\
+                   "poissonsRatio", "growthTemperature"]
+alloyFieldList = ["boundary", "growthTemperature"]
+tableFieldList = ["thermalExpansionCoefficient", "youngsModulus", "poissonsRatio"]
+
+# {material name: {field: value}}, loaded once per process
+dataDict = None
+
+def sourceStamp():
+    ''' {file name: [modification time in ns, bytes]} of the material files '''
+    stamp = {}
+    for filename in Misc.listMaterialModuleFiles():
+        if(not filename.endswith(".py") or filename.startswith("__")): continue
+        stat = os.stat(os.path.join(materialDir, filename))
+        stamp[filename] = [stat.st_mtime_ns, stat.st_size]
+    return stamp
+
+def readDataFile(filename):
+    ''' plain values of a material file, as they would be in the imported module '''
+    with open(filename) as fileObj:
+        code = compile(fileObj.read(), filename, "exec")
+    namespace = {}
+    exec(code, namespace)
+    return dict(filter(lambda item: not item[0].startswith("_") and\
+                       isinstance(item[1], (int, float, str, list)), namespace.items()))
+
+def isNumber(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def validate(name, data, nameList):
+    ''' raise for missing fields or values out of range '''
+    fieldList = alloyFieldList if "boundary" in data else simpleFieldList
+    for field in fieldList:
+        if(not field in data):
+            raise Exception("Material " + name + " misses " + field)
+    if(not isNumber(data["growthTemperature"])):
+        raise Exception("Material " + name + ": growthTemperature should be a number")
+    if("boundary" in data):
+        boundary = data["boundary"]
+        if(len(boundary) != 2 or not all(map(lambda bd: len(bd) == 2 and isNumber(bd[0]), boundary))):
+            raise Exception("Material " + name + ": boundary should be [[x0, name0], [x1, name1]]")
+        for bd in boundary:
+            if(not bd[1] in nameList):
+                raise Exception("Material " + name + ": boundary " + str(bd[1]) + " is not supported")
+        if(boundary[0][0] == boundary[1][0]):
+            raise Exception("Material " + name + ": boundary compositions should differ")
+        return
+    if(not isNumber(data["lattice300K"]) or data["lattice300K"] <= 0):
+        raise Exception("Material " + name + ": lattice300K should be positive")
+    for field in tableFieldList:
+        table = data[field]
+        if(not len(table) or not all(map(lambda p: len(p) == 2 and isNumber(p[0]) and isNumber(p[1]), table))):
+            raise Exception("Material " + name + ": " + field + " should be [[T0, v0], [T1, v1], etc]")
+        tempList = list(map(lambda p: p[0], table))
+        if(tempList != sorted(set(tempList))):
+            raise Exception("Material " + name + ": temperatures of " + field + " should increase")
+    if(not all(map(lambda p: p[1] > 0, data["youngsModulus"]))):
+        raise Exception("Material " + name + ": youngsModulus should be positive")
+    if(not all(map(lambda p: -1.0 < p[1] < 0.5, data["poissonsRatio"]))):
+        raise Exception("Material " + name + ": poissonsRatio should be in (-1, 0.5)")
+
+def build(stamp):
+    ''' snapshot of all material files '''
+    data = {}
+    for filename in stamp:
+        data[filename[:-3]] = readDataFile(os.path.join(materialDir, filename))
+    for name in data:
+        validate(name, data[name], list(filter(lambda n: not "boundary" in data[n], data)))
+    return {"stamp": stamp, "data": data}
+
+def save(snapshot):
+    ''' atomic write, a read-only package just rebuilds the snapshot in memory '''
+    try:
+        os.makedirs(os.path.dirname(snapshotFilename), exist_ok = True)
+        with open(snapshotFilename + ".tmp", "w") as fileObj:
+            json.dump(snapshot, fileObj)
+        os.replace(snapshotFilename + ".tmp", snapshotFilename)
+    except OSError:
+        pass
+
+def loadSnapshot():
+    ''' {material name: {field: value}}, rebuilt if any material file changed '''
+    global dataDict
+    if dataDict is not None:
+        return dataDict
+    stamp = sourceStamp()
+    snapshot = None
+    try:
+        with open(snapshotFilename) as fileObj:
+            snapshot = json.load(fileObj)
+    except (OSError, ValueError):
+        pass
+    if(snapshot is None or snapshot.get("stamp") != stamp):
+        snapshot = build(stamp)
+        save(snapshot)
+    dataDict = snapshot["data"]
+    return dataDict
+
+def load(name):
+    ''' data of a material, with the fields of the material file as attributes '''
+    data = loadSnapshot()
+    if(not name in data):
+        raise Exception("Material " + name + " is not supported!")
+    return types.SimpleNamespace(**data[name])
+
+
+if __name__ == "__main__":
+    import time
+    startTime = time.perf_counter()
+    snapshot = build(sourceStamp())
+    print("compiled", len(snapshot["data"]), "materials in", time.perf_counter() - startTime, "s")
+    save(snapshot)
+    startTime = time.perf_counter()
+    print(sorted(loadSnapshot().keys()), "loaded in", time.perf_counter() - startTime, "s")
+    print(load("GaN"))
@@ -6,16 +6,22 @@
 
 
 import os, os.path, re
-import Unit
+import Unit, Profile
 
 
 #########################################################
 # manage the locations of files
 
+# material files are listed once per process
+materialModuleFileList = None
+
 def listMaterialModuleFiles():
-    directory = os.path.dirname(os.path.realpath(__file__))
-    directory = os.path.join(directory, "material")
-    return os.listdir(directory)
+    global materialModuleFileList
+    if materialModuleFileList is None:
+        directory = os.path.dirname(os.path.realpath(__file__))
+        directory = os.path.join(directory, "material")
+        materialModuleFileList = os.listdir(directory)
+    return materialModuleFileList
 
 def queryMaterialModule(materialName):
     if(materialName.strip() + ".py" in listMaterialModuleFiles()):
@@ -44,7 +50,7 @@ def outputFilename(dataName, suffix = "_rlt.csv"):
     return(os.path.join(directory, "output", dataName + suffix))
 
 #########################################################
-# save [[temperture, radius, error, stressData, strainData]] to file
+# save [[temperture, radius, error, stressData, strainData, polarData]] to file
 
 def pad2dArray(array, targetLen, pad =" "):
     if(len(array) >= targetLen): return array
@@ -65,14 +71,29 @@ def dataRow2Str(dataList, rowIdx):
 
 def saveResult(result, scriptName):
     ''' save result of Structure.rampTemperature() into CSV '''
+    with Profile.phase("saveResult"):
+        writeResult(result, scriptName)
+
+def writeResult(result, scriptName):
+    filename = outputFilename(scriptName)
+    file = open(filename, "w")
+    file.writelines(resultLines(result))
+    file.close()
+
+def resultLines(result):
+    ''' lines of the CSV, result is scaled in place '''
     # prepare data
     rltLen = len(result)
     stressLen = max(map(lambda i: len(result[i][3]), range(rltLen)))
     strainLen = max(map(lambda i: len(result[i][4]), range(rltLen)))
-    maxLen = max(rltLen, stressLen, strainLen)
+    polarLen = max(map(lambda i: len(result[i][5]) if len(result[i]) > 5 else 0, range(rltLen)))
+    maxLen = max(rltLen, stressLen, strainLen, polarLen)
     dataList = []
     tempRadErrList = []
     titleList = [[["T(K)", "R(m)", "neutralPlanePos(um)"]]]
+    # polarization of each temperature after all stress and strain columns
+    polarDataList = []
+    polarTitleList = []
     for rlt in result: 
         tempRadErrList.append([rlt[0], rlt[1]/Unit.length["m"], rlt[2]/Unit.length["um"]])
         for i in range(len(rlt[3])):
@@ -84,15 +105,20 @@ def saveResult(result, scriptName):
             rlt[4][i][0] /= Unit.length["um"]
         dataList.append(pad2dArray(rlt[4], maxLen))
         titleList.append([pad1dList(["x(um)", "strain@"+str(rlt[0])], len(rlt[4][0]))])
+        if(len(rlt) < 6): continue
+        for i in range(len(rlt[5])):
+            rlt[5][i][0] /= Unit.length["um"]
+        polarDataList.append(pad2dArray(rlt[5], maxLen))
+        polarTitleList.append([pad1dList(["x(um)", "Ppz(C/cm2)@"+str(rlt[0]), "P(C/cm2)@"+str(rlt[0]),\
+                                          "sheetCharge(C/cm2)@"+str(rlt[0])], len(rlt[5][0]))])
+    dataList.extend(polarDataList)
+    titleList.extend(polarTitleList)
     tempRadErrList = pad2dArray(tempRadErrList, maxLen) 
     dataList.insert(0, tempRadErrList) 
-    # write title and data
-    filename = outputFilename(scriptName)
-    file = open(filename, "w")
-    file.write(dataRow2Str(titleList, 0))
+    # title and data
+    yield dataRow2Str(titleList, 0)
     for i in range(maxLen):
-        file.write(dataRow2Str(dataList, i))
-    file.close()
+        yield dataRow2Str(dataList, i)
 
 def LoadCSV(scriptName):
     pass
@@ -0,0 +1,93 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' progress and telemetry events, silent unless a listener is added
+    an event is a dict as {"event": kind, key: value, etc}
+    kinds: eqParameters, interface, neutralPlaneSearch, minimizerStart,
+           minimizerIteration, neutralPlane, largeDeflection, temperatureStep, stepDone
+'''
+
+# [[func, kindList or None], etc]
+listenerList = []
+
+def active(kind = None):
+    ''' callers skip building records when nobody listens to the kind '''
+    for [func, kindList] in listenerList:
+        if(kind is None or kindList is None or kind in kindList):
+            return True
+    return False
+
+def addListener(func, kindList = None):
+    ''' func(record) is called for every event, or only for kinds in kindList '''
+    removeListener(func)
+    listenerList.append([func, kindList])
+    return func
+
+def removeListener(func):
+    for listener in listenerList:
+        if(listener[0] is func):
+            listenerList.remove(listener)
+            return
+
+def emit(kind, **record):
+    record["event"] = kind
+    for [func, kindList] in listenerList:
+        if(kindList is None or kind in kindList):
+            func(record)
+
+#########################################################
+# listeners
+
+class Recorder:
+    ''' keep records in memory, optionally only some kinds '''
+    def __init__(self, kindList = None):
+        self.kindList = kindList
+        self.recordList = []
+
+    def __call__(self, record):
+        if(self.kindList is None or record["event"] in self.kindList):
+            self.recordList.append(record)
+
+
+def consolePrinter(record):
+    ''' the console output of the verbose mode '''
+    kind = record["event"]
+    if(kind == "eqParameters"):
+        print("\ninterface, bottom, top, lattice Mismatch, thermal mismatch")
+    elif(kind == "interface"):
+        print(record["index"], record["bottom"], record["top"],\
+              record["latticeMismatch"], record["thermalMismatch"])
+    elif(kind == "neutralPlaneSearch"):
+        print("\ncomputing netrual plane")
+    elif(kind == "minimizerStart"):
+        print("iter, x, error, func(x)")
+    elif(kind == "minimizerIteration"):
+        print(record["iteration"], record["x"], record["gradient"], record["value"])
+    elif(kind == "neutralPlane"):
+        print("neutral plane found")
+        print("position, error, energy")
+        print([record["position"], record["error"], record["energy"]], "\n")
+    elif(kind == "largeDeflection"):
+        print("large deflection, iterations, linear R, R")
+        print([record["iterations"], record["linearRadius"], record["radius"]], "\n")
+    elif(kind == "temperatureStep"):
+        print("current temperature", record["temperature"])
+
+def verbose(flag = True):
+    ''' restore the console output '''
+    if flag:
+        addListener(consolePrinter)
+    else:
+        removeListener(consolePrinter)
+
+
+if __name__ == "__main__":
+    recorder = addListener(Recorder())
+    verbose()
+    emit("temperatureStep", index = 0, temperature = 300.0)
+    verbose(False)
+    emit("stepDone", index = 0, temperature = 300.0, seconds = 0.1)
+    print(recorder.recordList)
@@ -5,6 +5,7 @@
 #########################################################
 
 import random, math
+import Monitor
 
 ''' find max or min value for a func using Newton's method '''
 
@@ -24,30 +25,38 @@ class Min:
     def run(self, maxIter = 1e2):
         x = (self.xmin + self.xmax)/2.0
         count = 0
-        print("iter, x, error, func(x)")
+        if Monitor.active("minimizerStart"):
+            Monitor.emit("minimizerStart", xmin = self.xmin, xmax = self.xmax)
+        # derivatives at x are evaluated once per iteration
+        slope = self.diff(x)
         while(count < maxIter):
             count += 1
             # root found
-            if(abs(self.diff(x)) <= self.tolerance):
+            if(abs(slope) <= self.tolerance):
                 break
             # update x
-            if(grad(self.diff, x) == 0.0):
+            curvature = grad(self.diff, x)
+            if(curvature == 0.0):
                 x = random.uniform(self.xmin, self.xmax)
             else:
-                dx = - self.diff(x)/grad(self.diff, x)
+                dx = - slope/curvature
                 if(x + dx < self.xmin or x + dx > self.xmax):
                     x = random.uniform(self.xmin, self.xmax)
                 else:
                     x += dx
-            # print process
-            print(count, x, self.diff(x), self.func(x))
-        if(abs(self.diff(x)) > self.tolerance):
+            slope = self.diff(x)
+            # report process
+            if Monitor.active("minimizerIteration"):
+                Monitor.emit("minimizerIteration", iteration = count, x = x,\
+                             gradient = slope, value = self.func(x))
+        if(abs(slope) > self.tolerance):
             raise Exception("Newton failed to find local optima!")
-        return [x, self.diff(x), self.func(x)]
+        return [x, slope, self.func(x)]
 
 Max = Min
 
 if __name__ == "__main__":
+    Monitor.verbose()
     m = Min(lambda x:(x-1)**2 + 0.2, 0, 18)
     print(m.run())
     m = Min(lambda x:0 - math.cos(x), -2, 3)
@@ -0,0 +1,243 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' search layer thickness, relax and composition for a design objective
+    usage:
+        sweep = Sweep.Sweep("GaNOnSapph", 1000, 300)
+        sweep.addAxis(0, "thickness", [1000, 4000])     # bounds [low, high]
+        optimizer = Optimizer.Optimizer(sweep)
+        optimizer.addObjective("curvature")             # flat wafer at tempEnd
+        optimizer.addObjective("peakStress", 0.1, 0)    # tensile stress in the top layer
+        best = optimizer.run(numOfWorkers = 4)
+    the stack is parametrized by the axes of a Sweep, whose values are the bounds,
+    objectives are added up with their weights:
+        curvature: (1/R - 1/targetRadius)^2 in 1/m^2, targetRadius None for a flat wafer
+        peakStress: the larger stress of the two faces of a layer, in GPa
+    gradients come from Sensitivity, i.e. one adjoint run per evaluation,
+    each iteration evaluates a batch of step lengths along the projected gradient,
+    the batch runs across worker processes, the best candidate is taken if it decreases
+    compositions are rounded to integer percent when evaluated, as in Sweep
+'''
+
+import math, random, multiprocessing
+import Unit, Elasticity, Sensitivity, Sweep
+
+objectiveKindList = ["curvature", "peakStress"]
+historyColumnList = ["iteration", "candidate", "objective", "gradientNorm", "step", "accepted", "error"]
+
+class Optimizer:
+    def __init__(self, sweep):
+        ''' sweep holds the base stack, temperatures and axes with [low, high] bounds '''
+        if(not len(sweep.axisList)):
+            raise Exception("Optimizer needs at least one axis!")
+        # every axis needs a row of Sensitivity.run
+        bottomIdx = len(sweep.baseInfoList) - 1
+        for [layerIdx, field, values] in sweep.axisList:
+            if(field == "relax" and layerIdx == bottomIdx):
+                raise Exception("Relax of the bottom layer can not be optimized, it has no interface below!")
+            if(field == "composition" and Elasticity.Material.getXofAxBC(sweep.baseInfoList[layerIdx][0]) < 0):
+                raise Exception("Composition can only be optimized for alloys as Ax%BC, not " +\
+                                sweep.baseInfoList[layerIdx][0])
+        self.sweep = sweep
+        self.lowList = list(map(lambda axis: float(min(axis[2])), sweep.axisList))
+        self.highList = list(map(lambda axis: float(max(axis[2])), sweep.axisList))
+        self.objectiveList = []
+        self.history = []
+
+    def addObjective(self, kind, weight = 1.0, option = None):
+        ''' option is targetRadius in m for curvature, layer index for peakStress '''
+        if(not kind in objectiveKindList):
+            raise Exception("Objective should be one of " + ", ".join(objectiveKindList))
+        if(kind == "peakStress"):
+            if option is None: option = 0
+            if(option < 0 or option >= len(self.sweep.baseInfoList)):
+                raise Exception("Invalid layer index " + str(option))
+        self.objectiveList.append([kind, float(weight), option])
+
+    #########################################################
+    # one evaluation, [objective, gradient] in the units of the axes
+
+    def faceDepths(self, infoList, layerIdx):
+        ''' [depth, index of layers above the point] of top and bottom face of a layer, nm '''
+        above = sum(map(lambda info: info[1], infoList[0:layerIdx]))
+        thick = infoList[layerIdx][1]
+        # just inside the layer, the top face belongs to the layer above
+        return [[above + 1e-6*thick, list(range(layerIdx))],\
+                [above + thick*(1.0 - 1e-6), list(range(layerIdx + 1))]]
+
+    def evaluate(self, point):
+        ''' [objective, gradient, error message], a failed evaluation is inf '''
+        infoList = self.sweep.layerInfoList(point)
+        depthList = []
+        faceList = []
+        for [kind, weight, option] in self.objectiveList:
+            if(kind == "peakStress"):
+                faces = self.faceDepths(infoList, option)
+                faceList.append(faces)
+                depthList.extend(map(lambda face: face[0], faces))
+        fields = list(set(map(lambda axis: axis[1], self.sweep.axisList)))
+        try:
+            random.seed(0)
+            structure = Elasticity.Structure.fromLayerList(infoList, self.sweep.name)
+            sens = Sensitivity.Sensitivity(structure, self.sweep.tempBegin, self.sweep.tempEnd)
+            rowList = sens.run(depthList, fields)
+        except Exception as err:
+            return [float('inf'), [0.0]*len(point), str(err)]
+        rowDict = dict(map(lambda row: [(row[0], row[2]), row[3:]], rowList))
+        # derivative of each output for each axis
+        axisRows = list(map(lambda axis: rowDict.get((axis[0], axis[1])), self.sweep.axisList))
+        if None in axisRows:
+            axis = self.sweep.axisList[axisRows.index(None)]
+            return [float('inf'), [0.0]*len(point),\
+                    "No sensitivity of " + axis[1] + " of layer " + str(axis[0])]
+        objective = 0.0
+        gradient = [0.0]*len(point)
+        col = 0
+        for [kind, weight, option] in self.objectiveList:
+            if(kind == "curvature"):
+                target = 0.0 if option is None else 1.0/option
+                diff = sens.valueList[0] - target
+                objective += weight*diff**2
+                for a in range(len(point)):
+                    gradient[a] += weight*2.0*diff*axisRows[a][0]
+                continue
+            # stress at a fixed depth, plus the shift of the face with the layers above
+            faces = faceList.pop(0)
+            stressList = [sens.valueList[1 + col], sens.valueList[2 + col]]
+            face = 0 if stressList[0] >= stressList[1] else 1
+            [i, x] = sens.locate(faces[face][0]*Unit.length["nm"])
+            slope = -sens.youngEnergy[i]*sens.root[sens.n]/2.0/Unit.GPa*Unit.length["nm"]
+            objective += weight*stressList[face]
+            for a in range(len(point)):
+                [layerIdx, field, values] = self.sweep.axisList[a]
+                d = axisRows[a][1 + col + face]
+                if(field == "thickness" and layerIdx in faces[face][1]): d += slope
+                gradient[a] += weight*d
+            col += 2
+        return [objective, gradient, ""]
+
+    #########################################################
+    # normalized coordinates u in [0, 1] for every axis
+
+    def toPoint(self, u):
+        return list(map(lambda a: self.lowList[a] + u[a]*(self.highList[a] - self.lowList[a]),\
+                        range(len(u))))
+
+    def toUnit(self, point):
+        return list(map(lambda a: (point[a] - self.lowList[a])/(self.highList[a] - self.lowList[a])\
+                        if self.highList[a] > self.lowList[a] else 0.0, range(len(point))))
+
+    def projectedGradient(self, u, gradient):
+        ''' gradient in u, zero where a bound blocks the descent '''
+        gu = list(map(lambda a: gradient[a]*(self.highList[a] - self.lowList[a]), range(len(u))))
+        for a in range(len(u)):
+            if((u[a] <= 0.0 and gu[a] > 0.0) or (u[a] >= 1.0 and gu[a] < 0.0)): gu[a] = 0.0
+        return gu
+
+    def evaluateBatch(self, pointList, pool):
+        if pool is None:
+            return list(map(self.evaluate, pointList))
+        return pool.map(evaluateInWorker, pointList)
+
+    def run(self, start = None, maxIter = 50, batchSize = 4, numOfWorkers = 1, tolerance = 1e-6):
+        ''' [best point, best objective], self.history has every evaluation '''
+        if(not len(self.objectiveList)):
+            raise Exception("Optimizer needs an objective!")
+        if start is None:
+            start = list(map(lambda a: (self.lowList[a] + self.highList[a])/2.0, range(len(self.lowList))))
+        u = list(map(lambda v: min(1.0, max(0.0, v)), self.toUnit(start)))
+        pool = None
+        if(numOfWorkers > 1):
+            pool = multiprocessing.Pool(numOfWorkers, initWorker, (self.config(),))
+        try:
+            [objective, gradient, error] = self.evaluate(self.toPoint(u))
+            if(error):
+                raise Exception("Start point failed: " + error)
+            current = [0, self.toPoint(u), objective, 0.0, 0.0, True, ""]
+            self.history = [current]
+            step = 0.25
+            for iteration in range(1, maxIter + 1):
+                gu = self.projectedGradient(u, gradient)
+                norm = math.sqrt(sum(map(lambda g: g**2, gu)))
+                # the gradient norm is recorded on the accepted row
+                current[3] = norm
+                if(norm == 0.0 or step < tolerance): break
+                # step lengths step, step/2, etc. along the normalized descent direction
+                stepList = list(map(lambda k: step*0.5**k, range(batchSize)))
+                candidateList = list(map(lambda s: list(map(lambda a: min(1.0, max(0.0,\
+                    u[a] - s*gu[a]/norm)), range(len(u)))), stepList))
+                resultList = self.evaluateBatch(list(map(self.toPoint, candidateList)), pool)
+                best = min(range(batchSize), key = lambda k: resultList[k][0])
+                accepted = resultList[best][0] < objective
+                for k in range(batchSize):
+                    self.history.append([iteration, self.toPoint(candidateList[k]), resultList[k][0],\
+                                         0.0, stepList[k], accepted and k == best, resultList[k][2]])
+                if accepted:
+                    current = self.history[len(self.history) - batchSize + best]
+                    u = candidateList[best]
+                    [objective, gradient] = resultList[best][0:2]
+                    # grow again if the longest step was taken
+                    step = min(1.0, stepList[best]*(2.0 if best == 0 else 1.0))
+                else:
+                    step = stepList[-1]*0.5
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.bestPoint = self.toPoint(u)
+        self.bestObjective = objective
+        return [self.bestPoint, objective]
+
+    def config(self):
+        return [self.sweep.config(), self.objectiveList]
+
+    @classmethod
+    def fromConfig(cls, config):
+        [sweepConfig, objectiveList] = config
+        optimizer = cls(Sweep.Sweep.fromConfig(sweepConfig))
+        optimizer.objectiveList = objectiveList
+        return optimizer
+
+    def save(self, dataName):
+        ''' history as CSV, a column per axis '''
+        table = {"point": list(range(len(self.history))),\
+                 "iteration": list(map(lambda rec: rec[0], self.history))}
+        axisNameList = self.sweep.axisNames()
+        for a in range(len(axisNameList)):
+            table[axisNameList[a]] = list(map(lambda rec: rec[1][a], self.history))
+        for j in range(2, len(historyColumnList)):
+            table[historyColumnList[j]] = list(map(lambda rec: rec[j], self.history))
+        return Sweep.Sweep.save(table, dataName)
+
+#########################################################
+# worker processes rebuild the optimizer from its config
+
+workerOptimizer = None
+
+def initWorker(config):
+    global workerOptimizer
+    workerOptimizer = Optimizer.fromConfig(config)
+
+def evaluateInWorker(point):
+    return workerOptimizer.evaluate(point)
+
+
+if __name__ == "__main__":
+    import time
+    # AlN interlayer and GaN thickness for a flat wafer after cooldown, limit tensile stress in GaN
+    base = [["GaN", 2000.0, 0.0], ["AlN", 20.0, 0.0], ["GaN", 1000.0, 1.0],\
+            ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+    sweep = Sweep.Sweep(base, 1000, 300)
+    sweep.addAxis(0, "thickness", [500.0, 4000.0])
+    sweep.addAxis(1, "relax", [0.0, 1.0])
+    optimizer = Optimizer(sweep)
+    optimizer.addObjective("curvature")
+    optimizer.addObjective("peakStress", 1e-3, 0)
+    startTime = time.perf_counter()
+    [point, objective] = optimizer.run(maxIter = 30, numOfWorkers = 4)
+    print("best", point, "objective", objective, "in", time.perf_counter() - startTime, "s")
+    print(len(optimizer.history), "evaluations")
+    for rec in filter(lambda rec: rec[5], optimizer.history): print(rec)
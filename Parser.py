@@ -7,26 +7,66 @@
 import re
 import Misc, Unit
 
+''' script grammar, one stack per line, lines with '#' are comments
+    line    := '{' layer (',' layer)* '}' ['*' repeat]
+    layer   := graded | name thickness [relax]
+    graded  := '[' name thickness [numberOfLayers] ']'
+'''
+
+# patterns are compiled once at import
+# a token is a punctuation or a word, leading blanks are skipped
+tokenPattern = re.compile(r"[ \t]*(?:([{}\[\],*])|([^ \t{}\[\],*]+))")
+blankPattern = re.compile(r"[ \t]*$")
+# longer units first, so that "mm" is not read as "m"
+unitNames = sorted(filter(lambda u: u != "default", Unit.length.keys()), key = len, reverse = True)
+thicknessPattern = re.compile(r"([-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?)(" +\
+    "|".join(unitNames) + ")?$")
+gradedNamePattern = re.compile("[0-9]{2}%[0-9]{2}%")
+compositionPattern = re.compile("[0-9]{2}")
+
+
+class ParseError(Exception):
+    ''' syntax error in script, reported as file:line:column: message '''
+    def __init__(self, message, filename = "<string>", lineNum = 0, colNum = 0):
+        self.message = message
+        self.filename = filename
+        self.lineNum = lineNum
+        self.colNum = colNum
+        Exception.__init__(self, filename + ":" + str(lineNum) + ":" + str(colNum) + ": " + message)
+
+
 class Parser:
     ''' parse script file into a list of list of material name, thickness, relax ratio '''
 
-    def __init__(self):
+    def __init__(self, analyticGrading = False):
         self.layerInfoList = []
+        # keep every graded layer as one linearly graded element, even if n is given
+        self.analyticGrading = analyticGrading
+        # position of the token being parsed, for error report
+        self.filename = "<string>"
+        self.lineNum = 0
 
     def parseThicknessWithUnit(self, thicknessString):
         ''' string => float '''
         #NOTE: no spacing allowed between number and units, 20nm, 1um, 0.1m
-        pattern = "((" + ")|(".join(Unit.length.keys()) + "))"
-        rltLst = re.split(pattern, thicknessString.strip())
-        thickness = float(rltLst[0]) # may fail if invalid symbols exist
-        if len(rltLst) > 1 :
-            thickness *= Unit.length[rltLst[1]]
-        else:
-            thickness *= Unit.length["default"]
-        return thickness
+        match = thicknessPattern.match(thicknessString.strip())
+        if match is None:
+            raise ValueError("Invalid thickness " + thicknessString)
+        unit = match.group(2)
+        if unit is None: unit = "default"
+        return float(match.group(1)) * Unit.length[unit]
 
     @staticmethod
-    def discretizeGradedLayer(cmd = "[Al50%05%GaN 120.0 10]"):
+    def gradedCompositionList(name, n):
+        ''' Ax1%x2%BC => names of n layers, from x1 to x2 in whole percent '''
+        [x1, x2] = list(map(int, compositionPattern.findall(name)))
+        dx = (x2 - x1)/(n - 1.0)
+        xStrList = list(map(lambda i: str(round(x1 + dx*i)).zfill(2) + "%", range(n)))
+        labelList = gradedNamePattern.split(name)
+        return list(map(lambda i: labelList[0] + xStrList[i] + labelList[1], range(n)))
+
+    @classmethod
+    def discretizeGradedLayer(cls, cmd = "[Al50%05%GaN 120.0 10]"):
         ''' [Ax1%x2BC% thickness numberOflayers] => string for ordinary layers '''
         eleList = cmd.strip("[]").split()
         if(len(eleList) != 3):
@@ -34,59 +74,166 @@ class Parser:
         [name, d, n] = [eleList[0], float(eleList[1]), int(eleList[2])]
         if n <= 2:
             raise Exception("Invalid graded layer " + cmd)
-        [x1, x2] = list(map(int, re.findall("[0-9]{2}", name)))
-        dx = (x2 - x1)/(n - 1.0)
-        xStrList = list(map(lambda i: str(round(x1 + dx*i)).zfill(2) + "%", range(n)))
-        labelList = re.split("[0-9]{2}%[0-9]{2}%", name)
-        strList = list(map(lambda i: labelList[0] + xStrList[i] + labelList[1], range(n)))
-        string = ""
-        for i in range(n - 1):
-            string = string + strList[i] + " " + str(d/float(n)) + ","
-        string = string + strList[-1] + " " + str(d/float(n))
-        return(string)
+        strList = cls.gradedCompositionList(name, n)
+        return(",".join(map(lambda s: s + " " + str(d/float(n)), strList)))
+
+    @staticmethod
+    def continuousGradedLayer(cmd = "[Al50%05%GaN 120.0]"):
+        ''' [Ax1%x2%BC thickness] => string for one linearly graded layer '''
+        eleList = cmd.strip("[]").split()
+        if(len(eleList) not in [2, 3] or len(re.findall("[0-9]{2}%", eleList[0])) != 2):
+            raise Exception("Invalid graded layer " + cmd)
+        return(eleList[0] + " " + eleList[1])
+
+    def expandGradedLayer(self, cmd):
+        ''' without number of layers, or in analytic mode, a graded layer is not discretized '''
+        if(self.analyticGrading or len(cmd.strip("[]").split()) == 2):
+            return self.continuousGradedLayer(cmd)
+        return self.discretizeGradedLayer(cmd)
+
+    #########################################################
+    # tokenizer and grammar
+
+    def error(self, message, token):
+        raise ParseError(message, self.filename, self.lineNum, token[2] + 1)
+
+    def tokenize(self, line):
+        ''' line => [[kind, text, column], ...], kind is "punct" or "word" '''
+        tokenList = []
+        pos = 0
+        end = len(line)
+        while(pos < end):
+            match = tokenPattern.match(line, pos)
+            if match is None:
+                if blankPattern.match(line, pos): break
+                self.error("Invalid character", ["", "", pos])
+            if match.group(1) is not None:
+                tokenList.append(["punct", match.group(1), match.start(1)])
+            else:
+                tokenList.append(["word", match.group(2), match.start(2)])
+            pos = match.end()
+        tokenList.append(["end", "", len(line.rstrip())])
+        return tokenList
+
+    def expect(self, tokenList, idx, text):
+        if(tokenList[idx][1] != text or tokenList[idx][0] != "punct"):
+            self.error("Expected '" + text + "'", tokenList[idx])
+        return idx + 1
+
+    def parseThicknessToken(self, token):
+        if(token[0] != "word"):
+            self.error("Expected thickness", token)
+        match = thicknessPattern.match(token[1])
+        if match is None:
+            self.error("Invalid thickness '" + token[1] + "'", token)
+        unit = match.group(2)
+        if unit is None: unit = "default"
+        thickness = float(match.group(1)) * Unit.length[unit]
+        if(thickness <= 0.0):
+            self.error("Thickness should be positive", token)
+        return thickness
+
+    def parseRelaxToken(self, token):
+        try:
+            relax = float(token[1])
+        except ValueError:
+            self.error("Invalid relax ratio '" + token[1] + "'", token)
+        if(relax < 0.0 or relax > 1.0):
+            self.error("Relax ratio should be within 0 and 1", token)
+        return relax
+
+    def parseIntToken(self, token, what):
+        if(token[0] != "word" or not token[1].isdigit()):
+            self.error("Expected " + what, token)
+        return int(token[1])
+
+    def parseGraded(self, tokenList, idx, stack):
+        ''' '[' name thickness [n] ']' => append layers to stack, return next idx '''
+        idx = self.expect(tokenList, idx, "[")
+        nameToken = tokenList[idx]
+        if(nameToken[0] != "word" or len(gradedNamePattern.findall(nameToken[1])) != 1):
+            self.error("Expected graded material as Ax1%x2%BC", nameToken)
+        thickness = self.parseThicknessToken(tokenList[idx + 1])
+        idx += 2
+        n = None
+        if(tokenList[idx][0] == "word"):
+            n = self.parseIntToken(tokenList[idx], "number of layers")
+            if(n <= 2):
+                self.error("Number of layers in graded layer should be more than 2", tokenList[idx])
+            idx += 1
+        idx = self.expect(tokenList, idx, "]")
+        if(n is None or self.analyticGrading):
+            stack.append([nameToken[1], thickness, 0.0])
+            return idx
+        # the same thickness string as discretizeGradedLayer
+        for name in self.gradedCompositionList(nameToken[1], n):
+            stack.append([name, float(str(thickness/float(n))) * Unit.length["default"], 0.0])
+        return idx
+
+    def parseLayer(self, tokenList, idx, stack):
+        ''' name thickness [relax] => append layer to stack, return next idx '''
+        nameToken = tokenList[idx]
+        if(nameToken[0] != "word"):
+            self.error("Expected material name", nameToken)
+        layer = [nameToken[1], self.parseThicknessToken(tokenList[idx + 1]), 0.0]
+        idx += 2
+        if(tokenList[idx][0] == "word"):
+            layer[2] = self.parseRelaxToken(tokenList[idx])
+            idx += 1
+        stack.append(layer)
+        return idx
+
+    def parseTokens(self, tokenList):
+        ''' tokens of a line => layers, in the order of the script '''
+        idx = self.expect(tokenList, 0, "{")
+        tmpStack = []
+        while(True):
+            if(tokenList[idx][1] == "[" and tokenList[idx][0] == "punct"):
+                idx = self.parseGraded(tokenList, idx, tmpStack)
+            else:
+                idx = self.parseLayer(tokenList, idx, tmpStack)
+            if(tokenList[idx][1] == "," and tokenList[idx][0] == "punct"):
+                idx += 1
+                continue
+            break
+        idx = self.expect(tokenList, idx, "}")
+        repeat = 1
+        if(tokenList[idx][1] == "*" and tokenList[idx][0] == "punct"):
+            repeat = self.parseIntToken(tokenList[idx + 1], "number of repeats")
+            idx += 2
+        if(tokenList[idx][0] != "end"):
+            self.error("Unexpected '" + tokenList[idx][1] + "'", tokenList[idx])
+        for i in range(repeat):
+            for layer in tmpStack:
+                self.layerInfoList.append(list(layer))
+        pass
+
+    #########################################################
 
     def parseStringLine(self, line):
         ''' parse a line string '''
-        layers = line.partition("{")[2].partition("}")[0]
-        repeat = line.partition("*")[2].strip()
-        # discretize graded layers like [Al25%05%GaN 120.0 11] if any
-        gradedLayerList = re.findall("\[.*?\]", layers)
-        for gradedLayer in gradedLayerList:
-            layers = layers.replace(gradedLayer, self.discretizeGradedLayer(gradedLayer))
-        # parse all the layers, get [[mat, d, relaxIfProvided], ...]
-        tmpStack = []
-        if(len(repeat)):
-            repeat = int(repeat)
-        else:
-            repeat = 1
-        for layer in layers.split(","):
-            layer = layer.strip().split(" ")
-            layer[1] = self.parseThicknessWithUnit(layer[1])
-            # the 3rd param of a layer is lattice relaxation ratio
-            if(len(layer) == 2):
-                layer.extend([0.0]) # NOTE: default relaxation ratio is 0.0
-            elif(len(layer) == 3):
-                layer[2] = float(layer[2])
-            tmpStack.append(layer)
-        for layer in (tmpStack * repeat):
-            self.layerInfoList.append(layer)
+        self.parseTokens(self.tokenize(line))
         pass
 
-    # script syntax is strict
-    def run(self, scriptName):
-        ''' read script, set layerInfoList as [[matName, d, r], etc] '''
+    def parseLines(self, lines, filename = "<string>"):
+        ''' one pass over lines, set layerInfoList as [[matName, d, r], etc] '''
         self.layerInfoList = []
-        fileObj = open(Misc.scriptFilename(scriptName), mode="rt", newline='\n')
-        for line in fileObj:
-            line = line.strip()
+        self.filename = filename
+        self.lineNum = 0
+        for line in lines:
+            self.lineNum += 1
             # line with '#' is comment
-            if((not len(line)) or ("#" in line)): continue
-            line = line.expandtabs(1)
-            while(" "*2 in line):
-                line = line.replace(" "*2, " ")
-            self.parseStringLine(line)
+            if(("#" in line) or (not len(line.strip()))): continue
+            self.parseStringLine(line.rstrip("\r\n"))
         return self.layerInfoList
 
+    # script syntax is strict
+    def run(self, scriptName):
+        ''' read script, set layerInfoList as [[matName, d, r], etc] '''
+        filename = Misc.scriptFilename(scriptName)
+        with open(filename, mode="rt", newline='\n') as fileObj:
+            return self.parseLines(fileObj, filename)
+
     def getResult(self):
         return self.layerInfoList
 
@@ -99,4 +246,3 @@ if __name__ == "__main__":
     print("parsing script: ", scriptName)
     print("materialName, thickness, relaxRatio")
     Misc.display(parser.run(scriptName))
-
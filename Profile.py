@@ -0,0 +1,166 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' wall time, call counts and peak memory of each phase and each temperature step
+    usage:
+        profiler = Profile.Profiler()
+        with profiler:
+            structure.rampTemperature(1000, 300)
+        profiler.save(filename)
+    the core code marks phases with "with Profile.phase(name):", which costs
+    nothing but a function call when no profiler is running
+'''
+
+import time, json, contextlib
+import Monitor
+
+# imported by the first profiler that starts, it is slow to import for every process
+tracemalloc = None
+
+# the running profiler, None if not profiling
+current = None
+nullPhase = contextlib.nullcontext()
+
+def phase(name):
+    if current is None:
+        return nullPhase
+    return current.phase(name)
+
+
+class PhaseTimer:
+    ''' context of one phase, nested phases are included in the outer one '''
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.startTime = 0.0
+        self.childPeak = 0
+
+    def __enter__(self):
+        self.profiler.enterPhase(self)
+        self.startTime = time.perf_counter()
+        return self
+
+    def __exit__(self, *excInfo):
+        seconds = time.perf_counter() - self.startTime
+        self.profiler.exitPhase(self, seconds)
+        return False
+
+
+class Profiler:
+    def __init__(self, trackMemory = True):
+        self.trackMemory = trackMemory
+        self.phaseDict = {}   # name => {"calls", "seconds", "peakBytes"}
+        self.stepList = []
+        self.phaseStack = []
+        self.stepStart = None
+        self.startTime = 0.0
+        self.totalSeconds = 0.0
+        self.startedTracing = False
+        self.info = {}
+
+    def phase(self, name):
+        return PhaseTimer(self, name)
+
+    def peakNow(self):
+        if not self.trackMemory: return 0
+        return tracemalloc.get_traced_memory()[1]
+
+    def enterPhase(self, timer):
+        # save the peak of the outer phase, then measure this phase alone
+        if self.trackMemory:
+            if len(self.phaseStack):
+                outer = self.phaseStack[-1]
+                outer.childPeak = max(outer.childPeak, self.peakNow())
+            tracemalloc.reset_peak()
+        self.phaseStack.append(timer)
+
+    def exitPhase(self, timer, seconds):
+        self.phaseStack.pop()
+        peak = max(self.peakNow(), timer.childPeak)
+        if len(self.phaseStack):
+            outer = self.phaseStack[-1]
+            outer.childPeak = max(outer.childPeak, peak)
+        if not timer.name in self.phaseDict:
+            self.phaseDict[timer.name] = {"calls": 0, "seconds": 0.0, "peakBytes": 0}
+        rec = self.phaseDict[timer.name]
+        rec["calls"] += 1
+        rec["seconds"] += seconds
+        rec["peakBytes"] = max(rec["peakBytes"], peak)
+
+    def snapshot(self):
+        return dict(map(lambda kv: [kv[0], [kv[1]["calls"], kv[1]["seconds"]]],\
+                        self.phaseDict.items()))
+
+    def __call__(self, record):
+        ''' listener of Monitor, one record per temperature step '''
+        kind = record["event"]
+        if(kind == "temperatureStep"):
+            if self.trackMemory: tracemalloc.reset_peak()
+            self.stepStart = self.snapshot()
+        elif(kind == "stepDone"):
+            before = self.stepStart
+            phaseDict = {}
+            for [name, [calls, seconds]] in self.snapshot().items():
+                [calls0, seconds0] = before.get(name, [0, 0.0])
+                if(calls > calls0):
+                    phaseDict[name] = {"calls": calls - calls0, "seconds": seconds - seconds0}
+            self.stepList.append({"index": record["index"],\
+                                  "temperature": record["temperature"],\
+                                  "seconds": record["seconds"],\
+                                  "peakBytes": self.peakNow(),\
+                                  "phases": phaseDict})
+            self.stepStart = self.snapshot()
+
+    def start(self):
+        global current, tracemalloc
+        if current is not None:
+            raise Exception("Another profiler is running!")
+        if tracemalloc is None:
+            import tracemalloc
+        if self.trackMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.startedTracing = True
+        current = self
+        self.stepStart = self.snapshot()
+        Monitor.addListener(self, ["temperatureStep", "stepDone"])
+        self.startTime = time.perf_counter()
+        return self
+
+    def stop(self):
+        global current
+        self.totalSeconds += time.perf_counter() - self.startTime
+        Monitor.removeListener(self)
+        current = None
+        if self.startedTracing:
+            tracemalloc.stop()
+            self.startedTracing = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *excInfo):
+        self.stop()
+        return False
+
+    def report(self):
+        return {"totalSeconds": self.totalSeconds,\
+                "trackMemory": self.trackMemory,\
+                "info": self.info,\
+                "phases": self.phaseDict,\
+                "steps": self.stepList}
+
+    def save(self, filename):
+        with open(filename, "w") as fileObj:
+            json.dump(self.report(), fileObj, indent = 1)
+
+
+if __name__ == "__main__":
+    with Profiler() as profiler:
+        with phase("outer"):
+            buf = [0.0]*100000
+            with phase("inner"):
+                buf2 = [1.0]*200000
+    print(json.dumps(profiler.report(), indent = 1))
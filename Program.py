@@ -0,0 +1,207 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' temperature programs of several segments, e.g. growth steps, anneals and cool-downs
+    usage:
+        program = Program.Program(1000)             # start, lattice mismatch is locked here
+        program.hold(600)                           # seconds
+        program.ramp(1300, rate = 1.0)              # K/s, a point every 10 K by default
+        program.ramp(300, rate = 0.5, tolerance = 0.01)
+        program.ramp(700, numOfSteps = 5)           # straight to a target, no time passes
+        for [idx, segment, timeList, resultList] in program.run(structure):
+            Misc.saveResult(resultList, "recipe_" + str(idx))
+    a resultList is that of Structure.rampTemperature, timeList has the seconds of each row
+    step policy of a ramp, in order of precedence:
+        numOfSteps  points evenly spaced, ends included
+        stepSize    in K, 10 K by default
+        tolerance   in 1/m, points are added where the curvature changes more between two points
+    a hold gives its start and end, or numOfSteps points
+
+    every temperature is solved with lattice mismatch locked at the start of the program,
+    as rampTemperature(start, temperature), results are streamed segment by segment
+    a factorization of Sensitivity is shared by all temperatures with the same moduli,
+    so a temperature costs O(n^2) for its mismatch and O(n) per neutral plane trial,
+    and a temperature visited again, in a hold or a later segment, is not solved again
+    graded layers and the large deflection mode of the structure are solved by Structure.run
+'''
+
+import Misc, Unit, Elasticity, Sensitivity
+
+segmentKindList = ["hold", "ramp"]
+defaultStepSize = 10.0
+
+class Program:
+    def __init__(self, tempStart):
+        self.tempStart = float(tempStart)
+        # [kind, target temperature, duration in s or None, step policy]
+        self.segmentList = []
+
+    def lastTemperature(self):
+        return self.segmentList[-1][1] if len(self.segmentList) else self.tempStart
+
+    def addSegment(self, kind, target = None, duration = None, rate = None,\
+                   numOfSteps = None, stepSize = None, tolerance = None):
+        ''' generic segment, hold and ramp are the usual shortcuts '''
+        if(not kind in segmentKindList):
+            raise Exception("Segment should be one of " + ", ".join(segmentKindList))
+        begin = self.lastTemperature()
+        if(kind == "hold"):
+            target = begin
+        elif target is None:
+            raise Exception("A ramp needs a target temperature")
+        target = float(target)
+        if(rate is not None):
+            if(rate <= 0.0):
+                raise Exception("Rate should be positive, in K/s")
+            duration = abs(target - begin)/rate
+        if(numOfSteps is not None and numOfSteps < 2):
+            raise Exception("Error, number of temperture steps less than 2!")
+        if(stepSize is not None and stepSize <= 0.0):
+            raise Exception("Step size should be positive, in K")
+        policy = {"numOfSteps": numOfSteps, "stepSize": stepSize, "tolerance": tolerance}
+        self.segmentList.append([kind, target, duration, policy])
+        return self
+
+    def hold(self, duration, numOfSteps = 2):
+        return self.addSegment("hold", duration = duration, numOfSteps = numOfSteps)
+
+    def ramp(self, target, rate = None, numOfSteps = None, stepSize = None, tolerance = None):
+        return self.addSegment("ramp", target, None, rate, numOfSteps, stepSize, tolerance)
+
+    def segmentTemperatures(self, begin, segment):
+        ''' initial temperatures of a segment, ends included '''
+        [kind, target, duration, policy] = segment
+        numOfSteps = policy["numOfSteps"]
+        if numOfSteps is None:
+            if(kind == "hold"):
+                numOfSteps = 2
+            else:
+                stepSize = policy["stepSize"] or defaultStepSize
+                numOfSteps = max(2, int(abs(target - begin)/stepSize + 0.999999) + 1)
+        step = (target - begin)/(numOfSteps - 1.0)
+        return list(map(lambda i: begin + i*step, range(numOfSteps)))
+
+    #########################################################
+    # solving, shared by all segments
+
+    def solve(self, temp):
+        ''' [neutralPlanePos, root] at a temperature, cached '''
+        key = round(temp, 9)
+        if(key in self.solveDict):
+            return self.solveDict[key]
+        eqParams = self.structure.getEqParameters(self.tempStart, temp)
+        if(eqParams[4] is None and self.structure.largeDeflection is None):
+            sens = self.factorizations.get(eqParams)
+            [neutralPlanePos, root] = sens.minimize()
+        else:
+            # graded layers or large deflection, as rampTemperature
+            rlt = self.structure.run(eqParams)
+            neutralPlanePos = rlt[1]
+            root = list(map(lambda layer: layer.force, self.structure.layerStack))
+            root.append(self.structure.layerStack[0].reciprocalOfRadius)
+        self.solveDict[key] = [neutralPlanePos, root]
+        return self.solveDict[key]
+
+    def curvature(self, temp):
+        return self.solve(temp)[1][-1]
+
+    def result(self, temp):
+        ''' [T, radius, neutralPlanePos, stressDist, strainDist, polarDist] as rampTemperature '''
+        [neutralPlanePos, root] = self.solve(temp)
+        if self.graded:
+            # grading of the layers at this temperature
+            self.structure.getEqParameters(self.tempStart, temp)
+        r = root[-1]
+        radius = float('inf')
+        if(r != 0.0): radius = 1.0/r
+        for i in range(len(self.structure.layerStack)):
+            self.structure.layerStack[i].setForceAndReciprocalOfRadius(root[i], 1.0/radius)
+        return [temp, radius, neutralPlanePos, self.structure.stress(), self.structure.strain(),\
+                self.structure.polarization()]
+
+    def refine(self, tempList, tolerance):
+        ''' bisect the steps along which the curvature changes more than tolerance '''
+        tolerance = tolerance/Unit.length["m"]
+        minStep = abs(tempList[-1] - tempList[0])*1e-3
+        refined = [tempList[0]]
+        for temp in tempList[1:]:
+            pending = [temp]
+            while(len(pending)):
+                [low, high] = [refined[-1], pending[-1]]
+                if(abs(high - low) > minStep and\
+                   abs(self.curvature(high) - self.curvature(low)) > tolerance):
+                    pending.append((low + high)/2.0)
+                else:
+                    refined.append(pending.pop())
+        return refined
+
+    def run(self, structure):
+        ''' yield [segment index, segment, timeList, resultList] segment by segment '''
+        self.structure = structure
+        self.graded = any(map(lambda layer: isinstance(layer, Elasticity.GradedLayer), structure.layerStack))
+        self.factorizations = Sensitivity.Factorizations(structure, self.tempStart)
+        self.solveDict = {}
+        if structure.largeDeflection is not None: structure.largeDeflection.reset()
+        [begin, clock] = [self.tempStart, 0.0]
+        for idx in range(len(self.segmentList)):
+            segment = self.segmentList[idx]
+            [kind, target, duration, policy] = segment
+            tempList = self.segmentTemperatures(begin, segment)
+            if(kind == "ramp" and policy["tolerance"] is not None and policy["numOfSteps"] is None):
+                tempList = self.refine(tempList, policy["tolerance"])
+            if(duration is None): duration = 0.0
+            if(kind == "hold"):
+                timeList = list(map(lambda i: clock + duration*i/(len(tempList) - 1.0),\
+                                    range(len(tempList))))
+            else:
+                span = target - begin
+                timeList = list(map(lambda t: clock + (duration*(t - begin)/span if span else 0.0),\
+                                    tempList))
+            resultList = list(map(self.result, tempList))
+            yield [idx, segment, timeList, resultList]
+            [begin, clock] = [target, clock + duration]
+
+    def curvatureTable(self, structure):
+        ''' [[segment index, time(s), T(K), R(m), curvature(1/m)], etc] of the whole program '''
+        table = []
+        for [idx, segment, timeList, resultList] in self.run(structure):
+            for j in range(len(resultList)):
+                [temp, radius] = resultList[j][0:2]
+                table.append([idx, timeList[j], temp, radius/Unit.length["m"], Unit.length["m"]/radius])
+        return table
+
+    def save(self, structure, dataName):
+        ''' an _rlt file per segment, as Misc.saveResult, return the file names '''
+        filenameList = []
+        for [idx, segment, timeList, resultList] in self.run(structure):
+            name = dataName + "_seg" + str(idx) + "_" + segment[0]
+            Misc.saveResult(resultList, name)
+            filenameList.append(Misc.outputFilename(name))
+        return filenameList
+
+
+if __name__ == "__main__":
+    import time
+    structure = Elasticity.Structure("GaNOnSapph")
+    # grow at 1000 K, anneal at 1300 K, cool down, a second heat cycle, cool down again
+    program = Program(1000)
+    program.hold(600)
+    program.ramp(1300, rate = 1.0, stepSize = 50)
+    program.hold(1200)
+    program.ramp(300, rate = 0.5, tolerance = 0.02)
+    program.ramp(1000, rate = 1.0, stepSize = 50)
+    program.ramp(300, rate = 0.5, stepSize = 50)
+    startTime = time.perf_counter()
+    table = program.curvatureTable(structure)
+    print(len(table), "points,", len(program.solveDict), "solved, in", time.perf_counter() - startTime, "s")
+    Misc.display(table)
+    # the same temperatures by rampTemperature
+    startTime = time.perf_counter()
+    result = structure.rampTemperature(1000, 300, 15)
+    print("rampTemperature with", len(result), "points in", time.perf_counter() - startTime, "s")
+    curvature = lambda radius: Unit.length["m"]/radius
+    print("max difference of curvature", max(map(lambda rlt: abs(curvature(rlt[1]) -\
+                                                  curvature(program.result(rlt[0])[1])), result)), "1/m")
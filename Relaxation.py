@@ -0,0 +1,175 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' relax ratios tied to the computed strain of each layer
+    usage:
+        relaxation = Relaxation.Relaxation(structure, 1000)     # at growth temperature
+        relaxList = relaxation.run()                            # script order, set into the layers
+        rlt = structure.cooldown()
+    criteria, each gives the largest mean strain a layer keeps:
+        thickness   Matthews-Blakeslee equilibrium of 60 degree dislocations,
+                    strain = b*(1 - v/4)*(ln(h/b) + 1)/(4*pi*h*(1 + v)),
+                    b is burgersVector in A, the lattice of the layer by default
+        energy      strain energy of the layer, Layer.getStrainEnergy()/2, up to criticalEnergy in J/m^2
+    a layer above that strain relaxes its bottom interface, never below the relax of the script,
+    the bottom layer does not relax, relax stays within [0, 1]
+
+    relax only changes the lattice part of an interface mismatch, all other terms are kept,
+    the stack is solved in the reduced form of Growth, O(n) per solve,
+    a sweep from the bottom moves every relax at once, with the strain of each layer
+    following the mismatch below it, and a solve corrects for the bending
+'''
+
+import math
+import Misc, Unit, Elasticity, Newton, Growth
+
+criterionList = ["thickness", "energy"]
+
+class Relaxation:
+    def __init__(self, structure, tempBegin, tempEnd = None, criterion = "thickness",\
+                 criticalEnergy = 1.0, burgersVector = None):
+        ''' lattice mismatch is locked at tempBegin, the stack relaxes at tempEnd '''
+        if(not criterion in criterionList):
+            raise Exception("Criterion should be one of " + ", ".join(criterionList))
+        if tempEnd is None: tempEnd = tempBegin
+        self.structure = structure
+        self.tempBegin = tempBegin
+        self.tempEnd = tempEnd
+        self.criterion = criterion
+        # J/m^2 = N/m
+        self.criticalEnergy = criticalEnergy*Unit.GPa*1e-9*Unit.length["m"]
+        self.burgersVector = burgersVector
+        self.history = []
+        self.setTerms()
+
+    def setTerms(self):
+        ''' terms that do not change with relax, bottom first '''
+        stack = self.structure.layerStack
+        for layer in stack:
+            if isinstance(layer, Elasticity.GradedLayer):
+                raise Exception("Relaxation does not support graded layers")
+        [n, self.young, self.thick, mismatchList, gradedList] =\
+            self.structure.getEqParameters(self.tempBegin, self.tempEnd)
+        self.n = n
+        self.youngEnergy = list(map(lambda layer: layer.material.getYoungsModulus()/\
+                                    (1.0 - layer.material.getPoissonsRatio()), stack))
+        self.relax = list(map(lambda layer: layer.bottomInterfaceRelax, stack))
+        self.relaxFloor = list(self.relax)
+        # lattice mismatch below each layer without relax, and the rest of the mismatch
+        self.lattice = [0.0]*n
+        self.rest = [0.0]*n
+        for i in range(1, n):
+            saved = stack[i].bottomInterfaceRelax
+            stack[i].bottomInterfaceRelax = 0.0
+            self.lattice[i] = Elasticity.Structure.latticeMismatchStrain(stack[i-1], stack[i], self.tempBegin)
+            stack[i].bottomInterfaceRelax = saved
+            self.rest[i] = mismatchList[i-1] - self.lattice[i]*(1.0 - self.relax[i])
+        self.mismatch = mismatchList
+        # largest strain of the thickness criterion, from the geometry only
+        self.strainLimit = [float('inf')]*n
+        if(self.criterion == "thickness"):
+            for i in range(1, n):
+                material = stack[i].material
+                b = self.burgersVector
+                if b is None: b = material.getLattice(self.tempBegin)
+                b *= 0.1*Unit.length["nm"]
+                v = material.getPoissonsRatio(self.tempEnd)
+                h = self.thick[i]
+                if(h > b):
+                    self.strainLimit[i] = b*(1.0 - v/4.0)*(math.log(h/b) + 1.0)/(4.0*math.pi*h*(1.0 + v))
+
+    def setMismatch(self, i):
+        ''' mismatch of the interface below the i-th layer, after its relax changed '''
+        self.mismatch[i-1] = self.lattice[i]*(1.0 - self.relax[i]) + self.rest[i]
+
+    def solve(self):
+        ''' [radius, mean strain of each layer], the layers get their force and 1/R '''
+        system = Growth.reduceStack(self.young, self.youngEnergy, self.thick, self.mismatch)
+        minimizer = Newton.Min(lambda x: Growth.Growth.solveAt(system, x)[2], 0, sum(self.thick), 1e-18)
+        neutralPlanePos = minimizer.run()[0]
+        [s0, r, energy] = Growth.Growth.solveAt(system, neutralPlanePos)
+        radius = float('inf')
+        if(r != 0.0): radius = 1.0/r
+        strainList = [0.0]*self.n
+        [P, M] = [0.0, 0.0]
+        for i in range(self.n):
+            if(i > 0):
+                P += (self.thick[i-1] + self.thick[i])/2.0
+                M += self.mismatch[i-1]
+            strainList[i] = s0 + r*P - M
+            self.structure.layerStack[i].setForceAndReciprocalOfRadius(\
+                self.young[i]*self.thick[i]*strainList[i], r)
+        return [radius, strainList]
+
+    def targetStrain(self, i, strain, solvedStrain):
+        ''' the mean strain the i-th layer keeps, of the sign of strain
+            solvedStrain is the strain of the last solve, at which the layer has its energy '''
+        if(self.criterion == "thickness"):
+            limit = self.strainLimit[i]
+        else:
+            # energy goes with the square of strain, not with the shift of the sweep
+            energy = self.structure.layerStack[i].getStrainEnergy()/2.0
+            if(energy <= 0.0): return strain
+            limit = abs(solvedStrain)*math.sqrt(self.criticalEnergy/energy)
+        return math.copysign(limit, strain)
+
+    def sweep(self, strainList):
+        ''' move every relax toward its target from the bottom, return the largest change '''
+        # s[i] = s0 + r*P[i] - M[i], M[i] sums the mismatch below, d m/d relax = -lattice
+        shift = 0.0
+        maxChange = 0.0
+        for i in range(1, self.n):
+            if(self.lattice[i] == 0.0): continue
+            strain = strainList[i] + shift
+            target = self.targetStrain(i, strain, strainList[i])
+            relax = self.relax[i] + (target - strain)/self.lattice[i]
+            relax = min(1.0, max(self.relaxFloor[i], relax))
+            change = relax - self.relax[i]
+            if(change == 0.0): continue
+            shift += self.lattice[i]*change
+            self.relax[i] = relax
+            self.setMismatch(i)
+            maxChange = max(maxChange, abs(change))
+        return maxChange
+
+    def run(self, maxIter = 50, tolerance = 1e-6):
+        ''' relax of each layer in script order, self.history has [iteration, max change, R(m)] '''
+        self.history = []
+        for iteration in range(maxIter):
+            [radius, strainList] = self.solve()
+            change = self.sweep(strainList)
+            self.history.append([iteration, change, radius/Unit.length["m"]])
+            if(change < tolerance): break
+        if(change >= tolerance):
+            raise Exception("Relaxation did not converge in " + str(maxIter) + " iterations!")
+        # the layers keep the forces of the final relax
+        radius = self.solve()[0]
+        self.history.append([len(self.history), 0.0, radius/Unit.length["m"]])
+        for i in range(1, self.n):
+            self.structure.layerStack[i].setBottomInterfaceRelax(self.relax[i])
+        return list(reversed(self.relax))
+
+
+if __name__ == "__main__":
+    import time
+    # AlGaN/GaN superlattice of 1000 layers on a relaxed GaN buffer
+    records = [["GaN", 100.0, 0.0]] + [["Al30%GaN", 12.0, 0.0], ["GaN", 40.0, 0.0]]*500 +\
+              [["AlN", 300.0, 0.0], ["GaN", 2000.0, 1.0], ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+    structure = Elasticity.Structure.fromLayerList(records)
+    relaxation = Relaxation(structure, 1000)
+    startTime = time.perf_counter()
+    relaxList = relaxation.run()
+    print(len(relaxList), "layers in", time.perf_counter() - startTime, "s")
+    Misc.display(relaxation.history)
+    print("relax of the top layers", relaxList[0:5], "AlN", relaxList[-3])
+    # the relaxed stack with the full solver, at the same temperature
+    small = [["GaN", 100.0, 0.0], ["Al30%GaN", 12.0, 0.0], ["GaN", 40.0, 0.0], ["AlN", 300.0, 0.0],\
+             ["GaN", 2000.0, 1.0], ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+    structure = Elasticity.Structure.fromLayerList(small)
+    relaxation = Relaxation(structure, 1000, criterion = "energy", criticalEnergy = 0.5)
+    relaxList = relaxation.run()
+    rlt = structure.statusquo(1000)
+    print("energy criterion", relaxList, "R", rlt[0][1]/Unit.length["m"], relaxation.history[-1][2])
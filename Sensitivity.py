@@ -0,0 +1,385 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' derivatives of curvature and of stress at chosen depths, by the adjoint method
+    usage:
+        sens = Sensitivity.Sensitivity(structure, 1000, 300)
+        rowList = sens.run([0.0, 100.0])    # depths in nm from the top surface
+    a row is [layer index, layer name, field, d curvature, d stress at each depth],
+    layers are indexed in script order, i.e. the top layer is 0,
+    fields are thickness (per nm), relax (per unit, not for the bottom layer)
+    and composition (per %, alloys only),
+    curvature is 1/R in 1/m and stress is in GPa
+
+    m(p, x0).x = b(p) is the system of Equation.buildEq, x = [f1..fn, r]
+    for an output J(x, p), the adjoint l solves transpose(m).l = dJ/dx, then
+        dJ/dp = J_p + l.(b_p - m_p.x) at a fixed neutral plane x0
+    x0 minimizes the strain energy U, so dU/dx0 = G(x0, p) = 0, and
+        dx0/dp = - G_p/G_x0, with G and U_p from the same adjoint of U at x0 +- h
+    only the moment row depends on x0, so one inverse of m serves every solve
+    through rank one updates, instead of 2n full runs with their own neutral plane search
+'''
+
+import random
+import Unit, Elasticity, Equation, Solver, Newton
+
+fieldList = ["thickness", "relax", "composition"]
+
+class Sensitivity:
+    def __init__(self, structure, tempBegin, tempEnd = None, step = 1e-4):
+        ''' step is the shift of x0 relative to the total thickness, for G_x0 and G_p '''
+        if structure.largeDeflection is not None:
+            raise Exception("Sensitivity is of the linear eqs, not of the large deflection mode!")
+        if tempEnd is None: tempEnd = tempBegin
+        self.structure = structure
+        self.tempBegin = tempBegin
+        self.tempEnd = tempEnd
+        self.step = step
+
+    #########################################################
+    # terms of the system, bottom first as Structure.layerStack
+
+    def solveBase(self):
+        ''' solve as Structure.run, keep the inverse of m at the neutral plane '''
+        eqParams = self.structure.getEqParameters(self.tempBegin, self.tempEnd)
+        rlt = self.structure.run(eqParams)
+        self.factorize(eqParams, rlt[1])
+
+    def factorize(self, eqParams, x0):
+        ''' inverse of m at the neutral plane x0, the expensive step '''
+        if eqParams[4] is not None:
+            raise Exception("Sensitivity of graded layers is not supported!")
+        self.eqParams = eqParams
+        [self.n, self.young, self.thick, self.mismatch] = eqParams[0:4]
+        # modulus at the material temperature, as Layer.getStress and getStrainEnergy
+        self.youngEnergy = list(map(lambda layer: layer.material.getYoungsModulus()/\
+                                    (1.0 - layer.material.getPoissonsRatio()), self.structure.layerStack))
+        self.bottomList = list(map(lambda i: sum(self.thick[0:i]), range(self.n + 1)))
+        self.x0 = x0
+        [m, b] = Equation.buildEq(self.n, self.young, self.thick, self.mismatch, self.x0)
+        eq = Solver.LinearEq(m, b, True)
+        eq.solve()
+        self.inv = eq.getInverseMatrix()
+        self.root = eq.getRoot()
+        # the moment row at x1 is the row at x0 - (x1 - x0) for forces, and C(x1) for r,
+        # so m changes by a rank one update of the last row, see shifted()
+        self.inertiaX0 = self.inertia(x0)
+        self.lastCol = list(map(lambda row: row[-1], self.inv))
+        self.forceAdjoint = self.adjoint([1.0]*self.n + [0.0])
+        self.lastAdjoint = list(self.inv[self.n])
+
+    def setMismatch(self, mismatchStrainList):
+        ''' new interface mismatch with the same factorization, O(n^2) '''
+        self.mismatch = mismatchStrainList
+        b = list(map(lambda k: -mismatchStrainList[k], range(self.n - 1))) + [0.0, 0.0]
+        self.root = Solver.ArrayOp.matDotVec(self.inv, b)
+
+    def minimize(self):
+        ''' [x0, x] of the current mismatch, neutral plane as Structure.run with O(n) trials '''
+        minimizer = Newton.Min(lambda x0: self.energy(self.shifted(x0)[0]), 0, self.bottomList[-1], 1e-18)
+        x0 = minimizer.run()[0]
+        return [x0, self.shifted(x0)[0]]
+
+    def adjoint(self, g):
+        ''' transpose(inv).g '''
+        return list(map(lambda j: sum(map(lambda i: self.inv[i][j]*g[i], range(self.n + 1))),\
+                        range(self.n + 1)))
+
+    def inertia(self, x0):
+        ''' C of Equation.momentEq, the r coefficient of the moment row '''
+        bottom = self.bottomList
+        return sum(map(lambda i: self.young[i]*((bottom[i+1] - x0)**3 - (bottom[i] - x0)**3),\
+                       range(self.n)))/3.0
+
+    def shifted(self, x0):
+        ''' [x, adjoint solver] of the system with the neutral plane at x0, O(n) '''
+        n = self.n
+        # u = moment row at x0 - row at self.x0 = [-dx0]*n + [dC]
+        [dx0, dC] = [x0 - self.x0, self.inertia(x0) - self.inertiaX0]
+        dot = lambda v: -dx0*sum(v[0:n]) + dC*v[n]
+        w = self.lastCol
+        denom = 1.0 + dot(w)
+        ux = dot(self.root)
+        x = list(map(lambda j: self.root[j] - w[j]*ux/denom, range(n + 1)))
+        def adjointSolve(g):
+            # transpose(inv).u = -dx0*forceAdjoint + dC*lastAdjoint
+            lam = self.adjoint(g)
+            wg = sum(map(lambda j: w[j]*g[j], range(n + 1)))
+            return list(map(lambda j: lam[j] - (-dx0*self.forceAdjoint[j] + dC*self.lastAdjoint[j])*\
+                            wg/denom, range(n + 1)))
+        return [x, adjointSolve]
+
+    def energy(self, x):
+        ''' strain energy as the sum of Layer.getStrainEnergy '''
+        [n, thick, youngE] = [self.n, self.thick, self.youngEnergy]
+        return sum(map(lambda i: x[i]**2/(thick[i]*youngE[i]) +\
+                       thick[i]**3*youngE[i]/48.0*x[n]**2, range(n)))
+
+    def residualTerms(self, x0, x, lam):
+        ''' l.(b_p - m_p.x) for p in young, thick and mismatch, and l.(-m_x0.x) '''
+        [n, young, thick, bottom] = [self.n, self.young, self.thick, self.bottomList]
+        f = x[0:n]
+        r = x[n]
+        dYoung = [0.0]*n
+        dThick = [0.0]*n
+        # interface k: -f[k]/(E[k]h[k]) + f[k+1]/(E[k+1]h[k+1]) - r*(h[k] + h[k+1])/2 = -m[k]
+        dMismatch = list(map(lambda k: -lam[k], range(n - 1)))
+        for k in range(n - 1):
+            dYoung[k] -= lam[k]*f[k]/(young[k]**2*thick[k])
+            dThick[k] -= lam[k]*(f[k]/(young[k]*thick[k]**2) - r/2.0)
+            dYoung[k+1] -= lam[k]*(-f[k+1]/(young[k+1]**2*thick[k+1]))
+            dThick[k+1] -= lam[k]*(-f[k+1]/(young[k+1]*thick[k+1]**2) - r/2.0)
+        # moment: sum(f[i]*(p[i] - x0)) + r*C = 0, p[i] = bottom[i] - h[i-1]/2 as Equation.momentEq
+        # C = sum(E[i]*((bottom[i+1] - x0)^3 - (bottom[i] - x0)^3))/3
+        lm = lam[n]
+        sq = list(map(lambda s: (s - x0)**2, bottom))
+        for i in range(n):
+            dYoung[i] -= lm*r*((bottom[i+1] - x0)**3 - (bottom[i] - x0)**3)/3.0
+        # dp[i]/dh[j] = (j < i) - (j == i - 1 mod n)/2
+        # dC/dh[j] = sum(E[i]*sq[i+1], i >= j) - sum(E[i]*sq[i], i > j)
+        [forceAbove, inertiaAbove] = [0.0, 0.0]
+        for j in reversed(range(n)):
+            inertia = young[j]*sq[j+1] + inertiaAbove
+            dThick[j] -= lm*(forceAbove - f[(j + 1)%n]/2.0 + r*inertia)
+            forceAbove += f[j]
+            inertiaAbove += young[j]*sq[j+1] - young[j]*sq[j]
+        # dC/dx0 = -sum(E[i]*(sq[i+1] - sq[i]))
+        dInertia = -sum(map(lambda i: young[i]*(sq[i+1] - sq[i]), range(n)))
+        dX0 = -lm*(-sum(f) + r*dInertia)
+        return [dYoung, dThick, dMismatch, dX0]
+
+    def energyTerms(self, x):
+        ''' [dU/dx, dU/dh, dU/dE'] of U = sum(f^2/(h*E') + h^3*E'*r^2/48) '''
+        [n, thick, youngE] = [self.n, self.thick, self.youngEnergy]
+        f = x[0:n]
+        r = x[n]
+        dx = list(map(lambda i: 2.0*f[i]/(thick[i]*youngE[i]), range(n)))
+        dx.append(2.0*r*sum(map(lambda i: thick[i]**3*youngE[i]/48.0, range(n))))
+        dThick = list(map(lambda i: -f[i]**2/(thick[i]**2*youngE[i]) +\
+                          3.0*thick[i]**2*youngE[i]*r**2/48.0, range(n)))
+        dYoungE = list(map(lambda i: -f[i]**2/(thick[i]*youngE[i]**2) +\
+                           thick[i]**3*r**2/48.0, range(n)))
+        return [dx, dThick, dYoungE]
+
+    def energyGradient(self, x0):
+        ''' [G = dU/dx0, dU/dp at fixed x0 as [dYoung, dThick, dMismatch, dYoungEnergy]] '''
+        [x, adjointSolve] = self.shifted(x0)
+        [dx, dThick, dYoungE] = self.energyTerms(x)
+        [rYoung, rThick, rMismatch, G] = self.residualTerms(x0, x, adjointSolve(dx))
+        return [G, [rYoung, list(map(lambda i: dThick[i] + rThick[i], range(self.n))),\
+                    rMismatch, dYoungE]]
+
+    def neutralPlaneDerivative(self):
+        ''' dx0/dp as [dYoung, dThick, dMismatch, dYoungEnergy] '''
+        h = self.step*self.bottomList[-1]
+        [gUp, pUp] = self.energyGradient(self.x0 + h)
+        [gDown, pDown] = self.energyGradient(self.x0 - h)
+        gx0 = (gUp - gDown)/(2.0*h)
+        if(gx0 <= 0.0):
+            raise Exception("Neutral plane is not at a minimum of strain energy!")
+        return list(map(lambda k: list(map(lambda i: -(pUp[k][i] - pDown[k][i])/(2.0*h)/gx0,\
+                                           range(len(pUp[k])))), range(4)))
+
+    #########################################################
+    # outputs
+
+    def locate(self, depth):
+        ''' [layer index, local position] of a depth from the top surface '''
+        pos = self.bottomList[-1] - depth
+        if(pos < 0.0 or depth < 0.0):
+            raise Exception("Depth " + str(depth) + " is outside of the stack!")
+        for i in reversed(range(self.n)):
+            if(pos >= self.bottomList[i]):
+                return [i, pos - self.bottomList[i]]
+        return [0, pos]
+
+    def outputTerms(self, depth):
+        ''' [dJ/dx, explicit dJ/dp as [dYoung, dThick, dMismatch, dYoungEnergy]] '''
+        n = self.n
+        zero = [[0.0]*n, [0.0]*n, [0.0]*(n - 1), [0.0]*n]
+        dx = [0.0]*(n + 1)
+        if depth is None:
+            # curvature
+            dx[n] = 1.0
+            return [dx, zero]
+        # stress = f/h + E'*(x - h/2)*r/2 as Layer.getStress, x = sum(h[j], j >= i) - depth
+        [i, x] = self.locate(depth)
+        [f, r, h, youngE] = [self.root[i], self.root[n], self.thick[i], self.youngEnergy[i]]
+        dx[i] = 1.0/h
+        dx[n] = youngE*(x - h/2.0)/2.0
+        for j in range(i + 1, n): zero[1][j] = youngE*r/2.0
+        zero[1][i] = -f/h**2 + youngE*r/4.0
+        zero[3][i] = (x - h/2.0)*r/2.0
+        return [dx, zero]
+
+    def outputGradient(self, depth, dx0):
+        ''' dJ/dp as [dYoung, dThick, dMismatch, dYoungEnergy], depth None for curvature '''
+        [dx, explicit] = self.outputTerms(depth)
+        [rYoung, rThick, rMismatch, dJdx0] = self.residualTerms(self.x0, self.root, self.adjoint(dx))
+        residual = [rYoung, rThick, rMismatch, [0.0]*self.n]
+        return list(map(lambda k: list(map(lambda i: explicit[k][i] + residual[k][i] +\
+                                           dJdx0*dx0[k][i], range(len(explicit[k])))), range(4)))
+
+    def outputValue(self, depth):
+        if depth is None:
+            return self.root[self.n]
+        [i, x] = self.locate(depth)
+        return self.structure.layerStack[i].getStress(min(x, self.thick[i]))
+
+    #########################################################
+    # layer parameters => young, thick, mismatch, youngEnergy
+
+    def parameterTerms(self, i):
+        ''' [E, E', mismatch below, mismatch above] of the i-th layer of the stack '''
+        stack = self.structure.layerStack
+        layer = stack[i]
+        material = layer.material
+        young = material.getYoungsModulus(self.tempEnd)/(1.0 - material.getPoissonsRatio(self.tempEnd))
+        youngE = material.getYoungsModulus()/(1.0 - material.getPoissonsRatio())
+        mismatch = [0.0, 0.0]
+        Structure = Elasticity.Structure
+        if(i > 0):
+            mismatch[0] = Structure.latticeMismatchStrain(stack[i-1], layer, self.tempBegin) +\
+                Structure.thermalMismatchStrain(stack[i-1], layer, self.tempBegin, self.tempEnd)
+        if(i < self.n - 1):
+            mismatch[1] = Structure.latticeMismatchStrain(layer, stack[i+1], self.tempBegin) +\
+                Structure.thermalMismatchStrain(layer, stack[i+1], self.tempBegin, self.tempEnd)
+        return [young, youngE] + mismatch
+
+    def parameterDerivative(self, i, field):
+        ''' {(kind, index): derivative} of the system parameters, kind as in outputGradient '''
+        if(field == "thickness"):
+            return {(1, i): 1.0}
+        layer = self.structure.layerStack[i]
+        if(field == "relax"):
+            # mismatch is linear in relax
+            saved = layer.bottomInterfaceRelax
+            layer.bottomInterfaceRelax = saved + 0.5
+            up = self.parameterTerms(i)
+            layer.bottomInterfaceRelax = saved - 0.5
+            down = self.parameterTerms(i)
+            layer.bottomInterfaceRelax = saved
+            delta = 1.0
+        else:
+            # alloy properties are linear in composition, one percent either way
+            material = layer.material
+            x = int(round(material.getXofAxBC(material.name)*100))
+            if(x < 0):
+                raise Exception("Composition of " + material.name + " can not be varied!")
+            [xUp, xDown] = [min(x + 1, 99), max(x - 1, 0)]
+            nameOf = lambda v: material.name.replace(str(x).zfill(2) + "%", str(v).zfill(2) + "%")
+            layer.material = Elasticity.loadMaterial(nameOf(xUp))
+            up = self.parameterTerms(i)
+            layer.material = Elasticity.loadMaterial(nameOf(xDown))
+            down = self.parameterTerms(i)
+            layer.material = material
+            delta = float(xUp - xDown)
+        d = list(map(lambda k: (up[k] - down[k])/delta, range(4)))
+        terms = {(0, i): d[0], (3, i): d[1]}
+        if(i > 0): terms[(2, i - 1)] = d[2]
+        if(i < self.n - 1): terms[(2, i)] = d[3]
+        return terms
+
+    def run(self, depthList = [], fields = fieldList):
+        ''' [[layer index, name, field, d curvature, d stress at each depth], etc] '''
+        self.solveBase()
+        dx0 = self.neutralPlaneDerivative()
+        depthList = list(map(lambda d: d*Unit.length["nm"], depthList))
+        gradList = list(map(lambda d: self.outputGradient(d, dx0), [None] + depthList))
+        scaleList = [Unit.length["m"]] + [1.0/Unit.GPa]*len(depthList)
+        self.valueList = list(map(lambda j: self.outputValue(([None] + depthList)[j])*scaleList[j],\
+                                  range(len(gradList))))
+        rowList = []
+        for idx in range(self.n):
+            i = self.n - 1 - idx
+            layer = self.structure.layerStack[i]
+            for field in fields:
+                if(field == "composition" and layer.material.getXofAxBC(layer.material.name) < 0):
+                    continue
+                # the bottom layer has no interface below
+                if(field == "relax" and i == 0): continue
+                terms = self.parameterDerivative(i, field)
+                unit = Unit.length["nm"] if field == "thickness" else 1.0
+                row = [idx, layer.material.name, field]
+                for j in range(len(gradList)):
+                    value = sum(map(lambda key: gradList[j][key[0]][key[1]]*terms[key], terms))
+                    row.append(value*unit*scaleList[j])
+                rowList.append(row)
+        return rowList
+
+
+class Factorizations:
+    ''' factorizations of a structure, shared by the temperatures with the same moduli
+        an inverse is O(n^2) in memory, at most maxSize of them are kept, the least recently used goes '''
+    def __init__(self, structure, tempBegin, maxSize = 16):
+        self.structure = structure
+        self.tempBegin = tempBegin
+        self.maxSize = maxSize
+        # insertion order is the order of use
+        self.factorDict = {}
+
+    def get(self, eqParams):
+        ''' Sensitivity factorized for eqParams, with its mismatch set '''
+        key = tuple(eqParams[1]) + tuple(eqParams[2])
+        sens = self.factorDict.pop(key, None)
+        if sens is None:
+            sens = Sensitivity(self.structure, self.tempBegin)
+            sens.factorize(eqParams, sum(eqParams[2])/2.0)
+            while(len(self.factorDict) >= self.maxSize):
+                del self.factorDict[next(iter(self.factorDict))]
+        self.factorDict[key] = sens
+        sens.setMismatch(eqParams[3])
+        return sens
+
+
+#########################################################
+# finite differences of the same outputs, for checking
+
+def finiteDifference(layerInfoList, tempBegin, tempEnd, depthList, idx, field, delta):
+    ''' central difference of [curvature, stress at each depth] for one layer parameter '''
+    valueList = []
+    for sign in [1.0, -1.0]:
+        infoList = list(map(list, layerInfoList))
+        if(field == "thickness"):
+            infoList[idx][1] += sign*delta
+        elif(field == "relax"):
+            infoList[idx][2] += sign*delta
+        else:
+            name = infoList[idx][0]
+            x = int(round(Elasticity.Material.getXofAxBC(name)*100))
+            infoList[idx][0] = name.replace(str(x).zfill(2) + "%", str(x + int(sign*delta)).zfill(2) + "%")
+        random.seed(0)
+        structure = Elasticity.Structure.fromLayerList(infoList)
+        sens = Sensitivity(structure, tempBegin, tempEnd)
+        sens.solveBase()
+        valueList.append(list(map(lambda d: sens.outputValue(d), [None] + depthList)))
+    scaleList = [Unit.length["m"]] + [1.0/Unit.GPa]*len(depthList)
+    return list(map(lambda j: (valueList[0][j] - valueList[1][j])/(2.0*delta)*scaleList[j],\
+                    range(len(scaleList))))
+
+
+if __name__ == "__main__":
+    import time
+    infoList = [["GaN", 1000.0, 0.0], ["Al20%GaN", 50.0, 0.0], ["AlN", 100.0, 0.3],\
+                ["GaN", 2000.0, 1.0], ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+    depthList = [0.0, 1020.0, 1100.0]
+    random.seed(0)
+    structure = Elasticity.Structure.fromLayerList(infoList)
+    sens = Sensitivity(structure, 1000, 300)
+    startTime = time.perf_counter()
+    rowList = sens.run(depthList)
+    print("adjoint in", time.perf_counter() - startTime, "s, values", sens.valueList)
+    print("layer, material, field, dCurvature(1/m), dStress(GPa)@depths", depthList)
+    maxError = 0.0
+    for row in rowList:
+        delta = {"thickness": 1.0, "relax": 0.01, "composition": 1}[row[2]]
+        fd = finiteDifference(infoList, 1000, 300, depthList, row[0], row[2], delta)
+        print(row)
+        print("  finite difference", fd)
+        for j in range(len(fd)):
+            scale = max(map(lambda r: abs(r[3 + j]), rowList))
+            maxError = max(maxError, abs(fd[j] - row[3 + j])/scale)
+    print("max difference to finite differences, relative to the largest derivative", maxError)
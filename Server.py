@@ -0,0 +1,184 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' long running job server on localhost, JSON over HTTP
+    usage: python Server.py [port]
+    POST /run with
+        {"script": "GaNOnSapph"} or {"scriptText": "{GaN 2um 1.0}\n{Sapphire 500um}"}
+            or {"layers": [["GaN", 2000, 1.0], ["Sapphire", 5e5, 0.0]]} in nm, in script order,
+        "temperatures": [T1] or [T1, T2] or [T1, T2, number of steps],
+        "format": "json" or "csv" (text of the _rlt file), default "json",
+            both carry stress, strain and polarization, as [x(um), Ppz, P, sheet charge, layer] in C/cm2
+        "save": name of an _rlt file to write into output, optional, a plain name without a path,
+        "cache": false to bypass the result cache, optional,
+        "nonlinear": true for the large deflection eqs, optional
+    GET /status for the counters of the server
+    materials, parsed scripts and results stay in memory between queries,
+    a material or script file edited on disk is seen by a restarted server only
+'''
+
+import sys, os, copy, time, json, threading, http.server, urllib.request
+import Misc, Unit, Elasticity, Cache, Main
+
+defaultPort = 8765
+
+class JobServer:
+    def __init__(self):
+        self.resultCache = Cache.ResultCache()
+        # parsed stacks, {key: layerInfoList in script order}
+        self.stackDict = {}
+        self.lock = threading.Lock()
+        self.startTime = time.time()
+        self.numOfQueries = 0
+        self.numOfFailures = 0
+
+    def layerRecords(self, request):
+        ''' stack of a request in script order, parsed once per script '''
+        if("layers" in request):
+            return request["layers"]
+        if("scriptText" in request):
+            key = ["text", request["scriptText"]]
+        elif("script" in request):
+            if(not Misc.queryScript(request["script"])):
+                raise Exception("Cannot find script: " + request["script"])
+            key = ["script", request["script"]]
+        else:
+            raise Exception("A job needs script, scriptText or layers")
+        key = json.dumps(key)
+        with self.lock:
+            records = self.stackDict.get(key)
+        if records is None:
+            if("scriptText" in request):
+                structure = Elasticity.Structure.fromString(request["scriptText"])
+            else:
+                structure = Elasticity.Structure(request["script"])
+            records = list(map(list, reversed(structure.layerInfoList)))
+            with self.lock:
+                self.stackDict[key] = records
+        return records
+
+    def runJob(self, request):
+        ''' response dict of a request dict '''
+        startTime = time.perf_counter()
+        if("save" in request): self.checkSaveName(request["save"])
+        name = request.get("script", "<server>")
+        structure = Elasticity.Structure.fromLayerList(self.layerRecords(request), name)
+        structure.setLargeDeflection(request.get("nonlinear") is True)
+        [method, args] = Main.jobMethod(list(map(str, request.get("temperatures", []))))
+        result = Main.solveJob(structure, method, args, False) if request.get("cache") is False\
+            else self.resultCache.run(structure, method, *args)
+        response = {"ok": True}
+        if("save" in request):
+            # result is scaled in place when saved
+            Misc.saveResult(copy.deepcopy(result), request["save"])
+            response["saved"] = Misc.outputFilename(request["save"])
+        outputFormat = request.get("format", "json")
+        if(outputFormat == "csv"):
+            response["csv"] = "".join(Misc.resultLines(result))
+        elif(outputFormat == "json"):
+            response["result"] = self.resultDicts(result)
+        else:
+            raise Exception("Format should be json or csv")
+        response["seconds"] = time.perf_counter() - startTime
+        return response
+
+    @staticmethod
+    def checkSaveName(name):
+        ''' the _rlt file stays in output, no path is accepted from a query '''
+        if(not isinstance(name, str) or not len(name) or name in [".", ".."] or "/" in name or\
+           "\\" in name or os.path.basename(name) != name):
+            raise Exception("Save name should be a plain file name without a path: " + repr(name))
+
+    @staticmethod
+    def resultDicts(result):
+        ''' result of Structure.rampTemperature() in the units of the _rlt file '''
+        dictList = []
+        for rlt in result:
+            dictList.append({"T(K)": rlt[0], "R(m)": rlt[1]/Unit.length["m"],\
+                             "neutralPlanePos(um)": rlt[2]/Unit.length["um"],\
+                             "stress": list(map(lambda s: [s[0]/Unit.length["um"],\
+                                                           s[1]/Unit.GPa] + s[2:], rlt[3])),\
+                             "strain": list(map(lambda s: [s[0]/Unit.length["um"]] + s[1:],\
+                                                rlt[4])),\
+                             "polarization": list(map(lambda s: [s[0]/Unit.length["um"]] + s[1:],\
+                                                      rlt[5] if len(rlt) > 5 else []))})
+        return dictList
+
+    def status(self):
+        return {"uptime(s)": time.time() - self.startTime, "queries": self.numOfQueries,\
+                "failures": self.numOfFailures, "stacks": len(self.stackDict),\
+                "materials": len(Elasticity.materialCache)}
+
+    def handle(self, request):
+        ''' errors of a job go back in the response, the server goes on '''
+        with self.lock:
+            self.numOfQueries += 1
+        try:
+            return self.runJob(request)
+        except Exception as err:
+            with self.lock:
+                self.numOfFailures += 1
+            return {"ok": False, "error": str(err)}
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    jobServer = None
+
+    def reply(self, code, response):
+        data = json.dumps(response).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if(self.path == "/status"):
+            self.reply(200, self.jobServer.status())
+        else:
+            self.reply(404, {"ok": False, "error": "Unknown path " + self.path})
+
+    def do_POST(self):
+        if(self.path != "/run"):
+            self.reply(404, {"ok": False, "error": "Unknown path " + self.path})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+        except ValueError as err:
+            self.reply(400, {"ok": False, "error": "Invalid JSON: " + str(err)})
+            return
+        self.reply(200, self.jobServer.handle(request))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port = defaultPort):
+    ''' server bound to localhost, each connection in its own thread '''
+    RequestHandler.jobServer = JobServer()
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), RequestHandler)
+    server.daemon_threads = True
+    return server
+
+def query(request, port = defaultPort):
+    ''' response of a running server, for scripts on the same machine '''
+    data = json.dumps(request).encode()
+    httpRequest = urllib.request.Request("http://127.0.0.1:" + str(port) + "/run", data,\
+                                         {"Content-Type": "application/json"})
+    with urllib.request.urlopen(httpRequest) as response:
+        return json.loads(response.read())
+
+
+if __name__ == "__main__":
+    port = defaultPort
+    if(len(sys.argv) > 1): port = int(sys.argv[1])
+    server = serve(port)
+    print("serving on http://127.0.0.1:" + str(port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -6,7 +6,7 @@
 
 
 import copy
-import Misc
+import Misc, Profile
 
 
 class ArrayOp:
@@ -169,13 +169,14 @@ class LinearEq:
 
     def solve(self):
         ''' column by column '''
-        self.precondition()
-        for i in range(self.rank):
-            self.runCol(i)
-        self.invMat = list(map(\
-            lambda i: self.workMat[i][0+self.rank+1 : 0+self.rank+1+self.rank],\
-            range(self.rank)))
-        self.root = ArrayOp.matCol(self.workMat,0+self.rank)
+        with Profile.phase("solve"):
+            self.precondition()
+            for i in range(self.rank):
+                self.runCol(i)
+            self.invMat = list(map(\
+                lambda i: self.workMat[i][0+self.rank+1 : 0+self.rank+1+self.rank],\
+                range(self.rank)))
+            self.root = ArrayOp.matCol(self.workMat,0+self.rank)
         pass
 
     def error(self):
@@ -188,7 +189,63 @@ class LinearEq:
         return self.root
 
     def getInverseMatrix(self):
-        return self.InvMat
+        return self.invMat
+
+
+class BandedEq:
+
+    '''
+        Solve m.x == b for a band matrix, m[i][j] == 0 for j < i - lower or j > i + upper
+        band[i] is row i within the band, band[i][j - i + lower] == m[i][j]
+        elimination without pivoting keeps the band, for diagonally dominant
+        or definite matrices such as stiffness matrices, O(n*lower*upper)
+    '''
+
+    def __init__(self, band, b, lower, upper):
+        if(len(band) != len(b) or any(map(lambda row: len(row) != lower + upper + 1, band))):
+            raise Exception("Invalid band matrix!")
+        self.band = band
+        self.vector = b
+        self.rank = len(b)
+        self.lower = lower
+        self.upper = upper
+        self.root = None
+
+    def matDotVec(self, x):
+        [n, lower] = [self.rank, self.lower]
+        return list(map(lambda i: sum(map(lambda j: self.band[i][j - i + lower]*x[j],\
+            range(max(0, i - lower), min(n, i + self.upper + 1)))), range(n)))
+
+    def solve(self):
+        ''' forward elimination within the band, back substitution '''
+        with Profile.phase("solve"):
+            [n, lower, upper] = [self.rank, self.lower, self.upper]
+            work = list(map(list, self.band))
+            rhs = list(self.vector)
+            for k in range(n):
+                pivot = work[k][lower]
+                if(pivot == 0.0):
+                    raise Exception("Zero pivot in band matrix!")
+                for i in range(k + 1, min(n, k + lower + 1)):
+                    factor = work[i][k - i + lower]/pivot
+                    if(factor == 0.0): continue
+                    for j in range(k, min(n, k + upper + 1)):
+                        work[i][j - i + lower] -= factor*work[k][j - k + lower]
+                    rhs[i] -= factor*rhs[k]
+            root = [0.0]*n
+            for i in range(n - 1, -1, -1):
+                acc = rhs[i]
+                for j in range(i + 1, min(n, i + upper + 1)):
+                    acc -= work[i][j - i + lower]*root[j]
+                root[i] = acc/work[i][lower]
+            self.root = root
+
+    def error(self):
+        vec = ArrayOp.vecAddVec(self.matDotVec(self.root), ArrayOp.vecMltSca(self.vector, -1.0))
+        return sum(map(lambda x: abs(x), vec))/len(vec)
+
+    def getRoot(self):
+        return self.root
 
 if __name__ == "__main__":
     print("test ArrayOp")
@@ -241,4 +298,20 @@ if __name__ == "__main__":
     print(ArrayOp.matDotVec(m, eq.root))
     print(eq.error())
 
+if __name__ == "__main__":
+    print("\ntest BandedEq")
+    n = 6
+    m = list(map(lambda i: list(map(lambda j: 4.0 if i == j else (-1.0 if abs(i - j) == 1 else 0.0),\
+                                    range(n))), range(n)))
+    b = list(range(1, n + 1))
+    band = list(map(lambda i: list(map(lambda j: m[i][j] if 0 <= j < n else 0.0, range(i - 1, i + 2))),\
+                    range(n)))
+    eq = BandedEq(band, b, 1, 1)
+    eq.solve()
+    full = LinearEq(m, b, False)
+    full.solve()
+    print(eq.getRoot())
+    print(full.getRoot())
+    print(eq.error())
+
 
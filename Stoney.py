@@ -8,6 +8,7 @@
 
 ''' Stoney's equation '''
 
+import math, mmap, array
 import Misc, Unit, Elasticity
 
 class Stoney:
@@ -52,7 +53,94 @@ class Stoney:
         effRadius = young/(1.0 - poisson) * (self.thickness**2)/(6 * stress * filmThickness)
         radius  = 1/(1/effRadius - 1/initRadius)
         return radius / Unit.length["m"]
-      
+
+    #########################################################
+    # batch evaluation, an argument is a list or a scalar shared by all points
+    # invalid points, as zero thickness, zero radius or non-finite input, give nan
+
+    def getBiaxialFactor(self):
+        ''' E/(1-v)*ts^2/6 of the wafer, in GPa*nm*m, shared by all points '''
+        young = self.material.getYoungsModulus()
+        poisson = self.material.getPoissonsRatio()
+        factor = young/(1.0 - poisson) * (self.thickness**2)/6
+        return factor / (Unit.GPa * Unit.length["nm"] * Unit.length["m"])
+
+    @staticmethod
+    def broadcast(valueList, num):
+        if valueList is None: return [float('inf')]*num
+        if isinstance(valueList, (int, float)): return [float(valueList)]*num
+        if(len(valueList) != num):
+            raise Exception("Lists of different lengths!")
+        return valueList
+
+    @staticmethod
+    def batchLength(*valueLists):
+        lengthList = list(map(len, filter(lambda v: not isinstance(v, (int, float, type(None))),\
+                                          valueLists)))
+        if(not len(lengthList)): return 1
+        return lengthList[0]
+
+    @staticmethod
+    def mask(valueList):
+        ''' True for valid points, neither nan nor inf '''
+        return list(map(math.isfinite, valueList))
+
+    def getFilmStressBatch(self, filmThicknessInNano, radiusInMeter, InitRadiusInMeter = None):
+        ''' stress in GPa of every point '''
+        num = self.batchLength(filmThicknessInNano, radiusInMeter, InitRadiusInMeter)
+        thickList = self.broadcast(filmThicknessInNano, num)
+        radiusList = self.broadcast(radiusInMeter, num)
+        initList = self.broadcast(InitRadiusInMeter, num)
+        factor = self.getBiaxialFactor()
+        nan = float('nan')
+        stressList = [nan]*num
+        for i in range(num):
+            [d, r, r0] = [thickList[i], radiusList[i], initList[i]]
+            if(d == 0.0 or r == 0.0 or r0 == 0.0 or d != d or r != r or r0 != r0): continue
+            stressList[i] = factor/d*(1.0/r - 1.0/r0)
+        return stressList
+
+    def getRadiusOfCurvatureBatch(self, filmThicknessInNano, stressInGPa, InitRadiusInMeter = None):
+        ''' radius in meter of every point '''
+        num = self.batchLength(filmThicknessInNano, stressInGPa, InitRadiusInMeter)
+        thickList = self.broadcast(filmThicknessInNano, num)
+        stressList = self.broadcast(stressInGPa, num)
+        initList = self.broadcast(InitRadiusInMeter, num)
+        factor = self.getBiaxialFactor()
+        nan = float('nan')
+        radiusList = [nan]*num
+        for i in range(num):
+            [d, s, r0] = [thickList[i], stressList[i], initList[i]]
+            if(d == 0.0 or s == 0.0 or r0 == 0.0 or d != d or s != s or r0 != r0): continue
+            curvature = s*d/factor - 1.0/r0
+            if(curvature == 0.0): continue
+            radiusList[i] = 1.0/curvature
+        return radiusList
+
+    def getFilmStressFile(self, inFilename, outFilename, withInitRadius = False, chunkSize = 1<<16):
+        ''' binary float64 records (thickness nm, radius m[, init radius m]) => float64 stress GPa
+            the input is memory mapped and processed chunk by chunk '''
+        width = 2
+        if withInitRadius: width = 3
+        with open(inFilename, "rb") as inFile, open(outFilename, "wb") as outFile:
+            if(not len(inFile.read(1))): return 0
+            with mmap.mmap(inFile.fileno(), 0, access = mmap.ACCESS_READ) as buf:
+                if(len(buf)%(8*width)):
+                    raise Exception(inFilename + ": " + str(len(buf)) + " bytes is not a whole number of "\
+                                    + str(width) + " float64 records!")
+                view = memoryview(buf).cast("d")
+                num = len(view)//width
+                for start in range(0, num, chunkSize):
+                    end = min(num, start + chunkSize)
+                    chunk = view[start*width : end*width]
+                    initList = None
+                    if withInitRadius: initList = chunk[2::width].tolist()
+                    stressList = self.getFilmStressBatch(chunk[0::width].tolist(),\
+                                                         chunk[1::width].tolist(), initList)
+                    array.array("d", stressList).tofile(outFile)
+                    chunk.release()
+                view.release()
+        return num
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' sweep layer thickness, relax ratio and composition over a grid, in one process
+    usage:
+        sweep = Sweep.Sweep("GaNOnSapph", 1000, 300)
+        sweep.addAxis(0, "thickness", [2000, 3000, 4000])
+        sweep.addAxis(1, "relax", [0.8, 0.9, 1.0])
+        table = sweep.evaluate(sweep.cartesian(), numOfWorkers = 4)
+        sweep.save(table, "GaNOnSapph_sweep")
+    layers are indexed in script order, i.e. the top layer is 0
+    each point solves the stack at tempEnd with lattice mismatch locked at tempBegin,
+    which is the last step of Structure.rampTemperature(tempBegin, tempEnd)
+'''
+
+import re, random, itertools, multiprocessing
+import Misc, Unit, Elasticity
+
+fieldList = ["thickness", "relax", "composition"]
+resultColumnList = ["T(K)", "R(m)", "neutralPlanePos(um)", "maxStress(GPa)", "minStress(GPa)", "error"]
+
+class Sweep:
+    def __init__(self, base, tempBegin, tempEnd = None):
+        ''' base is a script name or [[matName, d, r], etc] in script order '''
+        if isinstance(base, str):
+            structure = Elasticity.Structure(base)
+            self.name = base
+        else:
+            structure = Elasticity.Structure.fromLayerList(base)
+            self.name = structure.script
+        # parsed once, in script order
+        self.baseInfoList = list(map(list, reversed(structure.layerInfoList)))
+        self.tempBegin = tempBegin
+        self.tempEnd = tempBegin
+        if tempEnd is not None: self.tempEnd = tempEnd
+        self.axisList = []
+
+    def addAxis(self, layerIdx, field, values):
+        ''' values of a field of the layerIdx-th layer, or [low, high] for latin hypercube '''
+        if(not field in fieldList):
+            raise Exception("Field should be one of " + ", ".join(fieldList))
+        if(layerIdx < 0 or layerIdx >= len(self.baseInfoList)):
+            raise Exception("Invalid layer index " + str(layerIdx))
+        if(field == "composition" and len(re.findall("[0-9]{2}%", self.baseInfoList[layerIdx][0])) != 1):
+            raise Exception("Composition can only be swept for alloys as Ax%BC")
+        self.axisList.append([layerIdx, field, list(values)])
+
+    def axisNames(self):
+        return list(map(lambda axis: self.baseInfoList[axis[0]][0] + "#" + str(axis[0]) + "." + axis[1],\
+                        self.axisList))
+
+    def cartesian(self):
+        ''' [[v1, v2, etc], etc], every combination of the axis values '''
+        return list(map(list, itertools.product(*map(lambda axis: axis[2], self.axisList))))
+
+    def latinHypercube(self, numOfPoints, seed = 0):
+        ''' numOfPoints points, each axis [low, high] is split into numOfPoints strata '''
+        rand = random.Random(seed)
+        columnList = []
+        for [layerIdx, field, values] in self.axisList:
+            [low, high] = [min(values), max(values)]
+            column = list(map(lambda i: low + (high - low)*(i + rand.random())/numOfPoints,\
+                              range(numOfPoints)))
+            if(field == "composition"): column = list(map(round, column))
+            rand.shuffle(column)
+            columnList.append(column)
+        return list(map(lambda i: list(map(lambda col: col[i], columnList)), range(numOfPoints)))
+
+    def layerInfoList(self, point):
+        ''' base stack with the values of a point '''
+        infoList = list(map(list, self.baseInfoList))
+        for i in range(len(self.axisList)):
+            [layerIdx, field, values] = self.axisList[i]
+            if(field == "thickness"):
+                infoList[layerIdx][1] = float(point[i])
+            elif(field == "relax"):
+                infoList[layerIdx][2] = float(point[i])
+            else:
+                x = str(int(round(point[i]))).zfill(2) + "%"
+                infoList[layerIdx][0] = re.sub("[0-9]{2}%", x, infoList[layerIdx][0], count = 1)
+        return infoList
+
+    def evaluatePoint(self, point):
+        ''' [T, R(m), neutralPlanePos(um), maxStress(GPa), minStress(GPa), error] '''
+        # a failed point is kept as nan with the error message, the sweep goes on
+        try:
+            structure = Elasticity.Structure.fromLayerList(self.layerInfoList(point), self.name)
+            rlt = structure.run(structure.getEqParameters(self.tempBegin, self.tempEnd))
+        except Exception as err:
+            nan = float('nan')
+            return [self.tempEnd, nan, nan, nan, nan, str(err)]
+        stressList = list(map(lambda s: s[1], rlt[2]))
+        return [self.tempEnd, rlt[0]/Unit.length["m"], rlt[1]/Unit.length["um"],\
+                max(stressList)/Unit.GPa, min(stressList)/Unit.GPa, ""]
+
+    def config(self):
+        ''' picklable description, a worker rebuilds the sweep from it '''
+        return [self.name, self.baseInfoList, self.tempBegin, self.tempEnd, self.axisList]
+
+    @classmethod
+    def fromConfig(cls, config):
+        [name, baseInfoList, tempBegin, tempEnd, axisList] = config
+        sweep = cls(baseInfoList, tempBegin, tempEnd)
+        sweep.name = name
+        sweep.axisList = axisList
+        return sweep
+
+    def evaluate(self, pointList, numOfWorkers = 1, chunkSize = 64):
+        ''' columnar table as {column name: [values], etc}, in the order of pointList '''
+        if(numOfWorkers <= 1):
+            rowList = list(map(self.evaluatePoint, pointList))
+        else:
+            with multiprocessing.Pool(numOfWorkers, initWorker, (self.config(),)) as pool:
+                rowList = pool.map(evaluateInWorker, pointList, chunkSize)
+        table = {"point": list(range(len(pointList)))}
+        axisNameList = self.axisNames()
+        for i in range(len(axisNameList)):
+            table[axisNameList[i]] = list(map(lambda p: p[i], pointList))
+        for j in range(len(resultColumnList)):
+            table[resultColumnList[j]] = list(map(lambda row: row[j], rowList))
+        return table
+
+    @staticmethod
+    def save(table, dataName):
+        ''' one CSV for the whole sweep, a column per axis and per result '''
+        filename = Misc.outputFilename(dataName, "_swp.csv")
+        nameList = list(table.keys())
+        with open(filename, "w") as fileObj:
+            fileObj.write(",".join(nameList) + "\n")
+            for i in range(len(table["point"])):
+                fileObj.write(",".join(map(lambda name: str(table[name][i]), nameList)) + "\n")
+        return filename
+
+#########################################################
+# worker processes keep their own sweep and material cache
+
+workerSweep = None
+
+def initWorker(config):
+    global workerSweep
+    workerSweep = Sweep.fromConfig(config)
+
+def evaluateInWorker(point):
+    return workerSweep.evaluatePoint(point)
+
+
+if __name__ == "__main__":
+    import time
+    sweep = Sweep([["GaN", 2000.0, 0.0], ["Al20%GaN", 100.0, 0.0], ["Sapphire", 5e5, 0.0]], 1000, 300)
+    sweep.addAxis(0, "thickness", [1000, 2000, 3000, 4000])
+    sweep.addAxis(1, "composition", [10, 20, 30])
+    sweep.addAxis(1, "relax", [0.0, 0.5, 1.0])
+    pointList = sweep.cartesian()
+    startTime = time.perf_counter()
+    table = sweep.evaluate(pointList)
+    print(len(pointList), "points in", time.perf_counter() - startTime, "s")
+    print("failed points:", len(list(filter(len, table["error"]))))
+    startTime = time.perf_counter()
+    table = sweep.evaluate(sweep.latinHypercube(400), 4)
+    print(400, "points with 4 workers in", time.perf_counter() - startTime, "s")
+    print("saved", sweep.save(table, "sweep_demo"))
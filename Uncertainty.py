@@ -0,0 +1,384 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' Monte Carlo propagation of material and thickness tolerances
+    usage:
+        mc = Uncertainty.Uncertainty("GaNOnSapph", 1000, 300)
+        mc.addMaterial("GaN", "youngsModulus", 0.05)    # relative sigma of a normal distribution
+        mc.addThickness(0, 0.03)                        # the top layer
+        mc.addThickness(None, 0.02, "uniform")          # every layer, relative half width
+        statDict = mc.run(100000, numOfWorkers = 4)
+        mc.save("GaNOnSapph_mc")
+    layers are indexed in script order, i.e. the top layer is 0
+    material fields: youngsModulus, poissonsRatio, thermalExpansionCoefficient, lattice300K,
+    a factor drawn for a material applies to every layer of that material in a sample,
+    and to the alloys interpolated from it, e.g. a factor of GaN reaches Al25%GaN through its
+    GaN end member, an alloy can also have factors of its own
+    each sample is the last step of Structure.rampTemperature(tempBegin, tempEnd)
+
+    the properties of every layer are looked up once, a sample only scales them,
+    and is solved in the reduced form of Growth, i.e. O(n) per sample
+    instead of Equation.buildEq and Solver.LinearEq at each neutral plane trial
+    samples run in chunks, the statistics are streamed, memory does not grow with samples
+'''
+
+import math, random, multiprocessing
+import Misc, Unit, Elasticity, Newton, Growth
+
+materialFieldList = ["youngsModulus", "poissonsRatio", "thermalExpansionCoefficient", "lattice300K"]
+distributionList = ["normal", "uniform"]
+quantityList = ["R(m)", "curvature(1/m)", "maxStress(GPa)", "minStress(GPa)"]
+defaultPercentileList = [2.5, 16.0, 50.0, 84.0, 97.5]
+
+class StreamQuantile:
+    ''' P^2 estimate of a percentile, five markers whatever the number of values '''
+    def __init__(self, percentile):
+        p = percentile/100.0
+        self.p = p
+        self.heights = []
+        self.pos = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = [1.0, 1.0 + 2.0*p, 1.0 + 4.0*p, 3.0 + 2.0*p, 5.0]
+        self.increment = [0.0, p/2.0, p, (1.0 + p)/2.0, 1.0]
+
+    def add(self, x):
+        q = self.heights
+        if(len(q) < 5):
+            q.append(x)
+            q.sort()
+            return
+        if(x < q[0]):
+            q[0] = x
+            k = 0
+        elif(x >= q[4]):
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while(x >= q[k+1]): k += 1
+        n = self.pos
+        for i in range(k + 1, 5): n[i] += 1.0
+        for i in range(5): self.desired[i] += self.increment[i]
+        # move the middle markers toward their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if((d >= 1.0 and n[i+1] - n[i] > 1.0) or (d <= -1.0 and n[i-1] - n[i] < -1.0)):
+                d = 1.0 if d > 0.0 else -1.0
+                qp = q[i] + d/(n[i+1] - n[i-1])*((n[i] - n[i-1] + d)*(q[i+1] - q[i])/(n[i+1] - n[i]) +\
+                                                 (n[i+1] - n[i] - d)*(q[i] - q[i-1])/(n[i] - n[i-1]))
+                if(not q[i-1] < qp < q[i+1]):
+                    j = i + int(d)
+                    qp = q[i] + d*(q[j] - q[i])/(n[j] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        q = self.heights
+        if(not len(q)): return float('nan')
+        if(len(q) < 5):
+            # interpolate the few values directly
+            x = self.p*(len(q) - 1)
+            i = min(int(x), len(q) - 2) if len(q) > 1 else 0
+            return q[i] if len(q) == 1 else q[i] + (x - i)*(q[i+1] - q[i])
+        return q[2]
+
+class StreamStatistics:
+    ''' count, mean, standard deviation, min, max and percentiles of a stream of values '''
+    def __init__(self, percentileList = defaultPercentileList):
+        self.percentileList = list(percentileList)
+        self.quantileList = list(map(StreamQuantile, self.percentileList))
+        self.count = 0
+        self.mean = 0.0
+        self.sumSquares = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, x):
+        # Welford's update, no cancellation for large counts
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta/self.count
+        self.sumSquares += delta*(x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        for quantile in self.quantileList: quantile.add(x)
+
+    def std(self):
+        return math.sqrt(self.sumSquares/(self.count - 1)) if self.count > 1 else 0.0
+
+    def summary(self):
+        ''' [count, mean, std, min, max, percentiles] '''
+        return [self.count, self.mean, self.std(), self.min, self.max] +\
+            list(map(lambda quantile: quantile.value(), self.quantileList))
+
+class Uncertainty:
+    def __init__(self, base, tempBegin, tempEnd = None, seed = 0):
+        ''' base is a script name or [[matName, d, r], etc] in script order '''
+        if isinstance(base, str):
+            structure = Elasticity.Structure(base)
+            self.name = base
+        else:
+            structure = Elasticity.Structure.fromLayerList(base)
+            self.name = structure.script
+        self.baseInfoList = list(map(list, reversed(structure.layerInfoList)))
+        self.tempBegin = tempBegin
+        self.tempEnd = tempBegin
+        if tempEnd is not None: self.tempEnd = tempEnd
+        self.seed = seed
+        # [name, field, distribution, spread] and [stack index or None, distribution, spread]
+        self.materialList = []
+        self.thicknessList = []
+        self.statDict = None
+        self.numOfFailures = 0
+        self.setTable(structure)
+
+    def setTable(self, structure):
+        ''' properties of every layer, bottom first, looked up once for all samples '''
+        self.table = []
+        for layer in structure.layerStack:
+            if isinstance(layer, Elasticity.GradedLayer):
+                raise Exception("Uncertainty does not support graded layers")
+            material = layer.material
+            # an alloy is interpolated from its end members, as Material does, with their weights
+            memberList = [[1.0, material]]
+            if material.interpolationFlag:
+                [[x1, bottom], [x2, top]] = material.boundary
+                x = material.getXofAxBC(material.name)
+                memberList = [[(x2 - x)/(x2 - x1), bottom], [(x - x1)/(x2 - x1), top]]
+            self.table.append({"name": material.name, "thickness": layer.thickness,\
+                               "relax": layer.bottomInterfaceRelax,\
+                               "members": list(map(lambda member: [member[0]] +\
+                                                   self.properties(member[1], material.temperature),\
+                                                   memberList))})
+
+    def properties(self, material, temp):
+        ''' [name, young, poisson, youngEnergy, poissonEnergy, [lattice at 300 K, tempBegin, tempEnd]] '''
+        lattice = list(map(material.getLattice, [300, self.tempBegin, self.tempEnd]))
+        return [material.name, material.getYoungsModulus(self.tempEnd), material.getPoissonsRatio(self.tempEnd),\
+                material.getYoungsModulus(temp), material.getPoissonsRatio(temp), lattice]
+
+    def materialNames(self):
+        ''' materials of the stack and the end members of its alloys '''
+        nameList = []
+        for rec in self.table:
+            nameList.append(rec["name"])
+            nameList.extend(map(lambda member: member[1], rec["members"]))
+        return nameList
+
+    def addMaterial(self, name, field, spread, distribution = "normal"):
+        ''' spread is relative, sigma for normal and half width for uniform '''
+        if(not field in materialFieldList):
+            raise Exception("Field should be one of " + ", ".join(materialFieldList))
+        if(not distribution in distributionList):
+            raise Exception("Distribution should be one of " + ", ".join(distributionList))
+        if(not name in self.materialNames()):
+            raise Exception("Material " + name + " is not in the stack")
+        self.materialList.append([name, field, distribution, float(spread)])
+
+    def addThickness(self, layerIdx, spread, distribution = "normal"):
+        ''' layerIdx in script order, None for every layer, each layer drawn on its own '''
+        if(not distribution in distributionList):
+            raise Exception("Distribution should be one of " + ", ".join(distributionList))
+        n = len(self.table)
+        if layerIdx is None:
+            self.thicknessList.append([None, distribution, float(spread)])
+            return
+        if(layerIdx < 0 or layerIdx >= n):
+            raise Exception("Invalid layer index " + str(layerIdx))
+        self.thicknessList.append([n - 1 - layerIdx, distribution, float(spread)])
+
+    #########################################################
+    # one sample
+
+    @staticmethod
+    def draw(rand, distribution, spread):
+        ''' a factor around 1.0 '''
+        if(distribution == "normal"):
+            return 1.0 + spread*rand.gauss(0.0, 1.0)
+        return 1.0 + spread*(2.0*rand.random() - 1.0)
+
+    def drawSample(self, rand):
+        ''' [{(name, field): factor}, [thickness factor of each layer]] '''
+        factorDict = {}
+        for [name, field, distribution, spread] in self.materialList:
+            key = (name, field)
+            factorDict[key] = factorDict.get(key, 1.0)*self.draw(rand, distribution, spread)
+        thickFactorList = [1.0]*len(self.table)
+        for [i, distribution, spread] in self.thicknessList:
+            for j in (range(len(self.table)) if i is None else [i]):
+                thickFactorList[j] *= self.draw(rand, distribution, spread)
+        return [factorDict, thickFactorList]
+
+    def eqParameters(self, sample):
+        ''' [young, youngEnergy, thick, mismatch] of a sample, as Structure.getEqParameters '''
+        [factorDict, thickFactorList] = sample
+        youngList = []
+        youngEnergyList = []
+        latticeList = []
+        for rec in self.table:
+            # end members scaled by their own factors, interpolated, then scaled by the alloy factors
+            props = [0.0, 0.0, 0.0, 0.0, [0.0, 0.0, 0.0]]
+            for member in rec["members"]:
+                scaled = self.scale(member[1:], factorDict)
+                props = list(map(lambda k: props[k] + member[0]*scaled[k], range(4))) +\
+                    [list(map(lambda j: props[4][j] + member[0]*scaled[4][j], range(3)))]
+            if(len(rec["members"]) > 1):
+                props = self.scale([rec["name"]] + props, factorDict)
+            [young, poisson, youngEnergy, poissonEnergy, lattice] = props
+            youngList.append(young/(1.0 - poisson))
+            youngEnergyList.append(youngEnergy/(1.0 - poissonEnergy))
+            latticeList.append(lattice[1:3])
+        thickList = list(map(lambda i: self.table[i]["thickness"]*thickFactorList[i], range(len(self.table))))
+        mismatchList = [0.0]*len(self.table)
+        for i in range(len(self.table) - 1):
+            [bot, top] = [latticeList[i], latticeList[i+1]]
+            lm = (top[0] - bot[0])/((top[0] + bot[0])/2.0)*(1.0 - self.table[i+1]["relax"])
+            tm = (top[1] - top[0])/top[0] - (bot[1] - bot[0])/bot[0]
+            mismatchList[i] = lm + tm
+        return [youngList, youngEnergyList, thickList, mismatchList]
+
+    @staticmethod
+    def scale(props, factorDict):
+        ''' [name, young, etc] as properties() => [young, etc] with the factors of name '''
+        [name, young, poisson, youngEnergy, poissonEnergy, [a300, aBegin, aEnd]] = props
+        factor = lambda field: factorDict.get((name, field), 1.0)
+        [sE, sNu] = [factor("youngsModulus"), factor("poissonsRatio")]
+        # the expansion from 300 K scales with the expansion coefficient
+        [sa, sAlpha] = [factor("lattice300K"), factor("thermalExpansionCoefficient")]
+        return [young*sE, poisson*sNu, youngEnergy*sE, poissonEnergy*sNu,\
+                [sa*a300, sa*(a300 + sAlpha*(aBegin - a300)), sa*(a300 + sAlpha*(aEnd - a300))]]
+
+    @staticmethod
+    def solve(params):
+        ''' [radius, maxStress, minStress] of a sample, stress at the faces of every layer '''
+        [youngList, youngEnergyList, thickList, mismatchList] = params
+        system = Growth.reduceStack(youngList, youngEnergyList, thickList, mismatchList)
+        minimizer = Newton.Min(lambda x: Growth.Growth.solveAt(system, x)[2], 0, sum(thickList), 1e-18)
+        neutralPlanePos = minimizer.run()[0]
+        [s0, r, energy] = Growth.Growth.solveAt(system, neutralPlanePos)
+        radius = float('inf')
+        if(r != 0.0): radius = 1.0/r
+        [P, M] = [0.0, 0.0]
+        [maxStress, minStress] = [float('-inf'), float('inf')]
+        for i in range(len(thickList)):
+            if(i > 0):
+                P += (thickList[i-1] + thickList[i])/2.0
+                M += mismatchList[i-1]
+            # Layer.getStress at the bottom and top face
+            mean = youngList[i]*(s0 + r*P - M)
+            bend = youngEnergyList[i]*thickList[i]/2.0*r/2.0
+            maxStress = max(maxStress, mean - bend, mean + bend)
+            minStress = min(minStress, mean - bend, mean + bend)
+        return [radius, maxStress, minStress]
+
+    def runChunk(self, chunkIdx, chunkSize):
+        ''' [[R(m), curvature(1/m), maxStress(GPa), minStress(GPa)] or None, etc] '''
+        # a chunk has its own seed, results do not depend on the number of workers
+        rand = random.Random(self.seed*1000003 + chunkIdx)
+        rowList = []
+        for k in range(chunkSize):
+            try:
+                [radius, maxStress, minStress] = self.solve(self.eqParameters(self.drawSample(rand)))
+            except Exception:
+                rowList.append(None)
+                continue
+            rowList.append([radius/Unit.length["m"], Unit.length["m"]/radius,\
+                            maxStress/Unit.GPa, minStress/Unit.GPa])
+        return rowList
+
+    #########################################################
+    # all samples
+
+    def config(self):
+        return [self.baseInfoList, self.tempBegin, self.tempEnd, self.seed,\
+                self.materialList, self.thicknessList]
+
+    @classmethod
+    def fromConfig(cls, config):
+        [baseInfoList, tempBegin, tempEnd, seed, materialList, thicknessList] = config
+        mc = cls(baseInfoList, tempBegin, tempEnd, seed)
+        mc.materialList = materialList
+        mc.thicknessList = thicknessList
+        return mc
+
+    def run(self, numOfSamples, numOfWorkers = 1, chunkSize = 1000, percentileList = defaultPercentileList):
+        ''' {quantity: StreamStatistics}, failed samples are counted in self.numOfFailures '''
+        self.statDict = dict(map(lambda q: [q, StreamStatistics(percentileList)], quantityList))
+        self.numOfFailures = 0
+        numOfChunks = (numOfSamples + chunkSize - 1)//chunkSize
+        sizeList = list(map(lambda c: min(chunkSize, numOfSamples - c*chunkSize), range(numOfChunks)))
+        if(numOfWorkers <= 1):
+            chunks = map(lambda c: self.runChunk(c, sizeList[c]), range(numOfChunks))
+            self.collect(chunks)
+        else:
+            with multiprocessing.Pool(numOfWorkers, initWorker, (self.config(),)) as pool:
+                # chunks come back in order, one at a time
+                self.collect(pool.imap(runChunkInWorker, zip(range(numOfChunks), sizeList)))
+        return self.statDict
+
+    def collect(self, chunks):
+        for rowList in chunks:
+            for row in rowList:
+                if row is None:
+                    self.numOfFailures += 1
+                    continue
+                for j in range(len(quantityList)):
+                    self.statDict[quantityList[j]].add(row[j])
+
+    def summaryTable(self):
+        ''' {column name: [value of each quantity]} '''
+        percentileList = self.statDict[quantityList[0]].percentileList
+        columnList = ["count", "mean", "std", "min", "max"] +\
+            list(map(lambda p: "p" + str(p), percentileList))
+        table = {"quantity": list(quantityList)}
+        summaryList = list(map(lambda q: self.statDict[q].summary(), quantityList))
+        for j in range(len(columnList)):
+            table[columnList[j]] = list(map(lambda s: s[j], summaryList))
+        return table
+
+    def save(self, dataName):
+        ''' one CSV, a row per quantity '''
+        table = self.summaryTable()
+        filename = Misc.outputFilename(dataName, "_mc.csv")
+        nameList = list(table.keys())
+        with open(filename, "w") as fileObj:
+            fileObj.write(",".join(nameList) + "\n")
+            for i in range(len(quantityList)):
+                fileObj.write(",".join(map(lambda name: str(table[name][i]), nameList)) + "\n")
+        return filename
+
+#########################################################
+# worker processes keep their own property table
+
+workerUncertainty = None
+
+def initWorker(config):
+    global workerUncertainty
+    workerUncertainty = Uncertainty.fromConfig(config)
+
+def runChunkInWorker(chunk):
+    return workerUncertainty.runChunk(*chunk)
+
+
+if __name__ == "__main__":
+    import time
+    records = [["GaN", 2000.0, 0.0], ["AlN", 20.0, 0.0], ["GaN", 1000.0, 1.0],\
+               ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+    # without tolerances the samples reproduce Structure.run
+    mc = Uncertainty(records, 1000, 300)
+    structure = Elasticity.Structure.fromLayerList(records)
+    rlt = structure.run(structure.getEqParameters(1000, 300))
+    stressList = list(map(lambda s: s[1], rlt[2]))
+    print("Structure.run", [rlt[0]/Unit.length["m"], max(stressList)/Unit.GPa, min(stressList)/Unit.GPa])
+    print("sample       ", mc.runChunk(0, 1)[0])
+    mc.addMaterial("GaN", "youngsModulus", 0.05)
+    mc.addMaterial("GaN", "thermalExpansionCoefficient", 0.03)
+    mc.addMaterial("Sapphire", "thermalExpansionCoefficient", 0.03)
+    mc.addThickness(None, 0.03)
+    mc.addThickness(3, 0.02, "uniform")
+    startTime = time.perf_counter()
+    mc.run(100000, numOfWorkers = 4)
+    print("100000 samples in", time.perf_counter() - startTime, "s,", mc.numOfFailures, "failed")
+    Misc.display(list(map(list, zip(*mc.summaryTable().values()))))
@@ -0,0 +1,186 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' film stacks against substrates, every film on every substrate
+    usage:
+        variants = Variant.Variants(1000, 300)
+        variants.addFilm("HEMT", [["GaN", 2000, 0.0], ["AlN", 20, 0.0], ["GaN", 1000, 1.0]])
+        variants.addSubstrate("Sapphire430", [["Sapphire", 430e3]])
+        variants.addSubstrate("Si1000", [["Si111", "1000um"]])
+        table = variants.evaluate()
+        Sweep.Sweep.save(table, "HEMT_variants")
+    a film or a substrate is a stack in script order, the bottom layer of a film
+    carries the relax of the film/substrate interface
+
+    the system of Equation.buildEq couples the two blocks only through the interface,
+    the interface eqs give the strain of every layer from that of the bottom one,
+    which is the reduced form of Growth, i.e. sums over the layers of each block
+    the sums of a block are taken once, relative to its own bottom,
+    a film on a substrate shifts them by the height and mismatch of the substrate,
+    which eliminates the unknowns of both blocks but the strain s0 and 1/R (the Schur complement)
+    so N films on M substrates cost N + M reductions and N*M solves of two unknowns
+'''
+
+import Misc, Unit, Elasticity, Newton, Growth
+
+columnList = ["film", "substrate", "T(K)", "R(m)", "curvature(1/m)", "neutralPlanePos(um)",\
+              "surfaceStress(GPa)", "filmForce(GPa*nm)", "error"]
+
+def shiftForm(a, q):
+    ''' A.q.A^T for A = [[1, 0, 0], [a[0], 1, 0], [a[1], 0, 1]] '''
+    [dp, dm] = a
+    q0 = q[0]
+    q1 = [q[1][j] + dp*q0[j] for j in range(3)]
+    q2 = [q[2][j] + dm*q0[j] for j in range(3)]
+    rows = [list(q0), q1, q2]
+    return list(map(lambda row: [row[0], row[1] + dp*row[0], row[2] + dm*row[0]], rows))
+
+def shiftVec(a, v):
+    ''' A.v '''
+    return [v[0], v[1] + a[0]*v[0], v[2] + a[1]*v[0]]
+
+class Block:
+    ''' sums over the layers of a stack, relative to its bottom, at a pair of temperatures '''
+    def __init__(self, name, layerInfoList, tempBegin, tempEnd):
+        structure = Elasticity.Structure.fromLayerList(layerInfoList, name)
+        self.name = name
+        self.layerStack = structure.layerStack
+        for layer in self.layerStack:
+            if isinstance(layer, Elasticity.GradedLayer):
+                raise Exception("Variant does not support graded layers")
+        [n, youngList, thickList, mismatchList, gradedList] = structure.getEqParameters(tempBegin, tempEnd)
+        youngEnergyList = list(map(lambda layer: layer.material.getYoungsModulus()/\
+                                   (1.0 - layer.material.getPoissonsRatio()), self.layerStack))
+        # u of each layer is [1, P, -M] relative to the bottom layer
+        self.first = youngList[0]*thickList[0]
+        self.force = [0.0]*3    # layers above the bottom one
+        self.moment = [0.0]*3   # layers above the bottom one, p relative to the bottom
+        self.energy = [[0.0]*3 for i in range(3)]
+        self.bend = 0.0
+        self.inertia = [0.0]*3  # E*(T^3-B^3)/3, E*(T^2-B^2), E*(T-B)
+        [P, M, height] = [0.0, 0.0, 0.0]
+        for i in range(n):
+            [young, h] = [youngList[i], thickList[i]]
+            if(i > 0):
+                P += (thickList[i-1] + h)/2.0
+                M += mismatchList[i-1]
+            u = [1.0, P, -M]
+            if(i > 0):
+                self.force = Growth.addVec(self.force, u, young*h)
+                self.moment = Growth.addVec(self.moment, u, young*h*(height - thickList[i-1]/2.0))
+            w = young**2*h/youngEnergyList[i]
+            for j in range(3):
+                self.energy[j] = Growth.addVec(self.energy[j], u, w*u[j])
+            self.bend += youngEnergyList[i]*h**3/48.0
+            [b, t] = [height, height + h]
+            self.inertia = Growth.addVec(self.inertia, [(t**3 - b**3)/3.0, t**2 - b**2, t - b], young)
+            height += h
+        self.height = height
+        self.topP = P
+        self.topM = M
+        self.topYoung = [youngList[-1], youngEnergyList[-1]]
+        self.thickList = thickList
+
+    def totalForce(self):
+        return Growth.addVec(self.force, [1.0, 0.0, 0.0], self.first)
+
+class Variants:
+    def __init__(self, tempBegin, tempEnd = None):
+        self.tempBegin = tempBegin
+        self.tempEnd = tempBegin
+        if tempEnd is not None: self.tempEnd = tempEnd
+        self.filmList = []
+        self.substrateList = []
+
+    def addFilm(self, name, layerInfoList):
+        self.filmList.append(Block(name, layerInfoList, self.tempBegin, self.tempEnd))
+
+    def addSubstrate(self, name, layerInfoList):
+        self.substrateList.append(Block(name, layerInfoList, self.tempBegin, self.tempEnd))
+
+    def system(self, film, substrate):
+        ''' the system of Growth.solveAt for a film on a substrate '''
+        [bot, top] = [substrate.layerStack[-1], film.layerStack[0]]
+        mismatch = Elasticity.Structure.latticeMismatchStrain(bot, top, self.tempBegin) +\
+            Elasticity.Structure.thermalMismatchStrain(bot, top, self.tempBegin, self.tempEnd)
+        # film u in the frame of the substrate bottom
+        shift = [substrate.topP + (substrate.thickList[-1] + film.thickList[0])/2.0,\
+                 -(substrate.topM + mismatch)]
+        e0 = [1.0, 0.0, 0.0]
+        force = Growth.addVec(substrate.totalForce(), shiftVec(shift, film.totalForce()))
+        # p of the layers of the film are above the substrate, p of the bottom layer refers to the top one
+        H = substrate.height
+        moment = Growth.addVec(substrate.moment, e0, substrate.first*(0.0 - film.thickList[-1]/2.0))
+        moment = Growth.addVec(moment, shiftVec(shift, Growth.addVec(film.moment, film.force, H)))
+        moment = Growth.addVec(moment, shiftVec(shift, e0), film.first*(H - substrate.thickList[-1]/2.0))
+        energy = list(map(lambda i: Growth.addVec(substrate.energy[i], shiftForm(shift, film.energy)[i]),\
+                          range(3)))
+        bend = substrate.bend + film.bend
+        [i0, i1, i2] = film.inertia
+        inertia = Growth.addVec(substrate.inertia, [i0 + H*i1 + H**2*i2, i1 + 2.0*H*i2, i2])
+        return [[force, moment, energy, bend, inertia], shift]
+
+    def solvePair(self, film, substrate):
+        ''' a row of columnList '''
+        try:
+            [system, shift] = self.system(film, substrate)
+            total = substrate.height + film.height
+            minimizer = Newton.Min(lambda x: Growth.Growth.solveAt(system, x)[2], 0, total, 1e-18)
+            neutralPlanePos = minimizer.run()[0]
+        except Exception as err:
+            nan = float('nan')
+            return [film.name, substrate.name, self.tempEnd, nan, nan, nan, nan, nan, str(err)]
+        [s0, r, energy] = Growth.Growth.solveAt(system, neutralPlanePos)
+        radius = float('inf')
+        if(r != 0.0): radius = 1.0/r
+        v = [s0, r, 1.0]
+        uTop = shiftVec(shift, [1.0, film.topP, -film.topM])
+        [young, youngEnergy] = film.topYoung
+        # Layer.getStress at the top surface
+        surfaceStress = young*sum(map(lambda j: uTop[j]*v[j], range(3))) +\
+            youngEnergy*film.thickList[-1]/2.0*r/2.0
+        filmForce = sum(map(lambda j: shiftVec(shift, film.totalForce())[j]*v[j], range(3)))
+        return [film.name, substrate.name, self.tempEnd, radius/Unit.length["m"], r*Unit.length["m"],\
+                neutralPlanePos/Unit.length["um"], surfaceStress/Unit.GPa,\
+                filmForce/(Unit.GPa*Unit.length["nm"]), ""]
+
+    def evaluate(self):
+        ''' columnar table as Sweep.evaluate, a row per film and substrate '''
+        rowList = []
+        for film in self.filmList:
+            for substrate in self.substrateList:
+                rowList.append(self.solvePair(film, substrate))
+        table = {"point": list(range(len(rowList)))}
+        for j in range(len(columnList)):
+            table[columnList[j]] = list(map(lambda row: row[j], rowList))
+        return table
+
+
+if __name__ == "__main__":
+    import time
+    variants = Variants(1000, 300)
+    filmDict = {"HEMT": [["GaN", 30.0, 0.0], ["Al20%GaN", 20.0, 0.0], ["GaN", 2000.0, 0.0],\
+                         ["AlN", 200.0, 1.0]],
+                "thickBuffer": [["GaN", 4000.0, 0.0], ["AlN", 20.0, 0.0], ["GaN", 1000.0, 1.0]]}
+    substrateDict = {}
+    for name in ["Sapphire", "Si111", "SiC4H", "SiC6H"]:
+        for thick in [430.0, 650.0, 1000.0]:
+            substrateDict[name + str(int(thick))] = [[name, thick*Unit.length["um"], 0.0]]
+    startTime = time.perf_counter()
+    for name in filmDict: variants.addFilm(name, filmDict[name])
+    for name in substrateDict: variants.addSubstrate(name, substrateDict[name])
+    table = variants.evaluate()
+    print(len(table["point"]), "combinations in", time.perf_counter() - startTime, "s")
+    Misc.display(list(map(list, zip(*table.values()))))
+    # the same combinations stacked and solved one by one
+    startTime = time.perf_counter()
+    maxError = 0.0
+    for i in table["point"]:
+        records = filmDict[table["film"][i]] + substrateDict[table["substrate"][i]]
+        structure = Elasticity.Structure.fromLayerList(records)
+        rlt = structure.run(structure.getEqParameters(1000, 300))
+        maxError = max(maxError, abs(rlt[0]/Unit.length["m"] - table["R(m)"][i])/abs(table["R(m)"][i]))
+    print("Structure.run in", time.perf_counter() - startTime, "s, max relative difference of R", maxError)
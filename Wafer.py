@@ -0,0 +1,289 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' axisymmetric wafer, the stack varies with the distance to the center
+    usage:
+        wafer = Wafer.Wafer(structure, 1000, 300, 75*Unit.length["mm"], numOfRings = 150)
+        wafer.setEdgeExclusion(3*Unit.length["mm"])                 # the film stops 3 mm from the edge
+        wafer.setThicknessProfile([[0, 1.0], [75e6, 0.95]])          # [[position in nm, scale], etc] or scale(position)
+        wafer.setTemperatureProfile(lambda x: 300 + 20*(x/75e6)**2)  # [[position in nm, T], etc] or T(position)
+        [bowMap, stressMap] = wafer.run()
+        wafer.save("HEMT150mm")                                     # _bow.csv and _smap.csv in output
+    a profile applies to the layers of layerIdxList, script order, all but the bottom one by default
+
+    the radius is cut into rings, every ring is a stack of Equation at its own thickness and temperature
+    the interface eqs of a ring give the strain of every layer from the bottom one, as Growth,
+    so the layers of a ring reduce to the rows of force and moment in strain e and curvature k
+        N = F0*e + F1*k + F2, M = G0*e + G1*k + G2
+    about the neutral plane of the center ring; a uniform wafer has N = M = 0 in every ring,
+    which is Structure.run, the rings of a non-uniform wafer hold each other
+        radial  e_r = du/dx, e_t = u/x, k_r = dp/dx, k_t = p/x
+        N_r = (F0*(e_r + v*e_t) + F1*(k_r + v*k_t))/(1 + v) + F2, etc, v of the ring, stiffness weighted
+        div N = 0 and div M = 0 of a free axisymmetric plate, in the weak form
+    u and p are linear within a ring, so a ring couples the nodes at its two radii,
+    the system is block tridiagonal in [u, p] of the nodes and solved by Solver.BandedEq,
+    the cost is O(rings*layers) for the reduction and O(rings) for the solve
+    height has height'' = -k_r, zero at the center, a wafer with positive curvature falls at the edge
+    e is the strain of the bottom layer from its free state at the temperature of the ring,
+    u is from a common state, the free bottom layer at tempEnd, so with a temperature profile
+        e = du/dx - t, t = free thermal strain of the bottom layer from tempEnd, an eigenstrain
+    i.e. F2 - F0*t and G2 - G0*t in both directions
+'''
+
+import Misc, Unit, Elasticity, Newton, Growth, Solver
+
+bowColumnList = ["position(mm)", "T(K)", "height(um)", "radialCurvature(1/m)", "hoopCurvature(1/m)",\
+                 "radialForce(GPa*nm)", "hoopForce(GPa*nm)"]
+stressColumnList = ["position(mm)", "layer", "radialStress(GPa)", "hoopStress(GPa)"]
+
+def profileFunc(profile):
+    ''' [[x, y], etc] or a callable, into y(x) '''
+    if(callable(profile)): return profile
+    points = list(map(lambda p: [float(p[0]), float(p[1])], profile))
+    return lambda x: Misc.linearInterpolate(points, x)
+
+class Wafer:
+    def __init__(self, structure, tempBegin, tempEnd = None, radius = 50*Unit.length["mm"], numOfRings = 100):
+        ''' lattice mismatch is locked at tempBegin, the wafer is at tempEnd or its profile '''
+        if(numOfRings < 1):
+            raise Exception("Need at least one ring")
+        for layer in structure.layerStack:
+            if isinstance(layer, Elasticity.GradedLayer):
+                raise Exception("Wafer does not support graded layers")
+        if structure.largeDeflection is not None:
+            raise Exception("Wafer does not support the large deflection mode")
+        if tempEnd is None: tempEnd = tempBegin
+        self.structure = structure
+        self.tempBegin = tempBegin
+        self.tempEnd = tempEnd
+        self.radius = float(radius)
+        self.numOfRings = numOfRings
+        n = len(structure.layerStack)
+        # bottom first, the bottom layer is the substrate
+        self.thickFuncList = [None]*n
+        self.exclusionList = [None]*n
+        self.tempFunc = None
+        self.ringDict = {}
+        self.bowMap = None
+        self.stressMap = None
+
+    def layerIndices(self, layerIdxList):
+        ''' script order into bottom first, all but the bottom layer by default '''
+        n = len(self.structure.layerStack)
+        if layerIdxList is None: return list(range(1, n))
+        idxList = list(map(lambda idx: n - 1 - idx, layerIdxList))
+        if(any(map(lambda i: i < 0 or i >= n, idxList))):
+            raise Exception("Layer index out of range")
+        return idxList
+
+    def setThicknessProfile(self, profile, layerIdxList = None):
+        ''' thickness scale at a distance to the center '''
+        func = profileFunc(profile)
+        for i in self.layerIndices(layerIdxList):
+            self.thickFuncList[i] = func
+
+    def setEdgeExclusion(self, width, layerIdxList = None):
+        ''' the layers end at width from the edge '''
+        for i in self.layerIndices(layerIdxList):
+            if(i == 0):
+                raise Exception("The bottom layer covers the wafer")
+            self.exclusionList[i] = self.radius - width
+
+    def setTemperatureProfile(self, profile):
+        ''' temperature at a distance to the center, instead of tempEnd '''
+        self.tempFunc = profileFunc(profile)
+
+    #########################################################
+    # rings
+
+    def ringTerms(self, x):
+        ''' reduced stack of the ring at x, shared by rings of the same stack '''
+        stack = self.structure.layerStack
+        presentList = list(filter(lambda i: self.exclusionList[i] is None or x <= self.exclusionList[i],\
+                                  range(len(stack))))
+        thickList = list(map(lambda i: stack[i].thickness*(1.0 if self.thickFuncList[i] is None\
+                                                            else self.thickFuncList[i](x)), presentList))
+        temp = self.tempEnd if self.tempFunc is None else self.tempFunc(x)
+        key = (tuple(presentList), tuple(thickList), temp)
+        if(key in self.ringDict):
+            return self.ringDict[key]
+        layerList = list(map(lambda i: stack[i], presentList))
+        materialList = list(map(lambda layer: layer.material, layerList))
+        poissonList = list(map(lambda m: m.getPoissonsRatio(temp), materialList))
+        youngList = list(map(lambda i: materialList[i].getYoungsModulus(temp)/(1.0 - poissonList[i]),\
+                             range(len(layerList))))
+        youngEnergyList = list(map(lambda m: m.getYoungsModulus()/(1.0 - m.getPoissonsRatio()), materialList))
+        mismatchList = [0.0]*len(layerList)
+        for i in range(len(layerList) - 1):
+            [bot, top] = [layerList[i], layerList[i+1]]
+            mismatchList[i] = Elasticity.Structure.latticeMismatchStrain(bot, top, self.tempBegin) +\
+                Elasticity.Structure.thermalMismatchStrain(bot, top, self.tempBegin, temp)
+        # P and M of the layers, as Growth
+        [P, M] = [[0.0]*len(layerList), [0.0]*len(layerList)]
+        for i in range(1, len(layerList)):
+            P[i] = P[i-1] + (thickList[i-1] + thickList[i])/2.0
+            M[i] = M[i-1] + mismatchList[i-1]
+        stiffList = list(map(lambda i: youngList[i]*thickList[i], range(len(layerList))))
+        bottom = layerList[0].material
+        eigen = (bottom.getLattice(temp) - bottom.getLattice(self.tempEnd))/bottom.getLattice(self.tempEnd)
+        terms = {"temp": temp, "layers": presentList, "young": youngList, "poisson": poissonList,\
+                 "P": P, "M": M, "thick": thickList, "eigen": eigen,\
+                 "system": Growth.reduceStack(youngList, youngEnergyList, thickList, mismatchList),\
+                 "poissonRing": sum(map(lambda i: poissonList[i]*stiffList[i], range(len(layerList))))/\
+                     sum(stiffList)}
+        self.ringDict[key] = terms
+        return terms
+
+    @staticmethod
+    def ringRows(terms, neutralPlanePos):
+        ''' [F, G], N = F.[e, k, 1] and M = G.[e, k, 1] about neutralPlanePos '''
+        [force, moment, energy, bend, inertia] = terms["system"]
+        x0 = neutralPlanePos
+        # as Growth.solveAt, with the x0 part of the moment, N is not zero
+        coeff = inertia[0] - x0*inertia[1] + x0**2*inertia[2]
+        G = Growth.addVec(moment, force, -x0)
+        G[1] += coeff
+        # the eigenstrain of the bottom layer, e = du/dx - t
+        F = list(force)
+        F[2] -= F[0]*terms["eigen"]
+        G[2] -= G[0]*terms["eigen"]
+        return [F, G]
+
+    #########################################################
+    # the plate
+
+    def run(self):
+        ''' [bowMap, stressMap], columnar tables, bowMap has a row per ring '''
+        K = self.numOfRings
+        step = self.radius/K
+        ringList = list(map(lambda j: self.ringTerms((j + 0.5)*step), range(K)))
+        # neutral plane of the center ring
+        center = ringList[0]
+        minimizer = Newton.Min(lambda x: Growth.Growth.solveAt(center["system"], x)[2],\
+                               0, sum(center["thick"]), 1e-18)
+        self.neutralPlanePos = minimizer.run()[0]
+        # unknowns [u, p] of the nodes 1..K, node 0 is the center with u = p = 0
+        numOfUnknowns = 2*K
+        [lower, upper] = [3, 3]
+        band = list(map(lambda i: [0.0]*(lower + upper + 1), range(numOfUnknowns)))
+        rhs = [0.0]*numOfUnknowns
+        for j in range(K):
+            terms = ringList[j]
+            [F, G] = self.ringRows(terms, self.neutralPlanePos)
+            v = terms["poissonRing"]
+            x = (j + 0.5)*step
+            # [e_r, e_t, k_r, k_t] = B.[u, p of the inner node, u, p of the outer node]
+            B = [[-1.0/step, 0.0, 1.0/step, 0.0], [0.5/x, 0.0, 0.5/x, 0.0],\
+                 [0.0, -1.0/step, 0.0, 1.0/step], [0.0, 0.5/x, 0.0, 0.5/x]]
+            # [N_r, N_t, M_r, M_t] = C.[e_r, e_t, k_r, k_t] + [F2, F2, G2, G2]
+            C = list(map(lambda row: Solver.ArrayOp.vecMltSca(row, 1.0/(1.0 + v)),\
+                         [[F[0], F[0]*v, F[1], F[1]*v], [F[0]*v, F[0], F[1]*v, F[1]],\
+                          [G[0], G[0]*v, G[1], G[1]*v], [G[0]*v, G[0], G[1]*v, G[1]]]))
+            load = [F[2], F[2], G[2], G[2]]
+            # weak form, x*step*B^T.(C.B.q + load)
+            CB = Solver.ArrayOp.matDotMat(C, B)
+            dofList = [2*j - 2, 2*j - 1, 2*j, 2*j + 1]
+            for a in range(4):
+                row = dofList[a]
+                if(row < 0): continue
+                col = Solver.ArrayOp.matCol(B, a)
+                for b in range(4):
+                    if(dofList[b] < 0): continue
+                    band[row][dofList[b] - row + lower] += x*step*sum(map(lambda c: col[c]*CB[c][b], range(4)))
+                rhs[row] -= x*step*Solver.ArrayOp.vecDotVec(col, load)
+        eq = Solver.BandedEq(band, rhs, lower, upper)
+        eq.solve()
+        root = [0.0, 0.0] + eq.getRoot()
+        self.error = eq.error()
+        self.maps(ringList, root, step)
+        return [self.bowMap, self.stressMap]
+
+    def maps(self, ringList, root, step):
+        ''' tables from the displacement u and rotation p of the nodes '''
+        K = self.numOfRings
+        u = list(map(lambda k: root[2*k], range(K + 1)))
+        p = list(map(lambda k: root[2*k + 1], range(K + 1)))
+        # height'' = -p', p linear within a ring
+        heightList = [0.0]*(K + 1)
+        for k in range(1, K + 1):
+            heightList[k] = heightList[k-1] - step*(p[k-1] + p[k])/2.0
+        self.bow = heightList[0] - heightList[-1]
+        self.heightList = heightList
+        bowRows = []
+        stressRows = []
+        for j in range(K):
+            terms = ringList[j]
+            x = (j + 0.5)*step
+            strain = [(u[j+1] - u[j])/step, (u[j+1] + u[j])/2.0/x,\
+                      (p[j+1] - p[j])/step, (p[j+1] + p[j])/2.0/x]
+            [F, G] = self.ringRows(terms, self.neutralPlanePos)
+            v = terms["poissonRing"]
+            forceR = (F[0]*(strain[0] + v*strain[1]) + F[1]*(strain[2] + v*strain[3]))/(1.0 + v) + F[2]
+            forceT = (F[0]*(strain[1] + v*strain[0]) + F[1]*(strain[3] + v*strain[2]))/(1.0 + v) + F[2]
+            height = heightList[j] - step/2.0*(p[j] + (p[j] + p[j+1])/2.0)/2.0
+            bowRows.append([x/Unit.length["mm"], terms["temp"], height/Unit.length["um"],\
+                            strain[2]*Unit.length["m"], strain[3]*Unit.length["m"],\
+                            forceR/(Unit.GPa*Unit.length["nm"]), forceT/(Unit.GPa*Unit.length["nm"])])
+            # mean stress of every layer, e = e0 - t + k*P - M in each direction
+            for i in range(len(terms["layers"])):
+                [P, M] = [terms["P"][i], terms["M"][i] + terms["eigen"]]
+                [young, nu] = [terms["young"][i], terms["poisson"][i]]
+                radial = strain[0] + strain[2]*P - M
+                hoop = strain[1] + strain[3]*P - M
+                layer = self.structure.layerStack[terms["layers"][i]]
+                stressRows.append([x/Unit.length["mm"], layer.name,\
+                                   young*(radial + nu*hoop)/(1.0 + nu)/Unit.GPa,\
+                                   young*(hoop + nu*radial)/(1.0 + nu)/Unit.GPa])
+        self.bowMap = self.table(bowColumnList, bowRows)
+        self.stressMap = self.table(stressColumnList, stressRows)
+
+    @staticmethod
+    def table(columnList, rowList):
+        ''' columnar table as Sweep.evaluate '''
+        table = {"point": list(range(len(rowList)))}
+        for j in range(len(columnList)):
+            table[columnList[j]] = list(map(lambda row: row[j], rowList))
+        return table
+
+    def save(self, dataName):
+        ''' _bow.csv and _smap.csv of the last run, return the file names '''
+        filenameList = []
+        for [table, suffix] in [[self.bowMap, "_bow.csv"], [self.stressMap, "_smap.csv"]]:
+            filename = Misc.outputFilename(dataName, suffix)
+            nameList = list(table.keys())
+            with open(filename, "w") as fileObj:
+                fileObj.write(",".join(nameList) + "\n")
+                for i in range(len(table["point"])):
+                    fileObj.write(",".join(map(lambda name: str(table[name][i]), nameList)) + "\n")
+            filenameList.append(filename)
+        return filenameList
+
+
+if __name__ == "__main__":
+    import time
+    # a uniform wafer is the uniformly curved stack of Structure
+    structure = Elasticity.Structure("GaNOnSapph")
+    wafer = Wafer(structure, 1000, 300, 50*Unit.length["mm"], 20)
+    [bowMap, stressMap] = wafer.run()
+    rlt = structure.run(structure.getEqParameters(1000, 300))
+    print("uniform, R(m)", 1.0/bowMap["radialCurvature(1/m)"][0], 1.0/bowMap["hoopCurvature(1/m)"][-1],\
+          "Structure.run", rlt[0]/Unit.length["m"])
+    # HEMT with a superlattice buffer on 150 mm silicon, 200 rings
+    records = [["GaN", 3.0, 0.0], ["Al25%GaN", 20.0, 0.0], ["GaN", 1000.0, 0.0]] +\
+              [["Al30%GaN", 20.0, 0.9], ["GaN", 10.0, 0.9]]*100 +\
+              [["AlN", 200.0, 1.0], ["Si111", 1000.0*Unit.length["um"], 0.0]]
+    structure = Elasticity.Structure.fromLayerList(records)
+    radius = 75*Unit.length["mm"]
+    startTime = time.perf_counter()
+    wafer = Wafer(structure, 1000, 300, radius, 200)
+    wafer.setEdgeExclusion(3*Unit.length["mm"])
+    wafer.setThicknessProfile(lambda x: 1.0 - 0.05*(x/radius)**2)
+    wafer.setTemperatureProfile(lambda x: 300.0 + 10.0*(x/radius)**2)
+    [bowMap, stressMap] = wafer.run()
+    print(len(structure.layerStack), "layers,", wafer.numOfRings, "rings in", time.perf_counter() - startTime,\
+          "s, bow", wafer.bow/Unit.length["um"], "um, error", wafer.error)
+    rowList = list(map(list, zip(*bowMap.values())))
+    Misc.display(rowList[0::25] + rowList[-3:])
@@ -0,0 +1,28 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' ResultCache returns what it computed, also when the entry does not fit the size limit '''
+
+import json
+import Elasticity, Cache
+
+def test_entryLargerThanLimit(tmp_path):
+    cache = Cache.ResultCache(str(tmp_path), maxBytes = 1000)
+    structure = Elasticity.Structure("GaNOnSapph")
+    result = cache.run(structure, "statusquo", 300)
+    assert result is not None
+    assert result == json.loads(json.dumps(structure.statusquo(300)))
+    # evicted at once, so the next run computes again
+    assert cache.entryList() == []
+    assert cache.run(structure, "statusquo", 300) == result
+
+def test_hitHasTheTypesOfAMiss(tmp_path):
+    cache = Cache.ResultCache(str(tmp_path))
+    structure = Elasticity.Structure("GaNOnSapph")
+    miss = cache.run(structure, "rampTemperature", 1000, 300, 3)
+    hit = cache.run(structure, "rampTemperature", 1000, 300, 3)
+    assert len(cache.entryList()) == 1
+    assert miss == hit
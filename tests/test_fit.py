@@ -0,0 +1,21 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' a flat point of the trace is R = inf, a zero curvature, R = 0 is rejected '''
+
+import pytest
+import Elasticity, Fit
+
+def structure():
+    return Elasticity.Structure.fromLayerList([["AlN", 100, 0.5], ["GaN", 2000, 1.0], ["Sapphire", 430e3, 0.0]])
+
+def test_flatPointIsInfinity():
+    fit = Fit.RelaxFit(structure(), 1000, [[1000, float("inf")], [300, -20.0]], [0])
+    assert fit.measuredList == [0.0, -1.0/20.0]
+
+def test_zeroRadiusRejected():
+    with pytest.raises(Exception):
+        Fit.RelaxFit(structure(), 1000, [[1000, 0.0], [300, -20.0]], [0])
@@ -0,0 +1,33 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' the analytic graded layer is the limit of a fine discretization into uniform sublayers
+    the sublayer compositions include both ends, so R(N) = R + c/N, and 2*R(2N) - R(N) is O(1/N^2)
+'''
+
+import Elasticity
+
+def radius(text):
+    structure = Elasticity.Structure.fromString(text)
+    return structure.run(structure.getEqParameters(1000, 300))[0]
+
+def checkConvergence(text, graded, steps = 20, tolerance = 1e-3):
+    analytic = radius(text.replace("<graded>", "[" + graded + "]"))
+    coarse = radius(text.replace("<graded>", "[" + graded + " " + str(steps) + "]"))
+    fine = radius(text.replace("<graded>", "[" + graded + " " + str(2*steps) + "]"))
+    extrapolated = 2.0*fine - coarse
+    assert abs(analytic/extrapolated - 1.0) < tolerance
+    # and closer to the limit than the fine discretization itself
+    assert abs(analytic - extrapolated) < abs(fine - extrapolated)
+
+def test_gradedOnSubstrate():
+    checkConvergence("{<graded>}\n{Si111 10um}", "Al90%10%GaN 5000.0")
+
+def test_gradedBetweenLayers():
+    checkConvergence("{GaN 300}\n{<graded>}\n{GaN 1000}\n{Si111 10um}", "Al90%10%GaN 5000.0")
+
+def test_gradedOnSapphire():
+    checkConvergence("{GaN 300}\n{<graded>}\n{AlN 100}\n{Sapphire 100um}", "Al10%90%GaN 2000.0")
@@ -0,0 +1,59 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' Newton iterations of LargeDeflection stop at the round-off floor of the rows
+    a small mismatch on a thin substrate has rows near round-off from the first step
+'''
+
+import pytest
+import Elasticity, Monitor, Program, Sensitivity, Wafer
+
+def ramp(records, tempBegin, tempEnd, numOfSteps, nonlinear):
+    structure = Elasticity.Structure.fromLayerList(records)
+    structure.setLargeDeflection(nonlinear)
+    return structure.rampTemperature(tempBegin, tempEnd, numOfSteps)
+
+def checkRamp(records, tempBegin, tempEnd, numOfSteps, tolerance):
+    ''' every step converges, R is close to the linear R by thickness/R '''
+    iterationList = []
+    listener = lambda record: iterationList.append(record["iterations"])
+    Monitor.addListener(listener, ["largeDeflection"])
+    try:
+        nonlinear = ramp(records, tempBegin, tempEnd, numOfSteps, True)
+    finally:
+        Monitor.removeListener(listener)
+    linear = ramp(records, tempBegin, tempEnd, numOfSteps, False)
+    assert len(iterationList) == numOfSteps and max(iterationList) <= 5
+    for i in range(1, numOfSteps):
+        assert abs(nonlinear[i][1]/linear[i][1] - 1.0) < tolerance
+
+def test_smallMismatchThinSubstrate():
+    records = [["AlN", 2000, 1.0], ["Si111", 1e4, 0.0]]
+    checkRamp(records, 1300, 1200, 2, 1e-2)
+    checkRamp(records, 1300, 300, 101, 1e-2)
+
+def test_thickFilmOnMembrane():
+    # R is some 20 times the thickness
+    records = [["AlN", 5000, 0.9], ["Si111", 1e4, 0.0]]
+    checkRamp(records, 1300, 300, 21, 1e-1)
+
+def test_programSolvesLargeDeflection():
+    records = [["AlN", 5000, 0.9], ["Si111", 1e4, 0.0]]
+    structure = Elasticity.Structure.fromLayerList(records)
+    structure.setLargeDeflection()
+    program = Program.Program(1300)
+    program.ramp(300, numOfSteps = 5)
+    rlt = list(program.run(structure))[-1][3][-1]
+    assert rlt[1] == ramp(records, 1300, 300, 5, True)[-1][1]
+    assert rlt[1] != ramp(records, 1300, 300, 5, False)[-1][1]
+
+def test_linearPathsRefuseLargeDeflection():
+    structure = Elasticity.Structure.fromLayerList([["AlN", 5000, 0.9], ["Si111", 1e4, 0.0]])
+    structure.setLargeDeflection()
+    for build in [lambda: Sensitivity.Sensitivity(structure, 300),
+                  lambda: Wafer.Wafer(structure, 300)]:
+        with pytest.raises(Exception):
+            build()
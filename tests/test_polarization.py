@@ -0,0 +1,72 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' bound charges of Structure.polarization with non-zero coefficients of GaN and AlN
+    P = spontaneous + coeff*strain from the coefficients of the materials at each face,
+    the sheet charge of an interface is P below - P above, and the sheets with the
+    bound volume charge -dP/dz of every layer sum to zero over the stack
+'''
+
+import pytest
+import Elasticity, MaterialData
+
+# [spontaneous, piezo coefficient under biaxial strain], C/cm2
+coefficientDict = {"GaN": [-2.9e-6, -4.9e-5], "AlN": [-8.1e-6, -9.1e-5]}
+text = "{GaN 300}\n{[Al90%10%GaN 2000.0]}\n{AlN 100}\n{Sapphire 100um}"
+
+@pytest.fixture
+def structure(monkeypatch):
+    data = MaterialData.loadSnapshot()
+    for [name, [spontaneous, coeff]] in coefficientDict.items():
+        monkeypatch.setitem(data[name], "spontaneousPolarization", [0.0, 0.0, spontaneous])
+        monkeypatch.setitem(data[name], "piezoElectricStrainCoefficient", coeff)
+    # materials loaded before the patch keep the zero coefficients
+    monkeypatch.setattr(Elasticity, "materialCache", {})
+    structure = Elasticity.Structure.fromString(text)
+    structure.run(structure.getEqParameters(1000, 300))
+    return structure
+
+def faceP(material, strain):
+    return material.getSpontaneousPolarization() + material.getPiezoElectricCoefficient()*strain
+
+def test_sheetChargeIsPBelowMinusPAbove(structure):
+    polarDist = structure.polarization()
+    stack = structure.layerStack
+    assert len(polarDist) == len(stack) + 1 and polarDist[-1][4] == "surface"
+    below = 0.0
+    for i in range(len(stack)):
+        layer = stack[i]
+        above = faceP(layer.getBottomMaterial(), layer.getStrain(0.0))
+        assert polarDist[i][3] == pytest.approx(below - above, rel = 1e-12, abs = 1e-18)
+        below = faceP(layer.getTopMaterial(), layer.getStrain(layer.thickness))
+    assert polarDist[-1][3] == pytest.approx(below, rel = 1e-12)
+    # the coefficients are not zero at the interfaces of the nitrides
+    assert min(map(lambda row: abs(row[3]), polarDist[1:])) > 1e-8
+
+def test_chargesSumToZero(structure):
+    polarDist = structure.polarization()
+    sheets = sum(map(lambda row: row[3], polarDist))
+    volume = sum(map(lambda layer: layer.getPolarization(0.0)[1] - layer.getPolarization(layer.thickness)[1],
+                     structure.layerStack))
+    assert abs(sheets + volume) < 1e-12*max(map(lambda row: abs(row[3]), polarDist))
+
+def test_gradedLayerBlendsCoefficients(structure):
+    layer = structure.layerStack[2]
+    assert isinstance(layer, Elasticity.GradedLayer)
+    [bot, top] = [layer.getBottomMaterial(), layer.getTopMaterial()]
+    assert bot.getSpontaneousPolarization() != top.getSpontaneousPolarization()
+    for ratio in [0.0, 0.25, 0.5, 1.0]:
+        x = ratio*layer.thickness
+        strain = layer.getStrain(x)
+        coeff = bot.getPiezoElectricCoefficient()*(1.0 - ratio) + top.getPiezoElectricCoefficient()*ratio
+        spontaneous = bot.getSpontaneousPolarization()*(1.0 - ratio) + top.getSpontaneousPolarization()*ratio
+        [piezo, total] = layer.getPolarization(x)
+        assert piezo == pytest.approx(coeff*strain, rel = 1e-12)
+        assert total == pytest.approx(spontaneous + coeff*strain, rel = 1e-12)
+    # the row of the layer is P at its mid height
+    assert structure.polarization()[2][2] == pytest.approx(layer.getPolarization(layer.thickness/2.0)[1], rel = 1e-12)
+    # the ends are the alloys of the script, Al90% on top
+    assert top.getSpontaneousPolarization() == pytest.approx(0.9*-8.1e-6 + 0.1*-2.9e-6, rel = 1e-12)
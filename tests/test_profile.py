@@ -0,0 +1,47 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' temperature gradient through the thickness, Structure.runProfile
+    a layer the profile varies across is the limit of thin slices, each at its mid temperature
+'''
+
+import Elasticity, Unit
+
+thick = 430e3
+profile = [[0.0, 1000.0], [thick, 970.0]]
+
+def slicedRadius(records, numOfSlices):
+    ''' the bottom layer cut into slices, each slice at the temperature of its mid height '''
+    sliced = records[0:-1] + [[records[-1][0], records[-1][1]/numOfSlices, 0.0]]*numOfSlices
+    structure = Elasticity.Structure.fromLayerList(sliced)
+    return structure.run(structure.getEqParameters(1000, structure.layerTemperatures(profile)))[0]
+
+def checkSliceLimit(records, tolerance):
+    structure = Elasticity.Structure.fromLayerList(records)
+    radius = structure.runProfile(1000, profile)[1]
+    # mid temperature slices converge as 1/N^2
+    [coarse, fine] = [slicedRadius(records, 10), slicedRadius(records, 20)]
+    extrapolated = (4.0*fine - coarse)/3.0
+    assert abs(radius/extrapolated - 1.0) < tolerance
+    assert abs(radius - extrapolated) < abs(fine - extrapolated)
+    return radius
+
+def test_singleMaterialPlate():
+    radius = checkSliceLimit([["Sapphire", thick, 0.0]], 1e-4)
+    assert abs(radius/Unit.length["m"] + 3.8423) < 1e-3
+    # a plate at one temperature stays flat
+    structure = Elasticity.Structure.fromLayerList([["Sapphire", thick, 0.0]])
+    assert structure.runProfile(1000, [[0.0, 1000.0], [thick, 1000.0]])[1] == float('inf')
+
+def test_uniformLayersAreKept():
+    structure = Elasticity.Structure.fromLayerList([["GaN", 4000.0, 0.0], ["Sapphire", thick, 0.0]])
+    stack = list(structure.layerStack)
+    structure.runProfile(1000, profile)
+    assert structure.layerStack == stack
+    assert all(map(lambda layer: not isinstance(layer, Elasticity.GradedLayer), structure.layerStack))
+    # a flat profile is the scalar solve
+    rlt = structure.runProfile(1000, [[0.0, 300.0], [thick + 4000.0, 300.0]])
+    assert rlt[1] == structure.run(structure.getEqParameters(1000, 300))[0]
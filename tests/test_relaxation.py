@@ -0,0 +1,58 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' Relaxation converges on a 1000 layer superlattice in a dozen sweeps for both criteria,
+    relax stays within [relax of the script, 1], the relaxed layers sit at their limit,
+    and R of the reduced solve is the R of Structure.statusquo with the relax set
+'''
+
+import pytest
+import Elasticity, Unit, Relaxation
+
+superlattice = [["GaN", 100.0, 0.0]] + [["Al30%GaN", 12.0, 0.2], ["GaN", 40.0, 0.0]]*500 +\
+               [["AlN", 300.0, 0.0], ["GaN", 2000.0, 1.0], ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+small = [["GaN", 100.0, 0.0], ["Al30%GaN", 12.0, 0.2], ["GaN", 40.0, 0.0], ["AlN", 300.0, 0.0],\
+         ["GaN", 2000.0, 1.0], ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+
+def relax(records, criterion):
+    structure = Elasticity.Structure.fromLayerList(records)
+    relaxation = Relaxation.Relaxation(structure, 1000, criterion = criterion, criticalEnergy = 0.5)
+    return [structure, relaxation, relaxation.run()]
+
+@pytest.mark.parametrize("criterion", Relaxation.criterionList)
+def test_superlatticeConverges(criterion):
+    [structure, relaxation, relaxList] = relax(superlattice, criterion)
+    assert len(relaxList) == len(superlattice)
+    # 12 sweeps and the final solve, the change shrinks linearly after the first sweeps
+    assert len(relaxation.history) <= 15
+    changeList = list(map(lambda row: row[1], relaxation.history[:-1]))
+    assert changeList[-1] < 1e-6
+    for k in range(4, len(changeList) - 1):
+        assert changeList[k+1] < 0.5*changeList[k]
+
+@pytest.mark.parametrize("criterion", Relaxation.criterionList)
+def test_relaxWithinScriptAndOne(criterion):
+    [structure, relaxation, relaxList] = relax(superlattice, criterion)
+    for k in range(len(superlattice)):
+        assert superlattice[k][2] <= relaxList[k] <= 1.0
+    # the bottom layer does not relax, the layers get the relax of the run
+    assert relaxList[-1] == superlattice[-1][2]
+    stack = structure.layerStack
+    assert list(map(lambda layer: layer.bottomInterfaceRelax, stack[1:])) == list(reversed(relaxList))[1:]
+    # a layer between its bounds keeps the largest strain of the criterion
+    [radius, strainList] = relaxation.solve()
+    for i in range(1, len(stack)):
+        if(relaxation.relaxFloor[i] + 1e-6 < relaxation.relax[i] < 1.0 - 1e-6):
+            if(criterion == "thickness"):
+                assert abs(strainList[i]) == pytest.approx(relaxation.strainLimit[i], rel = 1e-3)
+            else:
+                assert stack[i].getStrainEnergy()/2.0 == pytest.approx(relaxation.criticalEnergy, rel = 1e-3)
+
+@pytest.mark.parametrize("criterion", Relaxation.criterionList)
+def test_radiusOfStatusquo(criterion):
+    [structure, relaxation, relaxList] = relax(small, criterion)
+    rlt = structure.statusquo(1000)
+    assert rlt[0][1]/Unit.length["m"] == pytest.approx(relaxation.history[-1][2], rel = 1e-9)
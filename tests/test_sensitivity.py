@@ -0,0 +1,43 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' adjoint rows of Sensitivity against central differences of full solves
+    every field (thickness, relax, composition) of every layer, curvature and stress at depths
+    in the top layer, in the alloy layer and in the relaxed AlN, the rows agree to
+    tolerance times the largest derivative of the same output
+'''
+
+import random
+import Elasticity, Unit, Sensitivity
+
+tolerance = 1e-5
+infoList = [["GaN", 1000.0, 0.0], ["Al20%GaN", 50.0, 0.0], ["AlN", 100.0, 0.3],\
+            ["GaN", 2000.0, 1.0], ["Sapphire", 430.0*Unit.length["um"], 0.0]]
+depthList = [0.0, 500.0, 1020.0, 1100.0]
+deltaDict = {"thickness": 1.0, "relax": 0.01, "composition": 1}
+
+def adjointRows():
+    random.seed(0)
+    structure = Elasticity.Structure.fromLayerList(infoList)
+    return Sensitivity.Sensitivity(structure, 1000, 300).run(depthList)
+
+def test_everyFieldIsCovered():
+    rowList = adjointRows()
+    fields = set(map(lambda row: (row[0], row[2]), rowList))
+    assert (1, "composition") in fields
+    assert all(map(lambda i: (i, "thickness") in fields, range(len(infoList))))
+    assert all(map(lambda i: (i, "relax") in fields, range(len(infoList) - 1)))
+    assert not (len(infoList) - 1, "relax") in fields
+
+def test_adjointMatchesFiniteDifference():
+    rowList = adjointRows()
+    width = 1 + len(depthList)
+    scaleList = list(map(lambda j: max(map(lambda row: abs(row[3 + j]), rowList)), range(width)))
+    for row in rowList:
+        fd = Sensitivity.finiteDifference(infoList, 1000, 300, depthList, row[0], row[2],\
+                                          deltaDict[row[2]])
+        for j in range(width):
+            assert abs(fd[j] - row[3 + j]) <= tolerance*scaleList[j], (row[0:3], j, fd[j], row[3 + j])
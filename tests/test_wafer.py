@@ -0,0 +1,50 @@
+#########################################################
+# This file is part of the MultilayerStrain package.    #
+# Version 0.1.0                                         #
+# Copyright (c) 2016 and later, Kanglin Xiong.          #
+#########################################################
+
+''' rings of Wafer against closed forms
+    a uniform wafer bends as Structure.run,
+    a free disk with a free thermal strain t(x) has, Timoshenko,
+        radial = E*(Integrate[t*x, {x, 0, R}]/R^2 - Integrate[t*x, {x, 0, x}]/x^2)
+        hoop = E*(Integrate[t*x, {x, 0, R}]/R^2 + Integrate[t*x, {x, 0, x}]/x^2 - t)
+'''
+
+import Elasticity, Unit, Wafer
+
+radius = 50*Unit.length["mm"]
+
+def test_uniformWafer():
+    structure = Elasticity.Structure("GaNOnSapph")
+    wafer = Wafer.Wafer(structure, 1000, 300, radius, 20)
+    bowMap = wafer.run()[0]
+    rlt = structure.run(structure.getEqParameters(1000, 300))
+    for curvature in bowMap["radialCurvature(1/m)"] + bowMap["hoopCurvature(1/m)"]:
+        assert abs(curvature*rlt[0]/Unit.length["m"] - 1.0) < 1e-6
+
+def test_radialTemperatureGradient():
+    # no mismatch between the layers, the stress is from the substrate expansion alone
+    structure = Elasticity.Structure.fromLayerList([["Si111", 250e3, 0.0], ["Si111", 250e3, 0.0]])
+    tempFunc = lambda x: 300.0 + 20.0*(x/radius)**2
+    wafer = Wafer.Wafer(structure, 1000, 300, radius, 100)
+    wafer.setTemperatureProfile(tempFunc)
+    stressMap = wafer.run()[1]
+    assert abs(wafer.bow) < 1e-6*Unit.length["um"]
+    material = Elasticity.loadMaterial("Si111")
+    young = material.getYoungsModulus(300)/Unit.GPa
+    strain = lambda x: material.getLattice(tempFunc(x))/material.getLattice(300) - 1.0
+    # Integrate[t*x, {x, 0, x}] by the trapezoid rule, the ring centers are on the grid
+    numOfPoints = 400
+    h = radius/numOfPoints
+    valueList = list(map(lambda k: strain(k*h)*k*h, range(numOfPoints + 1)))
+    integralList = [0.0]
+    for k in range(numOfPoints):
+        integralList.append(integralList[-1] + h*(valueList[k] + valueList[k+1])/2.0)
+    mean = integralList[-1]/radius**2
+    scale = young*mean
+    for j in range(0, len(stressMap["point"]), 10):
+        x = stressMap["position(mm)"][j]*Unit.length["mm"]
+        inner = integralList[int(round(x/h))]/x**2
+        assert abs(stressMap["radialStress(GPa)"][j] - young*(mean - inner)) < 1e-3*scale
+        assert abs(stressMap["hoopStress(GPa)"][j] - young*(mean + inner - strain(x))) < 1e-3*scale